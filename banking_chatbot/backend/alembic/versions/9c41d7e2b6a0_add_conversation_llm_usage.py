@@ -0,0 +1,34 @@
+"""add_conversation_llm_usage
+
+Revision ID: 9c41d7e2b6a0
+Revises: 5f2c8e91a7b3
+Create Date: 2026-10-17 14:05:12.904317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d7e2b6a0'
+down_revision: Union[str, Sequence[str], None] = '5f2c8e91a7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('llm_calls', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('conversations', sa.Column('llm_input_tokens', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('conversations', sa.Column('llm_output_tokens', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('conversations', sa.Column('llm_cost_usd', sa.Numeric(12, 6), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversations', 'llm_cost_usd')
+    op.drop_column('conversations', 'llm_output_tokens')
+    op.drop_column('conversations', 'llm_input_tokens')
+    op.drop_column('conversations', 'llm_calls')
@@ -0,0 +1,28 @@
+"""add_messages_conversation_created_index
+
+Revision ID: b7e3a19c4d52
+Revises: 9c41d7e2b6a0
+Create Date: 2026-10-17 15:22:37.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3a19c4d52'
+down_revision: Union[str, Sequence[str], None] = '9c41d7e2b6a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages')
@@ -0,0 +1,31 @@
+"""add_messages_keyset_pagination_index
+
+Revision ID: d2a6f4b81c37
+Revises: b7e3a19c4d52
+Create Date: 2026-10-17 19:04:12.583417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a6f4b81c37'
+down_revision: Union[str, Sequence[str], None] = 'b7e3a19c4d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (conversation_id, created_at, id) also serves every query of the previous index
+    op.create_index('ix_messages_conversation_id_created_at_id', 'messages', ['conversation_id', 'created_at', 'id'], unique=False)
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at'], unique=False)
+    op.drop_index('ix_messages_conversation_id_created_at_id', table_name='messages')
@@ -0,0 +1,42 @@
+"""convert_message_metadata_to_jsonb
+
+Revision ID: e5b7c2a9f813
+Revises: d2a6f4b81c37
+Create Date: 2026-10-17 21:37:48.201935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c2a9f813'
+down_revision: Union[str, Sequence[str], None] = 'd2a6f4b81c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored values were written with json.dumps; empty strings become NULL
+    op.alter_column(
+        'messages', 'message_metadata',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=True,
+        postgresql_using="NULLIF(message_metadata, '')::jsonb",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'messages', 'message_metadata',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using='message_metadata::text',
+    )
@@ -1,18 +1,35 @@
 # backend/app/api/v1/chat.py
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Deque, Optional
+from collections import deque
+from contextlib import aclosing, contextmanager
 from sqlalchemy.orm import Session
+import time
 import uuid
 import json
 
-from app.database import get_db
-from app.repositories import ConversationRepository, MessageRepository, TicketRepository
-from app.models import MessageRole, TicketStatus, TicketPriority
+from app.config import settings
+from app.database import get_db, get_db_context
+from app.repositories import ConversationRepository, MessageRepository
+from app.models import MessageRole, TicketPriority
+from app.core.idempotency import idempotency_store, request_fingerprint
 from app.core.limiter import limiter
+from app.core.pagination import decode_cursor, page_info
+from app.core.security import create_conversation_token, verify_conversation_token
+from app.core.websocket_manager import manager
+from app.services.conversation_cache import conversation_cache
+from app.services.conversation_summarizer import conversation_summarizer
+from app.services.knowledge_retriever import knowledge_retriever
+from app.services.message_writer import merge_pending, message_writer
+from app.services.quick_replies import quick_replies
 
 router = APIRouter()
 
+# Same budget as the HTTP message endpoints (20/minute), per customer WebSocket
+WS_MESSAGES_PER_MINUTE = 20
+
 class StartConversationRequest(BaseModel):
     user_id: str
     metadata: Optional[dict] = {}
@@ -63,12 +80,13 @@ async def start_conversation(request: Request, conv_request: StartConversationRe
         conversation_id=conversation.id,
         role=MessageRole.ASSISTANT,
         content="¡Hola! Soy el asistente virtual de JoxAI Bank. ¿En qué puedo ayudarte hoy? Puedo ayudarte con información sobre:\n\n• Consultas de saldo y movimientos\n• Tarjetas de crédito y recomendaciones\n• Planes financieros y ahorro\n• Transferencias y pagos\n• Y mucho más...",
-        message_metadata=json.dumps({"type": "welcome"})
+        message_metadata={"type": "welcome"}
     )
     
     return {
         "conversation_id": conversation_id,
         "status": "started",
+        "token": create_conversation_token(conversation_id),
         "messages": [{
             "id": welcome_msg.id,
             "role": welcome_msg.role.value,
@@ -79,45 +97,50 @@ async def start_conversation(request: Request, conv_request: StartConversationRe
 
 @router.post("/message")
 @limiter.limit("20/minute")
-async def send_message(request: Request, msg_request: SendMessageRequest, db: Session = Depends(get_db)):
+async def send_message(
+    request: Request,
+    response: Response,
+    msg_request: SendMessageRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
     """
     Send a message and get AI response - now using PostgreSQL.
     Rate limit: 20 messages per minute per IP to prevent API abuse.
-    """
-    conv_repo = ConversationRepository(db)
-    msg_repo = MessageRepository(db)
-    
-    conversation = conv_repo.get_by_conversation_id(msg_request.conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    history = msg_repo.get_by_conversation(conversation.id)
-    
-    msg_repo.create(
-        conversation_id=conversation.id,
-        role=MessageRole.USER,
-        content=msg_request.message,
-        message_metadata=json.dumps(msg_request.context or {})
-    )
-    
-    context = msg_request.context or {}
-    context["history"] = [
-        {
-            "role": msg.role.value,
-            "content": msg.content,
-            "timestamp": msg.created_at.isoformat()
-        }
-        for msg in history
-    ]
     
-    ai_response = await generate_response(msg_request.message, context)
+    With an Idempotency-Key header, retries of the same message get the
+    original response (Idempotency-Replayed: true) instead of a second turn.
+    """
+    if not idempotency_key:
+        return await _send_turn(db, msg_request)
     
-    msg_repo.create(
-        conversation_id=conversation.id,
-        role=MessageRole.ASSISTANT,
-        content=ai_response["content"],
-        message_metadata=json.dumps(ai_response.get("metadata", {}))
+    result, replayed = await idempotency_store.run(
+        f"{msg_request.conversation_id}:{idempotency_key}",
+        request_fingerprint(msg_request.message, msg_request.context),
+        lambda: _send_turn_in_own_session(msg_request)
     )
+    if replayed:
+        response.headers["Idempotency-Replayed"] = "true"
+    return result
+
+async def _send_turn_in_own_session(msg_request: SendMessageRequest) -> dict:
+    """An idempotent turn may outlive the request that started it"""
+    with get_db_context() as db:
+        return await _send_turn(db, msg_request)
+
+async def _send_turn(db: Session, msg_request: SendMessageRequest) -> dict:
+    """One chat turn: store the message, answer it, store the answer"""
+    # Quick replies have a precomputed answer: no history, retrieval or LLM call
+    quick_reply = quick_replies.match(msg_request.message)
+    with _invalidate_on_error(msg_request.conversation_id):
+        conversation, context = _prepare_turn(db, msg_request, build_context=quick_reply is None)
+        
+        ai_response = quick_reply or await generate_response(msg_request.message, context)
+        
+        _store_message(db, conversation.id, MessageRole.ASSISTANT, ai_response["content"], ai_response.get("metadata", {}))
+        _record_llm_usage(db, conversation.id, ai_response.get("metadata", {}))
+        db.commit()
+    conversation_summarizer.schedule(conversation.id)
     
     return {
         "message": ai_response["content"],
@@ -125,19 +148,146 @@ async def send_message(request: Request, msg_request: SendMessageRequest, db: Se
         "conversation_id": msg_request.conversation_id
     }
 
+@router.post("/message/stream")
+@limiter.limit("20/minute")
+async def send_message_stream(request: Request, msg_request: SendMessageRequest, db: Session = Depends(get_db)):
+    """
+    Send a message and stream the AI response as server-sent events.
+    
+    Emits `token` events as the provider generates text and a final `done`
+    event with the full message and metadata. The assistant message is
+    persisted when the stream ends.
+    Rate limit: 20 messages per minute per IP (shared budget with /message).
+    """
+    quick_reply = quick_replies.match(msg_request.message)
+    with _invalidate_on_error(msg_request.conversation_id):
+        conversation, context = _prepare_turn(db, msg_request, build_context=quick_reply is None)
+        conversation_pk = conversation.id
+        
+        # The user message must be durable (or buffered) before streaming starts;
+        # the assistant message is written from the stream with its own session.
+        db.commit()
+    
+    async def event_stream() -> AsyncIterator[str]:
+        async with aclosing(_turn_events(msg_request, conversation_pk, context, quick_reply)) as events:
+            async for event in events:
+                yield _sse_event(event.pop("type"), event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/{conversation_id}")
+async def customer_websocket(websocket: WebSocket, conversation_id: str, token: Optional[str] = Query(None)):
+    """
+    Persistent chat channel for the customer widget, one per conversation.
+    Requires the token returned by /chat/start: /chat/ws/{conversation_id}?token=<token>
+    
+    Client -> server:
+        {"type": "message", "message": "...", "context": {}}
+        {"type": "escalate", "category": "...", "priority": "...", "description": "..."}
+        {"type": "ping"}
+    Server -> client:
+        "token" / "done" events of each answer (as in /message/stream),
+        "escalated", "agent_message" (pushed by the support team), "pong", "error"
+    
+    Messages are answered one at a time, in order.
+    """
+    if not token:
+        await websocket.close(code=4001, reason="Authentication required")
+        return
+    if not verify_conversation_token(token, conversation_id):
+        await websocket.close(code=4003, reason="Invalid token")
+        return
+    
+    await manager.connect_customer(websocket, conversation_id)
+    recent: Deque[float] = deque()
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await websocket.send_json({"type": "error", "message": "Invalid JSON"})
+                continue
+            message_type = data.get("type") if isinstance(data, dict) else None
+            
+            try:
+                if message_type == "ping":
+                    await websocket.send_json({"type": "pong", "timestamp": data.get("timestamp")})
+                elif message_type == "message":
+                    _check_ws_rate(recent)
+                    await _ws_message(websocket, conversation_id, data)
+                elif message_type == "escalate":
+                    await _ws_escalate(conversation_id, data)
+                else:
+                    await websocket.send_json({"type": "error", "message": "Unknown message type"})
+            except HTTPException as error:
+                await websocket.send_json({"type": "error", "status": error.status_code, "message": error.detail})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect_customer(websocket, conversation_id)
+
+def _check_ws_rate(recent: Deque[float]) -> None:
+    """Sliding one-minute window of the messages sent on a connection"""
+    now = time.monotonic()
+    while recent and now - recent[0] > 60:
+        recent.popleft()
+    if len(recent) >= WS_MESSAGES_PER_MINUTE:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+    recent.append(now)
+
+async def _ws_message(websocket: WebSocket, conversation_id: str, data: dict) -> None:
+    """A chat turn over the customer WebSocket: stores the message, streams the answer"""
+    message, context = data.get("message"), data.get("context") or {}
+    if not isinstance(message, str) or not message.strip() or not isinstance(context, dict):
+        raise HTTPException(status_code=422, detail="A non-empty message is required")
+    msg_request = SendMessageRequest(conversation_id=conversation_id, message=message, context=context)
+    
+    quick_reply = quick_replies.match(msg_request.message)
+    with _invalidate_on_error(conversation_id), get_db_context() as db:
+        conversation, context = _prepare_turn(db, msg_request, build_context=quick_reply is None)
+        conversation_pk = conversation.id
+    
+    async with aclosing(_turn_events(msg_request, conversation_pk, context, quick_reply)) as events:
+        async for event in events:
+            await websocket.send_json(event)
+
+async def _ws_escalate(conversation_id: str, data: dict) -> None:
+    """Escalation requested over the WebSocket; the "escalated" push confirms it"""
+    fields = {key: data[key] for key in ("category", "priority", "description") if data.get(key)}
+    with get_db_context() as db:
+        await escalate_to_agent(EscalateRequest(conversation_id=conversation_id, **fields), db=db)
+
 @router.get("/history/{conversation_id}")
-async def get_history(conversation_id: str, db: Session = Depends(get_db)):
-    """Get conversation history - now using PostgreSQL"""
+async def get_history(
+    conversation_id: str,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get conversation history, latest page first (keyset cursors in "page")"""
     conv_repo = ConversationRepository(db)
     msg_repo = MessageRepository(db)
+    before_cursor, after_cursor = decode_cursor(before), decode_cursor(after)
     
     conversation = conv_repo.get_by_conversation_id(conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = msg_repo.get_by_conversation(conversation.id)
+    messages, more = msg_repo.get_page(conversation.id, limit, before=before_cursor, after=after_cursor)
+    page = page_info(messages, limit, before_cursor, after_cursor, more)
+    if message_writer.enabled and before is None and after is None:
+        # Read-your-writes on the latest page: messages accepted but not written
+        # yet. Cursors only point at stored rows, so "after" returns them once written
+        messages = merge_pending(messages, message_writer.pending(conversation.id))
     
-    return {
+    # Only JSON types below: return the response directly so FastAPI skips
+    # jsonable_encoder, which is most of the CPU of a long history
+    return ORJSONResponse({
         "conversation": {
             "id": conversation.conversation_id,
             "user_id": conversation.user_id,
@@ -151,25 +301,20 @@ async def get_history(conversation_id: str, db: Session = Depends(get_db)):
                 "role": msg.role.value,
                 "content": msg.content,
                 "timestamp": msg.created_at.isoformat(),
-                "metadata": json.loads(msg.message_metadata) if msg.message_metadata else {}
+                "metadata": msg.message_metadata or {}
             }
             for msg in messages
-        ]
-    }
+        ],
+        "page": page
+    })
 
 @router.post("/escalate")
 async def escalate_to_agent(request: EscalateRequest, db: Session = Depends(get_db)):
-    """Escalate conversation to human agent - now using PostgreSQL"""
-    from app.core.websocket_manager import manager
-    
-    conv_repo = ConversationRepository(db)
-    msg_repo = MessageRepository(db)
-    ticket_repo = TicketRepository(db)
-    
-    conversation = conv_repo.get_by_conversation_id(request.conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
+    """
+    Escalate conversation to human agent - now using PostgreSQL.
+    One repository operation: UPDATE ... RETURNING on the conversation,
+    INSERT ... RETURNING for the ticket and the system message insert.
+    """
     priority_map = {
         "low": TicketPriority.LOW,
         "medium": TicketPriority.MEDIUM,
@@ -177,27 +322,27 @@ async def escalate_to_agent(request: EscalateRequest, db: Session = Depends(get_
         "urgent": TicketPriority.URGENT
     }
     
-    ticket = ticket_repo.create(
-        ticket_id=f"TKT-{uuid.uuid4().hex[:8].upper()}",
-        conversation_id=conversation.id,
-        customer_id=conversation.user_id,
-        customer_name=conversation.customer_name,
-        customer_email=conversation.customer_email,
+    ticket_code = f"TKT-{uuid.uuid4().hex[:8].upper()}"
+    notice = f"Tu consulta ha sido escalada a un agente humano. Te contactaremos pronto. Número de ticket: #{ticket_code}"
+    
+    escalated = ConversationRepository(db).escalate_with_ticket(
+        request.conversation_id,
+        reason=request.description or "Customer escalation",
+        ticket_id=ticket_code,
         subject=f"Escalation: {request.category}",
         description=request.description or "Customer requested human assistance",
-        status=TicketStatus.OPEN,
         priority=priority_map.get(request.priority.lower(), TicketPriority.MEDIUM),
-        category=request.category
+        category=request.category,
+        # Buffered messages keep their order through the write-behind queue
+        system_message=None if message_writer.enabled else notice
     )
+    if not escalated:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    conversation, ticket = escalated
     
-    conv_repo.escalate(request.conversation_id, request.description or "Customer escalation")
-    
-    msg_repo.create(
-        conversation_id=conversation.id,
-        role=MessageRole.SYSTEM,
-        content=f"Tu consulta ha sido escalada a un agente humano. Te contactaremos pronto. Número de ticket: #{ticket.ticket_id}",
-        message_metadata=json.dumps({"type": "escalation", "ticket_id": ticket.id})
-    )
+    if message_writer.enabled:
+        _store_message(db, conversation.id, MessageRole.SYSTEM, notice, {"type": "escalation", "ticket_id": ticket.id})
+    conversation_cache.invalidate(request.conversation_id)
     
     ticket_dict = {
         "id": ticket.id,
@@ -215,6 +360,10 @@ async def escalate_to_agent(request: EscalateRequest, db: Session = Depends(get_
         "category": ticket.category,
         "priority": ticket.priority.value
     })
+    await manager.notify_customer_escalated(conversation.conversation_id, {
+        "ticket_id": ticket.ticket_id,
+        "message": notice
+    })
     
     return {
         "ticket_id": ticket.ticket_id,
@@ -233,6 +382,7 @@ async def end_conversation(request: EndConversationRequest, db: Session = Depend
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     conv_repo.close(request.conversation_id)
+    conversation_cache.invalidate(request.conversation_id)
     
     return {
         "status": "ended",
@@ -255,6 +405,21 @@ async def send_feedback(request: FeedbackRequest, db: Session = Depends(get_db))
         "message": "Feedback received"
     }
 
+@router.get("/stats")
+async def get_ai_stats():
+    """Get AI service statistics (public endpoint for monitoring)"""
+    from app.services.ai_service import ai_service
+    
+    return {
+        **ai_service.get_stats(),
+        "summaries": conversation_summarizer.stats(),
+        "knowledge": knowledge_retriever.stats(),
+        "quick_replies": quick_replies.stats(),
+        "conversation_cache": conversation_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+        "message_writer": message_writer.stats()
+    }
+
 @router.get("/config")
 async def get_widget_config():
     """Get widget configuration"""
@@ -270,15 +435,141 @@ async def get_widget_config():
             "quickReplies": True,
             "escalation": True
         },
-        "quickReplies": [
-            "Consultar saldo",
-            "Tarjetas de crédito",
-            "Hacer una transferencia",
-            "Hablar con un agente"
-        ],
+        "quickReplies": quick_replies.labels(),
         "welcomeMessage": "¡Bienvenido a JoxAI Bank!"
     }
 
+def _prepare_turn(db: Session, msg_request: SendMessageRequest, build_context: bool = True):
+    """
+    Resolve the conversation, store the user message and build the AI context
+    (skipped with build_context=False, when the answer is already known).
+    Shared by the regular and streaming message endpoints.
+    """
+    # Steady state: the conversation and its latest messages come from the cache
+    conversation = conversation_cache.get(msg_request.conversation_id)
+    if conversation is None:
+        conversation = _load_conversation(db, msg_request.conversation_id, with_history=build_context)
+    
+    # Older messages are already folded into conversation.summary
+    history = conversation.history(settings.AI_PROMPT_HISTORY_MAX_MESSAGES) if build_context else []
+    
+    _store_message(db, conversation.id, MessageRole.USER, msg_request.message, msg_request.context or {})
+    
+    # A new dict: the request's context is the stored metadata of the user message
+    context = {**(msg_request.context or {})}
+    if not build_context:
+        return conversation, context
+    context["history"] = [
+        {
+            "role": msg.role.value,
+            "content": msg.content,
+            "timestamp": msg.created_at.isoformat()
+        }
+        for msg in history
+    ]
+    context["summary"] = conversation.summary
+    context["knowledge"] = knowledge_retriever.retrieve(msg_request.message)
+    
+    return conversation, context
+
+def _load_conversation(db: Session, conversation_id: str, with_history: bool = True):
+    """Read a conversation and its latest messages, and cache them for the next turns"""
+    conversation = ConversationRepository(db).get_by_conversation_id(conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    messages = []
+    if with_history or conversation_cache.enabled:
+        messages = MessageRepository(db).get_recent(
+            conversation.id,
+            limit=settings.AI_PROMPT_HISTORY_MAX_MESSAGES,
+            after_id=conversation.summarized_until_id
+        )
+        if message_writer.enabled:
+            messages = merge_pending(messages, message_writer.pending(conversation.id))
+    return conversation_cache.put(conversation, messages)
+
+def _store_message(db: Session, conversation_pk: int, role: MessageRole, content: str, metadata: dict) -> None:
+    """Insert a chat message, or hand it to the write-behind buffer when enabled"""
+    if message_writer.enabled:
+        message = message_writer.add(conversation_pk, role, content, metadata)
+    else:
+        message = MessageRepository(db).add_message(conversation_pk, role, content, metadata)
+    conversation_cache.append_message(conversation_pk, message)
+
+@contextmanager
+def _invalidate_on_error(conversation_id: str):
+    """Drop the cached conversation if the turn fails (its messages may not be stored)"""
+    try:
+        yield
+    except Exception:
+        conversation_cache.invalidate(conversation_id)
+        raise
+
+async def _turn_events(
+    msg_request: SendMessageRequest, conversation_pk: int, context: dict, quick_reply: Optional[dict]
+) -> AsyncIterator[dict]:
+    """
+    Answer events of a turn whose user message is stored: `token` events as
+    the provider generates text, then `done` with the full message. The
+    assistant message is persisted when the events end, even if the client
+    went away. Shared by the SSE endpoint and the customer WebSocket.
+    """
+    parts = []
+    final = None
+    if quick_reply:
+        events = _replay(quick_reply)
+    else:
+        events = stream_response(msg_request.message, context)
+    try:
+        async for event in events:
+            if event["type"] == "token":
+                parts.append(event["content"])
+                yield {"type": "token", "content": event["content"]}
+            else:
+                final = event
+        
+        yield {
+            "type": "done",
+            "message": final["content"],
+            "metadata": final.get("metadata", {}),
+            "conversation_id": msg_request.conversation_id
+        }
+    finally:
+        # Persist even if the client disconnected mid-stream
+        if final is not None:
+            content, metadata = final["content"], final.get("metadata", {})
+        else:
+            content, metadata = "".join(parts), {"stream_interrupted": True}
+        
+        if content:
+            with _invalidate_on_error(msg_request.conversation_id), get_db_context() as persist_db:
+                _store_message(persist_db, conversation_pk, MessageRole.ASSISTANT, content, metadata)
+                _record_llm_usage(persist_db, conversation_pk, metadata)
+            conversation_summarizer.schedule(conversation_pk)
+
+async def _replay(answer: dict) -> AsyncIterator[dict]:
+    """A precomputed answer as stream events (one token, then done)"""
+    yield {"type": "token", "content": answer["content"]}
+    yield {"type": "done", **answer}
+
+def _record_llm_usage(db: Session, conversation_pk: int, metadata: dict) -> None:
+    """Add the tokens and cost of a freshly generated answer to the conversation totals"""
+    # Only answers that came from a provider call carry latency_ms
+    if "latency_ms" not in metadata or metadata.get("cached") or metadata.get("coalesced"):
+        return
+    usage = metadata.get("usage") or {}
+    ConversationRepository(db).add_llm_usage(
+        conversation_pk,
+        input_tokens=usage.get("input_tokens") or 0,
+        output_tokens=usage.get("output_tokens") or 0,
+        cost_usd=metadata.get("cost_usd") or 0.0
+    )
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 async def generate_response(message: str, context: dict) -> dict:
     """Generate AI response using AI Service"""
     from app.services.ai_service import ai_service
@@ -288,7 +579,24 @@ async def generate_response(message: str, context: dict) -> dict:
     response = await ai_service.generate_response(
         message=message,
         conversation_history=conversation_history,
-        system_prompt=None
+        system_prompt=None,
+        conversation_summary=context.get("summary"),
+        knowledge=context.get("knowledge")
     )
     
     return response
+
+async def stream_response(message: str, context: dict) -> AsyncIterator[dict]:
+    """Stream AI response events using AI Service"""
+    from app.services.ai_service import ai_service
+    
+    conversation_history = context.get("history", [])
+    
+    async for event in ai_service.stream_response(
+        message=message,
+        conversation_history=conversation_history,
+        system_prompt=None,
+        conversation_summary=context.get("summary"),
+        knowledge=context.get("knowledge")
+    ):
+        yield event
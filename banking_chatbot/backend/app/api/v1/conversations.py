@@ -1,9 +1,12 @@
 # backend/app/api/v1/conversations.py
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.pagination import decode_cursor, page_info
 from app.core.websocket_manager import manager
-from app.database import get_db
-from app.repositories import ConversationRepository, MessageRepository
+from app.database import get_async_db
+from app.repositories import AsyncConversationRepository, AsyncMessageRepository
 import uuid
 
 router = APIRouter()
@@ -43,16 +46,18 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
         manager.disconnect(connection_id, user_id)
 
 @router.get("/")
-async def get_conversations(status: str = None, limit: int = 50, db: Session = Depends(get_db)):
-    """Get all conversations - now using PostgreSQL"""
-    conv_repo = ConversationRepository(db)
+async def get_conversations(status: str = None, sort: str = None, limit: int = 50, db: AsyncSession = Depends(get_async_db)):
+    """Get all conversations - now using PostgreSQL (sort=cost: most expensive LLM usage first)"""
+    conv_repo = AsyncConversationRepository(db)
     
-    if status == "active":
-        conversations = conv_repo.get_active_conversations(limit=limit)
+    if sort == "cost":
+        conversations = await conv_repo.get_most_expensive(limit=limit)
+    elif status == "active":
+        conversations = await conv_repo.get_active_conversations(limit=limit)
     elif status == "escalated":
-        conversations = conv_repo.get_escalated_conversations(limit=limit)
+        conversations = await conv_repo.get_escalated_conversations(limit=limit)
     else:
-        conversations = conv_repo.get_all(limit=limit)
+        conversations = await conv_repo.get_all(limit=limit)
     
     conversations_list = [
         {
@@ -60,6 +65,7 @@ async def get_conversations(status: str = None, limit: int = 50, db: Session = D
             "user_id": c.user_id,
             "status": "active" if c.is_active else "ended",
             "escalated": c.is_escalated,
+            "llm_usage": _llm_usage(c),
             "created_at": c.created_at.isoformat(),
             "updated_at": c.updated_at.isoformat()
         }
@@ -72,23 +78,35 @@ async def get_conversations(status: str = None, limit: int = 50, db: Session = D
     }
 
 @router.get("/{conversation_id}")
-async def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
-    """Get conversation details with messages - now using PostgreSQL"""
-    conv_repo = ConversationRepository(db)
-    msg_repo = MessageRepository(db)
+async def get_conversation(
+    conversation_id: str,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get conversation details with a page of messages (latest first, keyset cursors)"""
+    conv_repo = AsyncConversationRepository(db)
+    msg_repo = AsyncMessageRepository(db)
+    before_cursor, after_cursor = decode_cursor(before), decode_cursor(after)
     
-    conversation = conv_repo.get_by_conversation_id(conversation_id)
+    conversation = await conv_repo.get_by_conversation_id(conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = msg_repo.get_by_conversation(conversation.id)
+    messages, more = await msg_repo.get_page(
+        conversation.id, limit, before=before_cursor, after=after_cursor
+    )
     
-    return {
+    # Only JSON types below: return the response directly so FastAPI skips
+    # jsonable_encoder, which is most of the CPU of a long history
+    return ORJSONResponse({
         "conversation": {
             "id": conversation.conversation_id,
             "user_id": conversation.user_id,
             "status": "active" if conversation.is_active else "ended",
             "escalated": conversation.is_escalated,
+            "llm_usage": _llm_usage(conversation),
             "created_at": conversation.created_at.isoformat(),
             "updated_at": conversation.updated_at.isoformat()
         },
@@ -100,5 +118,15 @@ async def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
                 "timestamp": msg.created_at.isoformat()
             }
             for msg in messages
-        ]
+        ],
+        "page": page_info(messages, limit, before_cursor, after_cursor, more)
+    })
+
+def _llm_usage(conversation) -> dict:
+    """LLM calls, tokens and cost accumulated by a conversation"""
+    return {
+        "calls": conversation.llm_calls or 0,
+        "input_tokens": conversation.llm_input_tokens or 0,
+        "output_tokens": conversation.llm_output_tokens or 0,
+        "cost_usd": float(conversation.llm_cost_usd or 0)
     }
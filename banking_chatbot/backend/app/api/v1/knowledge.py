@@ -9,6 +9,7 @@ from app.repositories.knowledge_base_repository import KnowledgeBaseRepository
 from app.core.security import verify_token
 from app.core.audit import log_audit
 from app.repositories import UserRepository
+from app.services.knowledge_retriever import knowledge_retriever
 
 router = APIRouter()
 
@@ -62,6 +63,13 @@ def get_current_user_id(request: Request) -> int:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+def invalidate_ai_cache():
+    """Drop cached AI answers, which may quote outdated articles"""
+    from app.services.ai_service import ai_service
+    
+    ai_service.cache.invalidate()
+
+
 @router.get("/", response_model=List[KnowledgeBaseResponse])
 async def list_knowledge_base(
     skip: int = 0,
@@ -103,11 +111,24 @@ async def search_knowledge_base(
     q: str,
     category: Optional[str] = None,
     active_only: bool = True,
+    limit: int = 20,
     db: Session = Depends(get_db)
 ):
-    """Search knowledge base by text in title, content, or tags"""
+    """
+    Search knowledge base articles, best match first.
+
+    Active articles are ranked by the in-process index used by the chat
+    (BM25 or vector similarity); when it has no match, is not loaded yet or
+    inactive articles are requested, falls back to a text match in title,
+    content or tags.
+    """
     kb_repo = KnowledgeBaseRepository(db)
-    articles = kb_repo.search(q, category, active_only)
+    articles = []
+    if active_only and knowledge_retriever.loaded_at is not None:
+        hits = knowledge_retriever.retrieve(q, limit, category=category)
+        articles = kb_repo.get_active_by_ids([hit["id"] for hit in hits])
+    if not articles:
+        articles = kb_repo.search(q, category, active_only)
     
     return [
         KnowledgeBaseResponse(
@@ -168,6 +189,8 @@ async def create_knowledge_base(
         is_active=data.is_active
     )
     db.commit()
+    invalidate_ai_cache()
+    knowledge_retriever.upsert(article)
     
     # Audit log
     log_audit(
@@ -220,6 +243,8 @@ async def update_knowledge_base(
         raise HTTPException(status_code=404, detail="Article not found")
     
     db.commit()
+    invalidate_ai_cache()
+    knowledge_retriever.upsert(article)
     
     # Audit log
     log_audit(
@@ -267,6 +292,8 @@ async def delete_knowledge_base(
     
     kb_repo.delete(article_id)
     db.commit()
+    invalidate_ai_cache()
+    knowledge_retriever.remove(article_id)
     
     # Audit log
     log_audit(
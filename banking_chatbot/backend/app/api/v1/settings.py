@@ -10,6 +10,7 @@ from app.core.limiter import limiter
 from app.core.audit import log_audit
 from app.repositories import SettingRepository
 from app.models.db_setting import SettingType
+from app.services.quick_replies import QUICK_REPLIES_SETTING, quick_replies
 
 router = APIRouter()
 
@@ -143,6 +144,9 @@ async def create_system_setting(
             details={"key": setting_data.key, "setting_type": "SYSTEM"}
         )
         
+        if setting_data.key == QUICK_REPLIES_SETTING:
+            quick_replies.schedule_refresh()
+        
         return SettingResponse.model_validate(setting)
     except Exception as e:
         log_audit(
@@ -196,6 +200,9 @@ async def update_system_setting(
             details={"key": key, "setting_type": "SYSTEM"}
         )
         
+        if key == QUICK_REPLIES_SETTING:
+            quick_replies.schedule_refresh()
+        
         return SettingResponse.model_validate(setting)
     except Exception as e:
         log_audit(
@@ -240,6 +247,9 @@ async def delete_system_setting(
         details={"key": key, "setting_type": "SYSTEM"}
     )
     
+    if key == QUICK_REPLIES_SETTING:
+        quick_replies.schedule_refresh()
+    
     return {"message": "Setting deleted successfully", "key": key}
 
 
@@ -1,5 +1,6 @@
 # backend/app/api/v1/tickets.py
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
@@ -10,6 +11,7 @@ from app.repositories import TicketRepository, UserRepository, ConversationRepos
 from app.models import TicketStatus, TicketPriority, MessageRole
 from app.core.websocket_manager import manager
 from app.core.audit import log_audit
+from app.core.pagination import decode_cursor, page_info
 from app.core.security import verify_token
 
 router = APIRouter()
@@ -372,10 +374,10 @@ async def get_messages(ticket_id: str, db: Session = Depends(get_db)):
 
 @router.post("/{ticket_id}/messages")
 async def send_message(ticket_id: str, request: MessageRequest, db: Session = Depends(get_db)):
-    """Send a message to ticket - now using PostgreSQL"""
+    """Send a message to ticket - pushed to the customer's chat widget when connected"""
     ticket_repo = TicketRepository(db)
     
-    ticket = ticket_repo.get_by_ticket_id(ticket_id)
+    ticket = ticket_repo.get_with_conversation(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
@@ -388,6 +390,8 @@ async def send_message(ticket_id: str, request: MessageRequest, db: Session = De
     }
     
     await manager.notify_new_message(message_dict, ticket.conversation_id)
+    if ticket.conversation:
+        await manager.notify_agent_reply(message_dict, ticket.conversation.conversation_id)
     
     return message_dict
 
@@ -411,18 +415,29 @@ async def add_note(ticket_id: str, request: NoteRequest, db: Session = Depends(g
     return note_dict
 
 @router.get("/{ticket_id}/history")
-async def get_history(ticket_id: str, db: Session = Depends(get_db)):
-    """Get ticket history - now using PostgreSQL"""
+async def get_history(
+    ticket_id: str,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get ticket history: a page of the conversation (latest first, keyset cursors)"""
     ticket_repo = TicketRepository(db)
     msg_repo = MessageRepository(db)
+    before_cursor, after_cursor = decode_cursor(before), decode_cursor(after)
     
     ticket = ticket_repo.get_with_conversation(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    conversation_messages = msg_repo.get_by_conversation(ticket.conversation_id)
+    conversation_messages, more = msg_repo.get_page(
+        ticket.conversation_id, limit, before=before_cursor, after=after_cursor
+    )
     
-    return {
+    # Only JSON types below: return the response directly so FastAPI skips
+    # jsonable_encoder, which is most of the CPU of a long history
+    return ORJSONResponse({
         "ticket": {
             "id": ticket.id,
             "ticket_id": ticket.ticket_id,
@@ -438,5 +453,6 @@ async def get_history(ticket_id: str, db: Session = Depends(get_db)):
             }
             for msg in conversation_messages
         ],
+        "page": page_info(conversation_messages, limit, before_cursor, after_cursor, more),
         "messages": []
-    }
+    })
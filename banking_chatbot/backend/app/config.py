@@ -5,7 +5,7 @@ Lee variables de entorno y provee configuración tipada.
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import secrets
 
 
@@ -33,6 +33,8 @@ class Settings(BaseSettings):
     )
     DATABASE_POOL_SIZE: int = Field(default=10)
     DATABASE_MAX_OVERFLOW: int = Field(default=20)
+    # URL del engine asíncrono (asyncpg); por defecto se deriva de DATABASE_URL
+    DATABASE_ASYNC_URL: Optional[str] = Field(default=None)
 
     # ==================== REDIS ====================
     REDIS_URL: str = Field(default="redis://localhost:6379/0")
@@ -43,6 +45,7 @@ class Settings(BaseSettings):
     ALGORITHM: str = Field(default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=7)
+    CHAT_TOKEN_EXPIRE_MINUTES: int = Field(default=1440)  # Token del widget por conversación (WebSocket)
 
     # ==================== CORS ====================
     CORS_ORIGINS: List[str] = Field(
@@ -62,14 +65,143 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = Field(default="gpt-4-turbo-preview")
     OPENAI_TEMPERATURE: float = Field(default=0.7)
     OPENAI_MAX_TOKENS: int = Field(default=1000)
+    OPENAI_BASE_URL: str = Field(default="https://api.openai.com")
 
     # ==================== LLM - ANTHROPIC ====================
     ANTHROPIC_API_KEY: Optional[str] = Field(default=None)
     ANTHROPIC_MODEL: str = Field(default="claude-3-sonnet-20240229")
+    ANTHROPIC_BASE_URL: str = Field(default="https://api.anthropic.com")
     
     # ==================== AI PROVIDER ====================
     AI_PROVIDER: Optional[str] = Field(default=None)  # Options: "anthropic", "openai", "mock", or None for auto-detect
 
+    # ==================== AI HTTP CLIENT ====================
+    AI_HTTP2_ENABLED: bool = Field(default=True)
+    AI_HTTP_MAX_CONNECTIONS: int = Field(default=100)
+    AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20)
+    AI_HTTP_KEEPALIVE_EXPIRY: float = Field(default=60.0)  # segundos
+    AI_HTTP_CONNECT_TIMEOUT: float = Field(default=5.0)
+    AI_REQUEST_TIMEOUT: float = Field(default=30.0)
+
+    # ==================== AI RESPONSE CACHE ====================
+    AI_CACHE_ENABLED: bool = Field(default=True)
+    AI_CACHE_MAX_ENTRIES: int = Field(default=1000)
+    AI_CACHE_TTL_SECONDS: int = Field(default=900)  # 15 minutos
+    AI_CACHE_HISTORY_TURNS: int = Field(default=2)  # Turnos previos que forman parte de la clave
+
+    # ==================== AI REQUEST COALESCING ====================
+    AI_SINGLE_FLIGHT_ENABLED: bool = Field(default=True)  # Comparte una llamada entre prompts idénticos en curso
+
+    # ==================== AI PROMPT ====================
+    AI_PROMPT_HISTORY_TOKEN_BUDGET: int = Field(default=2000)  # Tokens (estimados) para turnos previos
+    AI_PROMPT_HISTORY_MAX_MESSAGES: int = Field(default=20)  # Mensajes recientes leídos de la base de datos
+    AI_PROMPT_MAX_MESSAGE_TOKENS: int = Field(default=1000)  # Mensajes más largos se truncan
+    AI_SYSTEM_PROMPT_VERSION: str = Field(default="v1")  # Ver app/services/prompts.py
+    AI_PROMPT_CACHING_ENABLED: bool = Field(default=True)  # cache_control de Anthropic
+
+    # ==================== AI CONVERSATION SUMMARY ====================
+    AI_SUMMARY_ENABLED: bool = Field(default=True)
+    AI_SUMMARY_LIVE_MESSAGES: int = Field(default=6)  # Mensajes recientes que se envían completos
+    AI_SUMMARY_MIN_BATCH: int = Field(default=4)  # Mensajes antiguos acumulados antes de resumir
+    AI_SUMMARY_MAX_BATCH: int = Field(default=20)  # Máximo de mensajes incorporados por pasada
+    AI_SUMMARY_MAX_TOKENS: int = Field(default=400)
+
+    # ==================== AI KNOWLEDGE RETRIEVAL (RAG) ====================
+    AI_RAG_ENABLED: bool = Field(default=True)  # Artículos de la base de conocimiento en el prompt
+    AI_RAG_TOP_K: int = Field(default=3)
+    AI_RAG_MIN_SCORE: float = Field(default=0.5)  # Puntaje BM25 mínimo para considerar un artículo
+    AI_RAG_TOKEN_BUDGET: int = Field(default=800)  # Tokens (estimados) para los artículos
+    AI_RAG_REFRESH_SECONDS: float = Field(default=300.0)  # Recarga periódica (escrituras de otros workers)
+    AI_RAG_MAX_ARTICLES: int = Field(default=10000)
+    AI_RAG_INDEX: str = Field(default="lexical")  # lexical (BM25) o vector (similitud coseno en NumPy)
+    AI_VECTOR_DIM: int = Field(default=256)  # Dimensión de los embeddings locales (hashing)
+    AI_VECTOR_MIN_SCORE: float = Field(default=0.2)  # Similitud coseno mínima (índice vector)
+    AI_VECTOR_INDEX_PATH: Optional[str] = Field(default=None)  # Directorio para guardar los vectores (memmap)
+
+    # ==================== CHAT QUICK REPLIES ====================
+    # Botones del widget con respuesta precalculada (se sobrescribe con el setting de sistema
+    # "chat.quick_replies"): etiquetas, u objetos {"label", "answer"} con respuesta fija.
+    AI_QUICK_REPLIES_ENABLED: bool = Field(default=True)
+    AI_QUICK_REPLIES_REFRESH_SECONDS: float = Field(default=900.0)  # Recalcular respuestas cada 15 minutos
+    AI_QUICK_REPLIES: List[Any] = Field(default=[
+        "Consultar saldo",
+        "Tarjetas de crédito",
+        "Hacer una transferencia",
+        "Hablar con un agente",
+    ])
+
+    # ==================== CHAT MESSAGE PERSISTENCE ====================
+    # Write-behind: los mensajes del chat se guardan en lotes fuera de la respuesta
+    AI_MESSAGE_WRITE_BEHIND: bool = Field(default=False)
+    AI_MESSAGE_FLUSH_MS: float = Field(default=5.0)  # Escribir el buffer cada 5 ms...
+    AI_MESSAGE_FLUSH_ROWS: int = Field(default=200)  # ...o en cuanto haya 200 mensajes
+    AI_MESSAGE_FLUSH_ATTEMPTS: int = Field(default=3)  # Intentos de un lote antes de escribirlo fila por fila
+
+    # ==================== CHAT CONVERSATION CACHE ====================
+    # Conversaciones activas en memoria (PK, flags, resumen y últimos mensajes)
+    AI_CONVERSATION_CACHE_ENABLED: bool = Field(default=True)
+    AI_CONVERSATION_CACHE_MAX_ENTRIES: int = Field(default=5000)
+    AI_CONVERSATION_CACHE_TTL_SECONDS: float = Field(default=300.0)  # Releer cambios de otros workers
+
+    # ==================== IDEMPOTENCY ====================
+    # Respuestas guardadas por Idempotency-Key (reintentos de /chat/message)
+    IDEMPOTENCY_TTL_SECONDS: float = Field(default=3600.0)  # Reintentos aceptados durante 1 hora
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(default=10000)
+
+    # ==================== AI INTENTS ====================
+    # Intención -> palabras clave (sin distinguir mayúsculas ni acentos; el orden es la prioridad).
+    # Se puede sobrescribir con JSON en la variable de entorno.
+    AI_INTENT_KEYWORDS: Dict[str, List[str]] = Field(default={
+        "balance_inquiry": ["saldo", "balance"],
+        "credit_card_info": ["tarjeta", "crédito", "credit"],
+        "transfer_help": ["transferencia", "transfer", "enviar dinero"],
+        "savings_plans": ["plan", "ahorro", "inversión"],
+        "agent_request": ["agente", "humano", "persona", "hablar con alguien", "representante"],
+    })
+    AI_ESCALATION_INTENTS: List[str] = Field(default=["agent_request"])  # Intenciones que sugieren escalar
+
+    # ==================== AI PROVIDER FAILOVER ====================
+    AI_FALLBACK_TO_MOCK: bool = Field(default=True)  # Respuesta mock si todos los proveedores fallan
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=3)  # Fallos consecutivos que abren el circuito
+    AI_CIRCUIT_COOLDOWN_SECONDS: float = Field(default=30.0)
+    AI_HEALTH_WINDOW_SECONDS: float = Field(default=300.0)  # Ventana de latencias/errores (5 minutos)
+    AI_HEALTH_PROBE_INTERVAL_SECONDS: float = Field(default=10.0)
+    AI_LATENCY_SLACK: float = Field(default=1.5)  # El primario se prefiere salvo que sea 1.5x más lento
+
+    # ==================== AI CONCURRENCY (BULKHEAD) ====================
+    # Límites por proveedor y por worker: las solicitudes excedentes esperan en cola
+    # y se rechazan de inmediato si la cola está llena o la espera supera el plazo.
+    AI_MAX_CONCURRENT_REQUESTS: int = Field(default=10)
+    AI_MAX_QUEUED_REQUESTS: int = Field(default=50)
+    AI_QUEUE_TIMEOUT_SECONDS: float = Field(default=5.0)  # Espera máxima en cola
+
+    # ==================== AI RETRIES & HEDGING ====================
+    AI_MAX_RETRIES: int = Field(default=1)  # Reintentos por proveedor ante 429, 5xx o errores de conexión
+    AI_RETRY_BASE_DELAY_SECONDS: float = Field(default=0.25)  # Backoff exponencial con jitter
+    AI_RETRY_MAX_DELAY_SECONDS: float = Field(default=2.0)
+    AI_HEDGE_ENABLED: bool = Field(default=False)  # Segunda solicitud si la primera supera el p95 del proveedor
+    AI_HEDGE_MIN_DELAY_SECONDS: float = Field(default=0.5)  # Nunca se duplica antes de este tiempo
+
+    # ==================== AI METRICS ====================
+    # Precio en USD por millón de tokens, por modelo (para el costo en /metrics y por conversación).
+    # Se puede sobrescribir con JSON en la variable de entorno; modelos sin precio no suman costo.
+    AI_MODEL_PRICING: Dict[str, Dict[str, float]] = Field(default={
+        "claude-sonnet-4-20250514": {"input": 3.0, "output": 15.0, "cache_read": 0.30, "cache_write": 3.75},
+        "gpt-4o-mini": {"input": 0.15, "output": 0.60, "cache_read": 0.075},
+        "gpt-4o": {"input": 2.50, "output": 10.0, "cache_read": 1.25},
+    })
+
+    # ==================== AI MOCK PROVIDER (PRUEBAS DE CARGA) ====================
+    AI_MOCK_LATENCY_MODE: str = Field(default="none")  # none, fixed, normal, long_tail
+    AI_MOCK_LATENCY_MS: float = Field(default=800.0)  # Tiempo al primer token (fijo / media / mediana)
+    AI_MOCK_LATENCY_STDDEV_MS: float = Field(default=250.0)  # Modo normal
+    AI_MOCK_LATENCY_TAIL_SIGMA: float = Field(default=0.8)  # Modo long_tail (lognormal)
+    AI_MOCK_TOKEN_INTERVAL_MS: float = Field(default=0.0)  # Cadencia por token
+    AI_MOCK_ERROR_RATE: float = Field(default=0.0)  # Proporción de respuestas 500
+    AI_MOCK_RATE_LIMIT_RATE: float = Field(default=0.0)  # Proporción de respuestas 429
+    AI_MOCK_TIMEOUT_RATE: float = Field(default=0.0)  # Proporción de timeouts (espera AI_REQUEST_TIMEOUT)
+    AI_MOCK_SEED: Optional[int] = Field(default=None)  # Semilla para resultados reproducibles
+
     # ==================== VECTOR DB - QDRANT ====================
     QDRANT_HOST: str = Field(default="localhost")
     QDRANT_PORT: int = Field(default=6333)
@@ -0,0 +1,161 @@
+# backend/app/core/idempotency.py
+"""
+Idempotency keys for POST endpoints that must not run twice.
+
+Clients send an `Idempotency-Key` header (e.g. a UUID per user action) and
+reuse it when they retry. The first request with a key runs the call; a
+retry that arrives while it is still running waits for that same call, and
+a retry that arrives after it finished gets the stored response back. The
+call is never repeated, so a retried chat message is neither stored twice
+nor sent to the LLM provider twice.
+
+Responses are kept for IDEMPOTENCY_TTL_SECONDS, at most
+IDEMPOTENCY_MAX_ENTRIES of them (oldest first out). Failed calls are not
+kept: a retry after an error runs again. The store is per worker process,
+like the conversation cache.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Hash of the request fields a key is bound to"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "task", "completed_at")
+
+    def __init__(self, fingerprint: str, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.completed_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """
+    Bounded TTL store of in-flight and completed calls by idempotency key.
+
+    As in SingleFlight, the call runs as its own task: a request that is
+    cancelled (client gave up) does not cancel it, and its retry picks up
+    the result.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries or settings.IDEMPOTENCY_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+        self.executed = 0
+        self.attached = 0
+        self.replayed = 0
+        self.conflicts = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def run(
+        self, key: str, fingerprint: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key.
+
+        Returns (result, replayed): replayed is True when the result comes
+        from an earlier request with the same key (a private copy is
+        returned). Reusing a key for a different request is a 422.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        entry = self._lookup(key)
+        if entry is not None and entry.fingerprint != fingerprint:
+            self.conflicts += 1
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key was already used for a different request"
+            )
+
+        replayed = entry is not None
+        if replayed:
+            if entry.completed_at is None:
+                self.attached += 1
+            else:
+                self.replayed += 1
+        else:
+            entry = _Entry(fingerprint, asyncio.ensure_future(fn()))
+            entry.task.add_done_callback(lambda done, k=key, e=entry: self._finished(k, e))
+            self._entries[key] = entry
+            self.executed += 1
+            self._evict()
+
+        result = await asyncio.shield(entry.task)
+        return (copy.deepcopy(result) if replayed else result), replayed
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def _expired(self, entry: _Entry) -> bool:
+        return entry.completed_at is not None and self._clock() - entry.completed_at > self.ttl_seconds
+
+    def _finished(self, key: str, entry: _Entry) -> None:
+        """Keep successful results; forget failures so a retry runs again"""
+        if entry.task.cancelled() or entry.task.exception() is not None:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            entry.completed_at = self._clock()
+
+    def _evict(self) -> None:
+        """Drop expired entries at the head, then the oldest beyond max_entries"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if self._expired(entry):
+                self._entries.popitem(last=False)
+                self.expirations += 1
+            elif len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            else:
+                break
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": sum(1 for entry in self._entries.values() if entry.completed_at is None),
+            "max_entries": self.max_entries,
+            "executed": self.executed,
+            "attached": self.attached,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Global instance
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,55 @@
+# backend/app/core/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the (created_at, id) position of a row, encoded as an opaque
+URL-safe string. Pages are read with WHERE (created_at, id) < cursor (or >)
+on an index that starts with the same columns, so any page costs the same
+no matter how deep it is or how long the list has grown, unlike OFFSET.
+"""
+
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Cursor string -> (created_at, id); HTTP 400 if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_info(
+    rows, limit: int, before: Optional[Cursor], after: Optional[Cursor], more: bool
+) -> dict:
+    """
+    Cursors around a page of rows (oldest first), as read by get_page with
+    the decoded `before` / `after` cursors: pass "before" to get the older
+    page and "after" to get the messages newer than this page.
+    """
+    has_older = more if after is None else True
+    has_newer = more if after is not None else before is not None
+    first = (rows[0].created_at, rows[0].id) if rows else None
+    last = (rows[-1].created_at, rows[-1].id) if rows else after or before
+    return {
+        "limit": limit,
+        "has_older": has_older,
+        "has_newer": has_newer,
+        "before": encode_cursor(*first) if first and has_older else None,
+        "after": encode_cursor(*last) if last else None,
+    }
@@ -35,3 +35,21 @@ def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     return payload
+
+# Conversation tokens carry an audience, so verify_token (staff) rejects them
+CONVERSATION_TOKEN_AUDIENCE = "chat-widget"
+
+def create_conversation_token(conversation_id: str) -> str:
+    """Create the token that lets the chat widget use one conversation"""
+    return create_access_token(
+        {"conversation_id": conversation_id, "aud": CONVERSATION_TOKEN_AUDIENCE},
+        expires_delta=timedelta(minutes=settings.CHAT_TOKEN_EXPIRE_MINUTES)
+    )
+
+def verify_conversation_token(token: str, conversation_id: str) -> bool:
+    """Check that a conversation token is valid for this conversation"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=CONVERSATION_TOKEN_AUDIENCE)
+    except Exception:
+        return False
+    return payload.get("conversation_id") == conversation_id
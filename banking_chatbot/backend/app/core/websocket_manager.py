@@ -15,6 +15,8 @@ class ConnectionManager:
             "SUPERVISOR": set(),
             "AGENT": set()
         }
+        # Customer chat widgets, by public conversation id
+        self.conversation_connections: Dict[str, Set[WebSocket]] = {}
     
     async def connect(self, websocket: WebSocket, user_id: int, role: str):
         """Accept and register a new WebSocket connection."""
@@ -49,6 +51,20 @@ class ConnectionManager:
         if role in self.role_connections:
             self.role_connections[role].discard(websocket)
     
+    async def connect_customer(self, websocket: WebSocket, conversation_id: str):
+        """Accept and register a customer WebSocket for one conversation."""
+        await websocket.accept()
+        self.conversation_connections.setdefault(conversation_id, set()).add(websocket)
+    
+    def disconnect_customer(self, websocket: WebSocket, conversation_id: str):
+        """Remove a customer WebSocket connection."""
+        connections = self.conversation_connections.get(conversation_id)
+        if connections is None:
+            return
+        connections.discard(websocket)
+        if not connections:
+            del self.conversation_connections[conversation_id]
+    
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send a message to a specific WebSocket connection."""
         try:
@@ -92,6 +108,25 @@ class ConnectionManager:
         for connection in disconnected:
             self.role_connections[role].discard(connection)
     
+    async def send_to_conversation(self, conversation_id: str, message: dict):
+        """Send a message to the customer connections of a conversation."""
+        connections = self.conversation_connections.get(conversation_id)
+        if not connections:
+            return
+        
+        message_str = json.dumps(message)
+        disconnected = []
+        
+        for connection in list(connections):
+            try:
+                await connection.send_text(message_str)
+            except Exception as e:
+                print(f"Error sending to conversation {conversation_id}: {e}")
+                disconnected.append(connection)
+        
+        for connection in disconnected:
+            self.disconnect_customer(connection, conversation_id)
+    
     async def broadcast(self, message: dict):
         """Broadcast a message to all connected clients."""
         message_str = json.dumps(message)
@@ -159,6 +194,25 @@ class ConnectionManager:
         await self.send_to_role("SUPERVISOR", message)
         await self.send_to_role("AGENT", message)
     
+    async def notify_customer_escalated(self, conversation_id: str, escalation_data: dict):
+        """Tell the customer widget that its conversation was escalated."""
+        message = {
+            "type": "escalated",
+            "data": escalation_data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        await self.send_to_conversation(conversation_id, message)
+    
+    async def notify_agent_reply(self, message_data: dict, conversation_id: str):
+        """Push an agent reply to the customer widget of the conversation."""
+        message = {
+            "type": "agent_message",
+            "data": message_data,
+            "conversation_id": conversation_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        await self.send_to_conversation(conversation_id, message)
+    
     def get_connection_stats(self) -> dict:
         """Get statistics about active connections."""
         total_connections = sum(len(conns) for conns in self.active_connections.values())
@@ -168,7 +222,9 @@ class ConnectionManager:
             "unique_users": len(self.active_connections),
             "connections_by_role": {
                 role: len(conns) for role, conns in self.role_connections.items()
-            }
+            },
+            "customer_connections": sum(len(conns) for conns in self.conversation_connections.values()),
+            "customer_conversations": len(self.conversation_connections)
         }
 
 
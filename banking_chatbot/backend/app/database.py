@@ -1,16 +1,34 @@
 """
 Database configuration and session management.
 Uses SQLAlchemy with PostgreSQL.
+
+Two session flavours share the same models:
+
+- get_db / get_db_context: synchronous Session (psycopg2). Every query
+  blocks the event loop of the worker while it waits for PostgreSQL.
+- get_async_db / get_async_db_context: AsyncSession on an asyncpg engine,
+  so other requests keep running during a query. The engine is created on
+  first use, so code that never touches it does not need asyncpg.
+
+Routers move to the async flavour one at a time: swap Depends(get_db) for
+Depends(get_async_db), the repositories for their Async* versions and
+await each repository call. Both flavours commit at the end of the request
+and roll back on errors. Async sessions do not expire objects on commit
+and cannot lazy-load relationships: load what the response needs in the
+query (selectinload / joinedload).
 """
 
 from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
-from typing import Generator
-from contextlib import contextmanager
+from typing import AsyncGenerator, Generator, Optional
+from contextlib import asynccontextmanager, contextmanager
 import logging
 import os
+import orjson
 
 from app.config import settings
 
@@ -21,12 +39,19 @@ DATABASE_URL = os.getenv("DATABASE_URL", settings.DATABASE_URL)
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+def json_serializer(value) -> str:
+    """JSON / JSONB column values are encoded and decoded with orjson"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
     echo=settings.DEBUG,
+    json_serializer=json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -81,6 +106,104 @@ def get_db_context():
         db.close()
 
 
+# ==================== ASYNC ENGINE ====================
+
+# Async drivers for the sync URLs of DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def async_database_url(url: str) -> str:
+    """
+    Async driver version of a database URL (postgresql:// -> postgresql+asyncpg://).
+    asyncpg does not understand libpq's sslmode, so it becomes ssl.
+    """
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    query = dict(parsed.query)
+    if drivername == "postgresql+asyncpg" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername=drivername, query=query).render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    """Shared async engine, created on first use"""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.DATABASE_ASYNC_URL or async_database_url(DATABASE_URL)
+        options = {
+            "pool_pre_ping": True,
+            "echo": settings.DEBUG,
+            "json_serializer": json_serializer,
+            "json_deserializer": orjson.loads,
+        }
+        if not url.startswith("sqlite"):
+            options.update(
+                pool_size=settings.DATABASE_POOL_SIZE,
+                max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            )
+        _async_engine = create_async_engine(url, **options)
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency que provee una sesión asíncrona (asyncpg).
+    Mismo ciclo de vida que get_db: commit al final del request,
+    rollback si hay excepciones.
+    """
+    async with get_async_session_factory()() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+@asynccontextmanager
+async def get_async_db_context():
+    """
+    Context manager asíncrono para usar fuera de FastAPI requests.
+
+    Usage:
+        async with get_async_db_context() as db:
+            conversation = await AsyncConversationRepository(db).get(1)
+    """
+    async with get_async_session_factory()() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def dispose_async_engine() -> None:
+    """Close the async connection pool (called from the app lifespan)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+
 def init_db() -> None:
     """
     Inicializa la base de datos creando todas las tablas.
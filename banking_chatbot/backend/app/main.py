@@ -1,19 +1,47 @@
 # backend/app/main.py
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.core.limiter import limiter
+from app.core.metrics import metrics
+from app.database import dispose_async_engine
 from app.api.v1 import auth, tickets, conversations, chat, demo, knowledge, customers, settings, analytics, notifications, websocket
+from app.services.ai_service import ai_service
+from app.services.conversation_summarizer import conversation_summarizer
+from app.services.knowledge_retriever import knowledge_retriever
+from app.services.message_writer import message_writer
+from app.services.quick_replies import quick_replies
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources at startup and release them at shutdown"""
+    await ai_service.startup()
+    await knowledge_retriever.start()
+    await quick_replies.start()
+    await message_writer.start()
+    yield
+    await message_writer.stop()
+    await quick_replies.stop()
+    await knowledge_retriever.stop()
+    await conversation_summarizer.shutdown()
+    await ai_service.shutdown()
+    await dispose_async_engine()
+
 
 app = FastAPI(
     title="Banking ChatBot API",
     version="1.0.0",
-    description="Production-ready AI-powered banking customer service chatbot"
+    description="Production-ready AI-powered banking customer service chatbot",
+    lifespan=lifespan,
+    # orjson encodes responses several times faster than json (history pages)
+    default_response_class=ORJSONResponse
 )
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -48,6 +76,11 @@ def health():
     """Health check endpoint for API"""
     return {"status": "ok", "message": "Banking ChatBot API v1.0"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Metrics of this worker process in Prometheus text format (LLM latency, tokens, cost)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/readiness")
 async def readiness():
     """
@@ -2,7 +2,7 @@
 Conversation model for database storage.
 """
 
-from sqlalchemy import Column, String, Boolean, Text, Integer
+from sqlalchemy import Column, String, Boolean, Text, Integer, Numeric
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel
@@ -23,6 +23,13 @@ class DBConversation(BaseModel):
     escalation_reason = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     sentiment_score = Column(Integer, default=0, nullable=True)
+    summary = Column(Text, nullable=True)  # Running summary of messages older than the live window
+    summarized_until_id = Column(Integer, nullable=True)  # Last message folded into the summary
+    # LLM usage of the answers in this conversation (cached answers cost nothing)
+    llm_calls = Column(Integer, default=0, server_default="0", nullable=False)
+    llm_input_tokens = Column(Integer, default=0, server_default="0", nullable=False)
+    llm_output_tokens = Column(Integer, default=0, server_default="0", nullable=False)
+    llm_cost_usd = Column(Numeric(12, 6), default=0, server_default="0", nullable=False)
 
     messages = relationship("DBMessage", back_populates="conversation", cascade="all, delete-orphan")
     tickets = relationship("DBTicket", back_populates="conversation", cascade="all, delete-orphan")
@@ -2,7 +2,8 @@
 Message model for database storage.
 """
 
-from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, Index, JSON, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import enum
 
@@ -23,11 +24,18 @@ class DBMessage(BaseModel):
     """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Latest messages of a conversation and keyset pages on (created_at, id)
+        Index("ix_messages_conversation_id_created_at_id", "conversation_id", "created_at", "id"),
+    )
+    # created_at / updated_at come back with the INSERT (RETURNING), no reload needed
+    __mapper_args__ = {"eager_defaults": True}
 
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
     role = Column(SQLEnum(MessageRole), nullable=False)
     content = Column(Text, nullable=False)
-    message_metadata = Column(Text, nullable=True)
+    # JSONB on PostgreSQL (decoded by the driver); JSON elsewhere (tests on SQLite)
+    message_metadata = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True)
     is_internal = Column(Boolean, default=False, nullable=False)
 
     conversation = relationship("DBConversation", back_populates="messages")
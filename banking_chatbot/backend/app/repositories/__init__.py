@@ -3,10 +3,11 @@ Repositories package for data access layer.
 """
 
 from app.repositories.base import BaseRepository
-from app.repositories.user_repository import UserRepository
-from app.repositories.conversation_repository import ConversationRepository
-from app.repositories.message_repository import MessageRepository
-from app.repositories.ticket_repository import TicketRepository
+from app.repositories.async_base import AsyncBaseRepository
+from app.repositories.user_repository import UserRepository, AsyncUserRepository
+from app.repositories.conversation_repository import ConversationRepository, AsyncConversationRepository
+from app.repositories.message_repository import MessageRepository, AsyncMessageRepository
+from app.repositories.ticket_repository import TicketRepository, AsyncTicketRepository
 from app.repositories.audit_log_repository import AuditLogRepository
 from app.repositories.knowledge_base_repository import KnowledgeBaseRepository
 from app.repositories.customer_repository import CustomerRepository
@@ -26,4 +27,9 @@ __all__ = [
     "SettingRepository",
     "AnalyticsRepository",
     "NotificationRepository",
+    "AsyncBaseRepository",
+    "AsyncUserRepository",
+    "AsyncConversationRepository",
+    "AsyncMessageRepository",
+    "AsyncTicketRepository",
 ]
@@ -0,0 +1,111 @@
+"""
+Async base repository with common CRUD operations.
+
+Same interface as BaseRepository, on an AsyncSession: every method is a
+coroutine and queries use select() instead of the legacy Query API.
+"""
+
+from typing import Generic, TypeVar, Type, Optional, List, Any, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select, select, func
+
+from app.models.base import BaseModel
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """
+    Async base repository with generic CRUD operations.
+    All async repositories inherit from this class.
+    """
+
+    def __init__(self, model: Type[ModelType], db: AsyncSession):
+        self.model = model
+        self.db = db
+
+    def _filter(self, statement: Select, **filters) -> Select:
+        for key, value in filters.items():
+            if hasattr(self.model, key):
+                statement = statement.where(getattr(self.model, key) == value)
+        return statement
+
+    async def get(self, id: int) -> Optional[ModelType]:
+        """Get a single record by ID"""
+        return await self.db.get(self.model, id)
+
+    async def get_by(self, **filters) -> Optional[ModelType]:
+        """Get a single record by arbitrary filters"""
+        result = await self.db.execute(self._filter(select(self.model), **filters).limit(1))
+        return result.scalars().first()
+
+    async def get_all(
+        self, skip: int = 0, limit: int = 100, **filters
+    ) -> List[ModelType]:
+        """Get all records with optional pagination and filters"""
+        statement = self._filter(select(self.model), **filters).offset(skip).limit(limit)
+        result = await self.db.execute(statement)
+        return list(result.scalars().all())
+
+    async def count(self, **filters) -> int:
+        """Count records with optional filters"""
+        statement = self._filter(select(func.count(self.model.id)), **filters)
+        return (await self.db.execute(statement)).scalar_one()
+
+    async def create(self, **data) -> ModelType:
+        """
+        Create a new record.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        instance = self.model(**data)
+        self.db.add(instance)
+        await self.db.flush()
+        await self.db.refresh(instance)
+        return instance
+
+    async def update(self, id: int, **data) -> Optional[ModelType]:
+        """
+        Update a record by ID.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        instance = await self.get(id)
+        if not instance:
+            return None
+
+        for key, value in data.items():
+            if hasattr(instance, key):
+                setattr(instance, key, value)
+
+        await self.db.flush()
+        await self.db.refresh(instance)
+        return instance
+
+    async def delete(self, id: int) -> bool:
+        """
+        Delete a record by ID.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        instance = await self.get(id)
+        if not instance:
+            return False
+
+        await self.db.delete(instance)
+        await self.db.flush()
+        return True
+
+    async def bulk_create(self, items: List[Dict[str, Any]]) -> List[ModelType]:
+        """
+        Bulk create multiple records.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        instances = [self.model(**item) for item in items]
+        self.db.add_all(instances)
+        await self.db.flush()
+        for instance in instances:
+            await self.db.refresh(instance)
+        return instances
+
+    async def exists(self, **filters) -> bool:
+        """Check if a record exists with given filters"""
+        statement = self._filter(select(self.model.id), **filters).limit(1)
+        return (await self.db.execute(statement)).first() is not None
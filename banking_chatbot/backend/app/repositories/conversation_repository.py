@@ -2,10 +2,15 @@
 Conversation repository for database operations.
 """
 
-from typing import Optional, List
-from sqlalchemy.orm import Session, joinedload
+from typing import Optional, List, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.models.db_conversation import DBConversation
+from app.models.db_message import DBMessage, MessageRole
+from app.models.db_ticket import DBTicket, TicketPriority, TicketStatus
+from app.repositories.async_base import AsyncBaseRepository
 from app.repositories.base import BaseRepository
 
 
@@ -81,3 +86,289 @@ class ConversationRepository(BaseRepository[DBConversation]):
         if conversation:
             return self.update(conversation.id, sentiment_score=sentiment_score)
         return None
+
+    def escalate_with_ticket(
+        self,
+        conversation_id: str,
+        reason: str,
+        ticket_id: str,
+        subject: str,
+        description: str,
+        priority: TicketPriority,
+        category: Optional[str] = None,
+        system_message: Optional[str] = None,
+    ) -> Optional[Tuple[DBConversation, DBTicket]]:
+        """
+        Escalate a conversation and open its ticket in three statements:
+        UPDATE ... RETURNING (flags the conversation and reads the customer
+        fields), INSERT ... RETURNING for the ticket and, with
+        system_message, the INSERT of the message telling the customer.
+        Returns None (nothing written) if the conversation does not exist.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        conversation = self.db.scalars(
+            update(DBConversation)
+            .where(DBConversation.conversation_id == conversation_id)
+            .values(is_escalated=True, escalation_reason=reason)
+            .returning(DBConversation),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        ).first()
+        if conversation is None:
+            return None
+
+        ticket = self.db.scalars(
+            insert(DBTicket).returning(DBTicket),
+            [{
+                "ticket_id": ticket_id,
+                "conversation_id": conversation.id,
+                "customer_id": conversation.user_id,
+                "customer_name": conversation.customer_name,
+                "customer_email": conversation.customer_email,
+                "subject": subject,
+                "description": description,
+                "status": TicketStatus.OPEN,
+                "priority": priority,
+                "category": category,
+            }],
+        ).one()
+
+        if system_message is not None:
+            self.db.execute(insert(DBMessage).values(
+                conversation_id=conversation.id,
+                role=MessageRole.SYSTEM,
+                content=system_message,
+                message_metadata={"type": "escalation", "ticket_id": ticket.id},
+                is_internal=False,
+            ))
+        return conversation, ticket
+
+    def get_most_expensive(self, limit: int = 50) -> List[DBConversation]:
+        """Conversations with the highest LLM cost first"""
+        return (
+            self.db.query(DBConversation)
+            .order_by(DBConversation.llm_cost_usd.desc(), DBConversation.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def add_llm_usage(
+        self,
+        id: int,
+        input_tokens: int,
+        output_tokens: int,
+        cost_usd: float,
+    ) -> None:
+        """
+        Add one LLM answer to the conversation totals (in-database increments,
+        so concurrent turns do not overwrite each other).
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        self.db.query(DBConversation).filter(DBConversation.id == id).update(
+            {
+                DBConversation.llm_calls: DBConversation.llm_calls + 1,
+                DBConversation.llm_input_tokens: DBConversation.llm_input_tokens + input_tokens,
+                DBConversation.llm_output_tokens: DBConversation.llm_output_tokens + output_tokens,
+                DBConversation.llm_cost_usd: DBConversation.llm_cost_usd + cost_usd,
+            },
+            synchronize_session=False,
+        )
+        self.db.flush()
+
+    def update_summary(
+        self,
+        id: int,
+        summary: str,
+        summarized_until_id: int,
+        expected_until_id: Optional[int],
+    ) -> bool:
+        """
+        Store a new running summary unless another writer advanced it first.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        query = self.db.query(DBConversation).filter(DBConversation.id == id)
+        if expected_until_id is None:
+            query = query.filter(DBConversation.summarized_until_id.is_(None))
+        else:
+            query = query.filter(DBConversation.summarized_until_id == expected_until_id)
+        updated = query.update(
+            {"summary": summary, "summarized_until_id": summarized_until_id},
+            synchronize_session=False,
+        )
+        self.db.flush()
+        return updated == 1
+
+
+class AsyncConversationRepository(AsyncBaseRepository[DBConversation]):
+    """Repository for Conversation operations (AsyncSession)"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(DBConversation, db)
+
+    async def get_by_conversation_id(self, conversation_id: str) -> Optional[DBConversation]:
+        """Get conversation by conversation_id (UUID)"""
+        return await self.get_by(conversation_id=conversation_id)
+
+    async def get_with_messages(self, conversation_id: str) -> Optional[DBConversation]:
+        """Get conversation with all messages loaded"""
+        result = await self.db.execute(
+            select(DBConversation)
+            .options(selectinload(DBConversation.messages))
+            .where(DBConversation.conversation_id == conversation_id)
+        )
+        return result.scalars().first()
+
+    async def get_with_tickets(self, conversation_id: str) -> Optional[DBConversation]:
+        """Get conversation with all tickets loaded"""
+        result = await self.db.execute(
+            select(DBConversation)
+            .options(selectinload(DBConversation.tickets))
+            .where(DBConversation.conversation_id == conversation_id)
+        )
+        return result.scalars().first()
+
+    async def get_by_user(
+        self, user_id: str, skip: int = 0, limit: int = 100
+    ) -> List[DBConversation]:
+        """Get all conversations for a user"""
+        return await self.get_all(skip=skip, limit=limit, user_id=user_id)
+
+    async def get_active_conversations(
+        self, skip: int = 0, limit: int = 100
+    ) -> List[DBConversation]:
+        """Get all active conversations"""
+        return await self.get_all(skip=skip, limit=limit, is_active=True)
+
+    async def get_escalated_conversations(
+        self, skip: int = 0, limit: int = 100
+    ) -> List[DBConversation]:
+        """Get all escalated conversations"""
+        return await self.get_all(skip=skip, limit=limit, is_escalated=True)
+
+    async def escalate(
+        self, conversation_id: str, reason: str
+    ) -> Optional[DBConversation]:
+        """Escalate a conversation"""
+        conversation = await self.get_by_conversation_id(conversation_id)
+        if conversation:
+            return await self.update(
+                conversation.id, is_escalated=True, escalation_reason=reason
+            )
+        return None
+
+    async def close(self, conversation_id: str) -> Optional[DBConversation]:
+        """Close/deactivate a conversation"""
+        conversation = await self.get_by_conversation_id(conversation_id)
+        if conversation:
+            return await self.update(conversation.id, is_active=False)
+        return None
+
+    async def update_sentiment(
+        self, conversation_id: str, sentiment_score: int
+    ) -> Optional[DBConversation]:
+        """Update conversation sentiment score"""
+        conversation = await self.get_by_conversation_id(conversation_id)
+        if conversation:
+            return await self.update(conversation.id, sentiment_score=sentiment_score)
+        return None
+
+    async def escalate_with_ticket(
+        self,
+        conversation_id: str,
+        reason: str,
+        ticket_id: str,
+        subject: str,
+        description: str,
+        priority: TicketPriority,
+        category: Optional[str] = None,
+        system_message: Optional[str] = None,
+    ) -> Optional[Tuple[DBConversation, DBTicket]]:
+        """Escalate a conversation and open its ticket (see ConversationRepository.escalate_with_ticket)"""
+        conversation = (await self.db.scalars(
+            update(DBConversation)
+            .where(DBConversation.conversation_id == conversation_id)
+            .values(is_escalated=True, escalation_reason=reason)
+            .returning(DBConversation),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )).first()
+        if conversation is None:
+            return None
+
+        ticket = (await self.db.scalars(
+            insert(DBTicket).returning(DBTicket),
+            [{
+                "ticket_id": ticket_id,
+                "conversation_id": conversation.id,
+                "customer_id": conversation.user_id,
+                "customer_name": conversation.customer_name,
+                "customer_email": conversation.customer_email,
+                "subject": subject,
+                "description": description,
+                "status": TicketStatus.OPEN,
+                "priority": priority,
+                "category": category,
+            }],
+        )).one()
+
+        if system_message is not None:
+            await self.db.execute(insert(DBMessage).values(
+                conversation_id=conversation.id,
+                role=MessageRole.SYSTEM,
+                content=system_message,
+                message_metadata={"type": "escalation", "ticket_id": ticket.id},
+                is_internal=False,
+            ))
+        return conversation, ticket
+
+    async def get_most_expensive(self, limit: int = 50) -> List[DBConversation]:
+        """Conversations with the highest LLM cost first"""
+        result = await self.db.execute(
+            select(DBConversation)
+            .order_by(DBConversation.llm_cost_usd.desc(), DBConversation.id.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def add_llm_usage(
+        self,
+        id: int,
+        input_tokens: int,
+        output_tokens: int,
+        cost_usd: float,
+    ) -> None:
+        """
+        Add one LLM answer to the conversation totals (in-database increments).
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        await self.db.execute(
+            update(DBConversation)
+            .where(DBConversation.id == id)
+            .values(
+                llm_calls=DBConversation.llm_calls + 1,
+                llm_input_tokens=DBConversation.llm_input_tokens + input_tokens,
+                llm_output_tokens=DBConversation.llm_output_tokens + output_tokens,
+                llm_cost_usd=DBConversation.llm_cost_usd + cost_usd,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def update_summary(
+        self,
+        id: int,
+        summary: str,
+        summarized_until_id: int,
+        expected_until_id: Optional[int],
+    ) -> bool:
+        """
+        Store a new running summary unless another writer advanced it first.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        statement = update(DBConversation).where(DBConversation.id == id)
+        if expected_until_id is None:
+            statement = statement.where(DBConversation.summarized_until_id.is_(None))
+        else:
+            statement = statement.where(DBConversation.summarized_until_id == expected_until_id)
+        result = await self.db.execute(
+            statement.values(summary=summary, summarized_until_id=summarized_until_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
@@ -18,6 +18,17 @@ class KnowledgeBaseRepository(BaseRepository[KnowledgeBase]):
             self.model.is_active == True
         ).offset(skip).limit(limit).all()
     
+    def get_active_by_ids(self, ids: List[int]) -> List[KnowledgeBase]:
+        """Get active articles by ID, in the order of the given IDs"""
+        if not ids:
+            return []
+        articles = self.db.query(self.model).filter(
+            self.model.id.in_(ids),
+            self.model.is_active == True
+        ).all()
+        by_id = {article.id: article for article in articles}
+        return [by_id[article_id] for article_id in ids if article_id in by_id]
+    
     def get_by_category(self, category: str, active_only: bool = True) -> List[KnowledgeBase]:
         """Get knowledge base articles by category"""
         query = self.db.query(self.model).filter(self.model.category == category)
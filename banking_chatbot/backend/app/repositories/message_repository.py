@@ -2,10 +2,15 @@
 Message repository for database operations.
 """
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.db_message import DBMessage, MessageRole
+from app.repositories.async_base import AsyncBaseRepository
 from app.repositories.base import BaseRepository
 
 
@@ -28,6 +33,96 @@ class MessageRepository(BaseRepository[DBMessage]):
             .all()
         )
 
+    def get_after(
+        self, conversation_id: int, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[DBMessage]:
+        """Get messages newer than a given message id (e.g. not yet summarized)"""
+        query = self.db.query(DBMessage).filter(DBMessage.conversation_id == conversation_id)
+        if after_id is not None:
+            query = query.filter(DBMessage.id > after_id)
+        return (
+            query.order_by(DBMessage.created_at.asc(), DBMessage.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+    def get_page(
+        self,
+        conversation_id: int,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[DBMessage], bool]:
+        """
+        One page of a conversation, oldest first, by keyset on (created_at, id).
+        Without cursors: the latest `limit` messages. `before`: the latest
+        `limit` messages older than that position. `after`: the first `limit`
+        messages newer than it. Returns (messages, more) where `more` tells if
+        the page stopped before the end in the direction it was read.
+        """
+        query = self.db.query(DBMessage).filter(DBMessage.conversation_id == conversation_id)
+        position = tuple_(DBMessage.created_at, DBMessage.id)
+        if after is not None:
+            query = query.filter(position > tuple_(*after)).order_by(
+                DBMessage.created_at.asc(), DBMessage.id.asc()
+            )
+        else:
+            if before is not None:
+                query = query.filter(position < tuple_(*before))
+            query = query.order_by(DBMessage.created_at.desc(), DBMessage.id.desc())
+        messages = query.limit(limit + 1).all()
+        more = len(messages) > limit
+        messages = messages[:limit]
+        if after is None:
+            messages.reverse()
+        return messages, more
+
+    def get_recent(
+        self, conversation_id: int, limit: int = 10, after_id: Optional[int] = None
+    ) -> List[Row]:
+        """
+        Last `limit` messages, oldest first, as lightweight (id, role,
+        content, created_at) rows. Reads the (conversation_id, created_at) index
+        backwards and stops after `limit` rows, so the cost does not grow
+        with the length of the conversation.
+        """
+        query = self.db.query(
+            DBMessage.id, DBMessage.role, DBMessage.content, DBMessage.created_at
+        ).filter(
+            DBMessage.conversation_id == conversation_id
+        )
+        if after_id is not None:
+            query = query.filter(DBMessage.id > after_id)
+        rows = (
+            query.order_by(DBMessage.created_at.desc(), DBMessage.id.desc())
+            .limit(limit)
+            .all()
+        )
+        rows.reverse()
+        return rows
+
+    def add_message(
+        self,
+        conversation_id: int,
+        role: MessageRole,
+        content: str,
+        message_metadata: Optional[dict] = None,
+    ) -> DBMessage:
+        """
+        Insert a message without reading it back (create() refreshes the row;
+        here the id and timestamps are returned by the INSERT itself).
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        message = DBMessage(
+            conversation_id=conversation_id,
+            role=role,
+            content=content,
+            message_metadata=message_metadata,
+        )
+        self.db.add(message)
+        self.db.flush()
+        return message
+
     def get_user_messages(
         self, conversation_id: int, skip: int = 0, limit: int = 100
     ) -> List[DBMessage]:
@@ -85,3 +180,133 @@ class MessageRepository(BaseRepository[DBMessage]):
         )
         self.db.flush()
         return result
+
+
+class AsyncMessageRepository(AsyncBaseRepository[DBMessage]):
+    """Repository for Message operations (AsyncSession)"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(DBMessage, db)
+
+    async def _all(self, statement) -> List[DBMessage]:
+        return list((await self.db.execute(statement)).scalars().all())
+
+    async def get_by_conversation(
+        self, conversation_id: int, skip: int = 0, limit: int = 100
+    ) -> List[DBMessage]:
+        """Get all messages for a conversation"""
+        return await self._all(
+            select(DBMessage)
+            .where(DBMessage.conversation_id == conversation_id)
+            .order_by(DBMessage.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+
+    async def get_after(
+        self, conversation_id: int, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[DBMessage]:
+        """Get messages newer than a given message id (e.g. not yet summarized)"""
+        statement = select(DBMessage).where(DBMessage.conversation_id == conversation_id)
+        if after_id is not None:
+            statement = statement.where(DBMessage.id > after_id)
+        return await self._all(
+            statement.order_by(DBMessage.created_at.asc(), DBMessage.id.asc()).limit(limit)
+        )
+
+    async def get_page(
+        self,
+        conversation_id: int,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[List[DBMessage], bool]:
+        """One page of a conversation, oldest first (see MessageRepository.get_page)"""
+        statement = select(DBMessage).where(DBMessage.conversation_id == conversation_id)
+        position = tuple_(DBMessage.created_at, DBMessage.id)
+        if after is not None:
+            statement = statement.where(position > tuple_(*after)).order_by(
+                DBMessage.created_at.asc(), DBMessage.id.asc()
+            )
+        else:
+            if before is not None:
+                statement = statement.where(position < tuple_(*before))
+            statement = statement.order_by(DBMessage.created_at.desc(), DBMessage.id.desc())
+        messages = await self._all(statement.limit(limit + 1))
+        more = len(messages) > limit
+        messages = messages[:limit]
+        if after is None:
+            messages.reverse()
+        return messages, more
+
+    async def get_recent(
+        self, conversation_id: int, limit: int = 10, after_id: Optional[int] = None
+    ) -> List[Row]:
+        """Last `limit` messages, oldest first, as (id, role, content, created_at) rows"""
+        statement = select(DBMessage.id, DBMessage.role, DBMessage.content, DBMessage.created_at).where(
+            DBMessage.conversation_id == conversation_id
+        )
+        if after_id is not None:
+            statement = statement.where(DBMessage.id > after_id)
+        result = await self.db.execute(
+            statement.order_by(DBMessage.created_at.desc(), DBMessage.id.desc()).limit(limit)
+        )
+        rows = list(result.all())
+        rows.reverse()
+        return rows
+
+    async def get_user_messages(
+        self, conversation_id: int, skip: int = 0, limit: int = 100
+    ) -> List[DBMessage]:
+        """Get only user messages"""
+        return await self._all(
+            select(DBMessage)
+            .where(
+                DBMessage.conversation_id == conversation_id,
+                DBMessage.role == MessageRole.USER,
+            )
+            .order_by(DBMessage.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+
+    async def get_assistant_messages(
+        self, conversation_id: int, skip: int = 0, limit: int = 100
+    ) -> List[DBMessage]:
+        """Get only assistant messages"""
+        return await self._all(
+            select(DBMessage)
+            .where(
+                DBMessage.conversation_id == conversation_id,
+                DBMessage.role == MessageRole.ASSISTANT,
+            )
+            .order_by(DBMessage.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+
+    async def count_by_conversation(self, conversation_id: int) -> int:
+        """Count messages in a conversation"""
+        return await self.count(conversation_id=conversation_id)
+
+    async def get_latest_message(self, conversation_id: int) -> Optional[DBMessage]:
+        """Get the latest message in a conversation"""
+        result = await self.db.execute(
+            select(DBMessage)
+            .where(DBMessage.conversation_id == conversation_id)
+            .order_by(DBMessage.created_at.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def delete_by_conversation(self, conversation_id: int) -> int:
+        """
+        Delete all messages in a conversation.
+        Note: Does NOT commit - commit should be handled by service layer.
+        """
+        result = await self.db.execute(
+            delete(DBMessage)
+            .where(DBMessage.conversation_id == conversation_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
@@ -4,9 +4,12 @@ Ticket repository for database operations.
 
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.db_ticket import DBTicket, TicketStatus, TicketPriority
+from app.repositories.async_base import AsyncBaseRepository
 from app.repositories.base import BaseRepository
 
 
@@ -141,3 +144,136 @@ class TicketRepository(BaseRepository[DBTicket]):
     def get_urgent_count(self) -> int:
         """Get count of urgent tickets"""
         return self.count(priority=TicketPriority.URGENT)
+
+
+class AsyncTicketRepository(AsyncBaseRepository[DBTicket]):
+    """Repository for Ticket operations (AsyncSession)"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(DBTicket, db)
+
+    async def get_by_ticket_id(self, ticket_id: str) -> Optional[DBTicket]:
+        """Get ticket by ticket_id"""
+        return await self.get_by(ticket_id=ticket_id)
+
+    async def get_with_conversation(self, ticket_id: str) -> Optional[DBTicket]:
+        """Get ticket with conversation loaded"""
+        result = await self.db.execute(
+            select(DBTicket)
+            .options(joinedload(DBTicket.conversation))
+            .where(DBTicket.ticket_id == ticket_id)
+        )
+        return result.scalars().first()
+
+    async def get_with_agent(self, ticket_id: str) -> Optional[DBTicket]:
+        """Get ticket with agent loaded"""
+        result = await self.db.execute(
+            select(DBTicket)
+            .options(joinedload(DBTicket.agent))
+            .where(DBTicket.ticket_id == ticket_id)
+        )
+        return result.scalars().first()
+
+    async def get_by_status(
+        self, status: TicketStatus, skip: int = 0, limit: int = 100
+    ) -> List[DBTicket]:
+        """Get tickets by status"""
+        return await self.get_all(skip=skip, limit=limit, status=status)
+
+    async def get_by_priority(
+        self, priority: TicketPriority, skip: int = 0, limit: int = 100
+    ) -> List[DBTicket]:
+        """Get tickets by priority"""
+        return await self.get_all(skip=skip, limit=limit, priority=priority)
+
+    async def get_by_agent(
+        self, agent_id: int, skip: int = 0, limit: int = 100
+    ) -> List[DBTicket]:
+        """Get tickets assigned to an agent"""
+        return await self.get_all(skip=skip, limit=limit, agent_id=agent_id)
+
+    async def get_by_customer(
+        self, customer_id: str, skip: int = 0, limit: int = 100
+    ) -> List[DBTicket]:
+        """Get tickets for a customer"""
+        return await self.get_all(skip=skip, limit=limit, customer_id=customer_id)
+
+    async def get_unassigned(self, skip: int = 0, limit: int = 100) -> List[DBTicket]:
+        """Get unassigned tickets"""
+        result = await self.db.execute(
+            select(DBTicket)
+            .where(DBTicket.agent_id.is_(None))
+            .order_by(DBTicket.priority.desc(), DBTicket.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def assign_to_agent(
+        self, ticket_id: str, agent_id: int, assigned_by: int
+    ) -> Optional[DBTicket]:
+        """Assign ticket to an agent"""
+        ticket = await self.get_by_ticket_id(ticket_id)
+        if ticket:
+            return await self.update(
+                ticket.id,
+                agent_id=agent_id,
+                assigned_by=assigned_by,
+                assigned_at=datetime.utcnow(),
+                status=TicketStatus.IN_PROGRESS,
+            )
+        return None
+
+    async def update_status(
+        self, ticket_id: str, status: TicketStatus
+    ) -> Optional[DBTicket]:
+        """Update ticket status"""
+        ticket = await self.get_by_ticket_id(ticket_id)
+        if ticket:
+            data = {"status": status}
+            if status == TicketStatus.RESOLVED:
+                data["resolved_at"] = datetime.utcnow()
+            return await self.update(ticket.id, **data)
+        return None
+
+    async def update_priority(
+        self, ticket_id: str, priority: TicketPriority
+    ) -> Optional[DBTicket]:
+        """Update ticket priority"""
+        ticket = await self.get_by_ticket_id(ticket_id)
+        if ticket:
+            return await self.update(ticket.id, priority=priority)
+        return None
+
+    async def resolve(
+        self, ticket_id: str, resolution_notes: str
+    ) -> Optional[DBTicket]:
+        """Resolve a ticket"""
+        ticket = await self.get_by_ticket_id(ticket_id)
+        if ticket:
+            return await self.update(
+                ticket.id,
+                status=TicketStatus.RESOLVED,
+                resolved_at=datetime.utcnow(),
+                resolution_notes=resolution_notes,
+            )
+        return None
+
+    async def close(self, ticket_id: str) -> Optional[DBTicket]:
+        """Close a ticket"""
+        ticket = await self.get_by_ticket_id(ticket_id)
+        if ticket:
+            return await self.update(ticket.id, status=TicketStatus.CLOSED)
+        return None
+
+    async def get_open_count(self) -> int:
+        """Get count of open tickets"""
+        return await self.count(status=TicketStatus.OPEN)
+
+    async def get_in_progress_count(self) -> int:
+        """Get count of in-progress tickets"""
+        return await self.count(status=TicketStatus.IN_PROGRESS)
+
+    async def get_urgent_count(self) -> int:
+        """Get count of urgent tickets"""
+        return await self.count(priority=TicketPriority.URGENT)
@@ -3,9 +3,12 @@ User repository for database operations.
 """
 
 from typing import Optional, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.db_user import DBUser, UserRole
+from app.repositories.async_base import AsyncBaseRepository
 from app.repositories.base import BaseRepository
 
 
@@ -61,3 +64,59 @@ class UserRepository(BaseRepository[DBUser]):
     def username_exists(self, username: str) -> bool:
         """Check if username already exists"""
         return self.exists(username=username)
+
+
+class AsyncUserRepository(AsyncBaseRepository[DBUser]):
+    """Repository for User operations (AsyncSession)"""
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(DBUser, db)
+
+    async def get_by_email(self, email: str) -> Optional[DBUser]:
+        """Get user by email"""
+        return await self.get_by(email=email)
+
+    async def get_by_username(self, username: str) -> Optional[DBUser]:
+        """Get user by username"""
+        return await self.get_by(username=username)
+
+    async def get_by_role(self, role: UserRole, is_active: bool = True) -> List[DBUser]:
+        """Get all users by role"""
+        return await self.get_all(role=role, is_active=is_active)
+
+    async def get_active_agents(self) -> List[DBUser]:
+        """Get all active agents"""
+        result = await self.db.execute(select(DBUser).where(
+            DBUser.role == UserRole.AGENT,
+            DBUser.is_active == True,
+        ))
+        return list(result.scalars().all())
+
+    async def get_online_agents(self) -> List[DBUser]:
+        """Get all online agents"""
+        result = await self.db.execute(select(DBUser).where(
+            DBUser.role == UserRole.AGENT,
+            DBUser.is_active == True,
+            DBUser.is_online == True,
+        ))
+        return list(result.scalars().all())
+
+    async def set_online_status(self, user_id: int, is_online: bool) -> Optional[DBUser]:
+        """Set user online/offline status"""
+        return await self.update(user_id, is_online=is_online)
+
+    async def deactivate(self, user_id: int) -> Optional[DBUser]:
+        """Deactivate a user"""
+        return await self.update(user_id, is_active=False)
+
+    async def activate(self, user_id: int) -> Optional[DBUser]:
+        """Activate a user"""
+        return await self.update(user_id, is_active=True)
+
+    async def email_exists(self, email: str) -> bool:
+        """Check if email already exists"""
+        return await self.exists(email=email)
+
+    async def username_exists(self, username: str) -> bool:
+        """Check if username already exists"""
+        return await self.exists(username=username)
@@ -1,8 +1,50 @@
 # AI Service for chatbot responses
 import os
-from typing import Dict, List, Optional
+from contextlib import nullcontext
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import time
 import httpx
 
+from app.config import settings
+from app.services.bulkhead import Bulkhead, BulkheadRejected
+from app.services.hedging import Hedger, RetryPolicy
+from app.services.intent_matcher import intent_matcher
+from app.services.llm_metrics import llm_metrics
+from app.services.mock_provider import MockLatencyProfile, split_tokens
+from app.services.provider_clients import ProviderClientPool
+from app.services.prompt_builder import SUMMARY_HEADER, BuiltPrompt, PromptBuilder
+from app.services.provider_router import CircuitState, ProviderRouter
+from app.services.response_cache import ResponseCache
+from app.services.prompts import get_system_prompt
+from app.services.singleflight import SingleFlight, make_flight_key
+
+
+# Canned answers of the mock provider, by intent (see AI_INTENT_KEYWORDS)
+MOCK_RESPONSES = {
+    "balance_inquiry": {
+        "content": "Para consultar tu saldo, necesito verificar tu identidad. ¿Podrías proporcionarme tu número de cliente o iniciar sesión en la aplicación móvil?",
+        "metadata": {"requires_auth": True}
+    },
+    "credit_card_info": {
+        "content": "Ofrecemos varias opciones de tarjetas de crédito:\n\n🔷 **Tarjeta Clásica**: Sin anualidad el primer año, 3% cashback en supermercados\n🔷 **Tarjeta Gold**: Acceso a salas VIP, 5% cashback en viajes\n🔷 **Tarjeta Platinum**: Servicio de conserjería 24/7, 10% cashback en restaurantes\n\n¿Sobre cuál te gustaría saber más?",
+        "metadata": {"category": "products"}
+    },
+    "transfer_help": {
+        "content": "Para hacer una transferencia:\n\n1. Ingresa a tu banca en línea o app móvil\n2. Selecciona 'Transferencias'\n3. Elige el tipo: SPEI (inmediata) o tradicional\n4. Ingresa los datos del beneficiario (CLABE o número de tarjeta)\n5. Confirma el monto y autoriza con tu token\n\n¿Necesitas ayuda con algún paso específico?",
+        "metadata": {"category": "transactions"}
+    },
+    "savings_plans": {
+        "content": "Tenemos excelentes planes de ahorro e inversión:\n\n💰 **Plan Ahorro Básico**: 4% anual, sin comisiones\n💰 **Inversión Plus**: 6-8% anual, liquidez a 30 días\n💰 **Portafolio Premium**: Gestión profesional, rendimientos variables\n\n¿Te gustaría que un asesor te contacte para personalizar un plan?",
+        "metadata": {"category": "financial_planning"}
+    },
+    "agent_request": {
+        "content": "Entiendo que prefieres hablar con un agente humano. Puedo escalar tu consulta a nuestro equipo de soporte.\n\n¿Podrías describirme brevemente tu consulta para asignarla al departamento correcto?",
+        "metadata": {"suggest_escalation": True}
+    }
+}
+
 
 class AIService:
     """
@@ -10,6 +52,9 @@ class AIService:
     Configurable via environment variables
     """
     
+    # Errors that mean the provider itself is unhealthy (worth failing over)
+    PROVIDER_FAILURES = ["timeout", "connection_error", "invalid_json", "invalid_response_format"]
+    
     def __init__(self):
         # Auto-detect provider based on available API keys
         anthropic_key = os.getenv("ANTHROPIC_API_KEY")
@@ -27,155 +72,593 @@ class AIService:
         else:
             self.provider = "mock"
         
-        self.api_key = None
+        self.api_keys = {"anthropic": anthropic_key, "openai": openai_key}
+        self.models = {
+            # The newest Anthropic model is "claude-sonnet-4-20250514"
+            "anthropic": os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514"),
+            "openai": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        }
+        self.api_key = self.api_keys.get(self.provider)
+        self.model = self.models.get(self.provider)
         self.client = None
         
-        if self.provider == "anthropic":
-            self.api_key = anthropic_key
-            # The newest Anthropic model is "claude-sonnet-4-20250514"
-            self.model = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
-        elif self.provider == "openai":
-            self.api_key = openai_key
-            self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        # Failover order: the configured provider first, then any other
+        # provider with an API key (mock has no router)
+        self.router = None
+        if self.provider in ["anthropic", "openai"]:
+            self.router = ProviderRouter(
+                providers=[p for p in self.api_keys if p == self.provider or self.api_keys[p]],
+                primary=self.provider
+            )
+        
+        # Per-provider concurrency limits with a bounded wait queue
+        self.bulkheads = {
+            provider: Bulkhead(provider)
+            for provider in (self.router.providers if self.router else ["mock"])
+        }
+        
+        # Retries with jittered backoff and hedging of slow requests
+        self.retry = RetryPolicy()
+        self.hedger = Hedger()
+        
+        # Latency, TTFT, tokens and cost of every provider call
+        self.metrics = llm_metrics
+        
+        # Shared, long-lived HTTP clients (one pool per provider)
+        self.clients = ProviderClientPool()
+        
+        # Simulated latency/failures of the mock provider (load testing)
+        self.mock = MockLatencyProfile()
+        
+        # Versioned default system prompt and provider-side prompt caching
+        self.system_prompt_version, self.system_prompt = get_system_prompt()
+        self.prompt_caching = settings.AI_PROMPT_CACHING_ENABLED
+        
+        # History selection within a token budget
+        self.prompts = PromptBuilder()
+        
+        # Cache of answers to frequently asked questions
+        self.cache = ResponseCache()
+        
+        # Coalescing of identical concurrent requests
+        self.single_flight_enabled = settings.AI_SINGLE_FLIGHT_ENABLED
+        self.in_flight = SingleFlight()
+    
+    async def startup(self):
+        """Open provider HTTP clients and start health probing (called from the app lifespan)"""
+        if self.router:
+            await self.clients.startup(self.router.providers)
+            self.router.start_probing(self._probe_provider)
+    
+    async def shutdown(self):
+        """Stop health probing and close provider HTTP clients"""
+        if self.router:
+            await self.router.stop_probing()
+        await self.clients.shutdown()
+    
+    async def _probe_provider(self, provider: str) -> bool:
+        """Cheap authenticated request used to detect that a provider recovered"""
+        client = self.clients.get_client(provider)
+        response = await client.get("/v1/models", headers=self._auth_headers(provider))
+        return response.status_code == 200
+    
+    def get_stats(self) -> Dict:
+        """Runtime statistics for monitoring"""
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "system_prompt_version": self.system_prompt_version,
+            "prompt_caching": self.prompt_caching,
+            "routing": self.router.stats() if self.router else None,
+            "bulkheads": {provider: b.stats() for provider, b in self.bulkheads.items()},
+            "retries": self.retry.stats(),
+            "hedging": self.hedger.stats(),
+            "llm_calls": self.metrics.stats(),
+            "mock": self.mock.stats() if self.provider == "mock" else None,
+            "http_pool": self.clients.stats(),
+            "response_cache": self.cache.stats(),
+            "single_flight": self.in_flight.stats()
+        }
     
     async def generate_response(
         self,
         message: str,
         conversation_history: Optional[List[Dict]] = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        conversation_summary: Optional[str] = None,
+        knowledge: Optional[List[Dict]] = None
     ) -> Dict:
-        """Generate AI response based on provider"""
+        """Generate AI response based on provider (served from cache when possible)"""
+        
+        cache_key = None
+        if self.cache.enabled:
+            cache_key = self.cache.make_key(message, conversation_history, system_prompt, namespace=self.provider)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cached["metadata"]["cached"] = True
+                return cached
         
-        if self.provider == "anthropic":
-            return await self._generate_anthropic(message, conversation_history, system_prompt)
-        elif self.provider == "openai":
-            return await self._generate_openai(message, conversation_history, system_prompt)
+        prompt = self._build_prompt(message, conversation_history, system_prompt, conversation_summary, knowledge)
+        
+        if self.single_flight_enabled:
+            # Identical prompts already in flight share one upstream call
+            flight_key = make_flight_key(prompt.message, prompt.history, prompt.system_text, namespace=self.provider)
+            response, shared = await self.in_flight.do(flight_key, lambda: self._generate(prompt))
+            if shared:
+                response.setdefault("metadata", {})["coalesced"] = True
         else:
-            return self._generate_mock(message)
+            response = await self._generate(prompt)
+        
+        if cache_key and self._is_cacheable(response):
+            self.cache.set(cache_key, response)
+        
+        return response
     
-    async def _generate_anthropic(
+    def _build_prompt(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]],
+        system_prompt: Optional[str],
+        conversation_summary: Optional[str],
+        knowledge: Optional[List[Dict]] = None
+    ) -> BuiltPrompt:
+        """Assemble the prompt with the versioned system prompt unless a custom one is given"""
+        return self.prompts.build(
+            message,
+            conversation_history,
+            system_prompt or self.system_prompt,
+            summary=conversation_summary,
+            version="custom" if system_prompt else self.system_prompt_version,
+            knowledge=knowledge
+        )
+    
+    async def complete_text(self, message: str, system_prompt: str, max_message_tokens: int = 4000) -> Optional[str]:
+        """
+        One-off completion for internal tasks (e.g. summaries): no history,
+        no cache, and None unless a real provider answered successfully.
+        """
+        if not self.router:
+            return None
+        prompt = PromptBuilder(history_budget=0, max_message_tokens=max_message_tokens).build(message, None, system_prompt)
+        response = await self._route(prompt)
+        metadata = response.get("metadata", {})
+        if "error" in metadata or metadata.get("provider") not in self.router.providers:
+            return None
+        return (response.get("content") or "").strip() or None
+    
+    async def _generate(self, prompt: BuiltPrompt) -> Dict:
+        """Call providers in routing order and report the prompt size"""
+        response = await self._route(prompt)
+        self._report_prompt(response.setdefault("metadata", {}), prompt)
+        return response
+    
+    @staticmethod
+    def _report_prompt(metadata: Dict, prompt: BuiltPrompt) -> None:
+        """Prompt size and the knowledge-base articles the answer was based on"""
+        metadata["prompt"] = prompt.stats()
+        if prompt.knowledge_ids:
+            metadata["knowledge_articles"] = prompt.knowledge_ids
+    
+    async def _route(self, prompt: BuiltPrompt) -> Dict:
+        """Return the first usable provider response, failing over on provider errors"""
+        if not self.router:
+            try:
+                async with self._slot("mock"):
+                    started = time.monotonic()
+                    response = await self.mock.generate(self._generate_mock(prompt.message))
+                    self.metrics.record("mock", "mock", response, time.monotonic() - started)
+                    return response
+            except BulkheadRejected as rejection:
+                return self._overloaded(rejection)
+        
+        failed = []
+        last_error = None
+        overloaded = None
+        for provider in self.router.candidates():
+            if provider == "mock":
+                if overloaded:
+                    # Shed the load instead of answering with canned text
+                    break
+                response = self._generate_mock(prompt.message)
+                response["metadata"]["provider"] = "mock"
+            else:
+                if not self.router.claim(provider):
+                    # Its half-open trial was taken by a concurrent request
+                    continue
+                try:
+                    response = await self._call_with_retries(provider, prompt)
+                except BulkheadRejected as rejection:
+                    overloaded = self._overloaded(rejection)
+                    continue
+                if self._is_provider_failure(response):
+                    failed.append(provider)
+                    last_error = response
+                    continue
+            
+            if failed:
+                self.router.record_failover(provider)
+                response["metadata"]["failover_from"] = failed
+            return response
+        
+        return overloaded or last_error or self._providers_unavailable()
+    
+    async def _call_with_retries(self, provider: str, prompt: BuiltPrompt) -> Dict:
+        """
+        Call one provider, hedged when slower than its p95 and retried with
+        backoff on retryable errors; outcomes are recorded in the router.
+        """
+        attempt = 0
+        while True:
+            async with self._slot(provider):
+                started = time.monotonic()
+                response = await self.hedger.call(
+                    lambda: self._call_provider(provider, prompt),
+                    self.hedger.delay_for(self.router.latency_p95(provider)),
+                    self._is_provider_failure,
+                    self.bulkheads.get(provider),
+                )
+                elapsed = time.monotonic() - started
+            self.metrics.record(provider, self.models[provider], response, elapsed)
+            
+            if not self._is_provider_failure(response):
+                self.router.record_success(provider, elapsed)
+                return response
+            self.router.record_failure(provider, elapsed)
+            if attempt >= self.retry.max_retries or not self._should_retry(provider, response):
+                return response
+            await self.retry.backoff(attempt)
+            attempt += 1
+    
+    async def _call_provider(self, provider: str, prompt: BuiltPrompt) -> Dict:
+        """Call one specific provider"""
+        if provider == "anthropic":
+            return await self._generate_anthropic(prompt)
+        return await self._generate_openai(prompt)
+    
+    @classmethod
+    def _is_provider_failure(cls, response: Dict) -> bool:
+        """Timeouts, transport errors, 429 and 5xx count against the provider's health"""
+        metadata = response.get("metadata", {})
+        error = metadata.get("error")
+        if error in cls.PROVIDER_FAILURES:
+            return True
+        status = metadata.get("status") or 0
+        return error == "api_error" and (status == 429 or status >= 500)
+    
+    def _slot(self, provider: str):
+        """Concurrency slot for a provider (the instant mock fallback has no limit)"""
+        bulkhead = self.bulkheads.get(provider)
+        return bulkhead.slot() if bulkhead else nullcontext()
+    
+    @staticmethod
+    def _overloaded(rejection: BulkheadRejected) -> Dict:
+        """Fast rejection when a provider's queue is full or the wait took too long"""
+        return {
+            "content": "En este momento estamos atendiendo muchas consultas. Por favor intenta de nuevo en unos segundos.",
+            "metadata": {"error": "overloaded", "provider": rejection.name, "reason": rejection.reason}
+        }
+    
+    def _should_retry(self, provider: str, response: Dict) -> bool:
+        """
+        Rate limits, 5xx and connection errors are worth another attempt
+        while the circuit is still closed; timeouts are not (they already
+        used up the time budget; hedging addresses slow calls).
+        """
+        metadata = response.get("metadata", {})
+        status = metadata.get("status") or 0
+        retryable = metadata.get("error") == "connection_error" or (
+            metadata.get("error") == "api_error" and (status == 429 or status >= 500)
+        )
+        return retryable and self.router.health[provider].state == CircuitState.CLOSED
+    
+    @staticmethod
+    def _providers_unavailable() -> Dict:
+        """Response used when every provider circuit is open"""
+        return {
+            "content": "Lo siento, el asistente no está disponible en este momento. Por favor intenta de nuevo en unos minutos o solicita hablar con un agente.",
+            "metadata": {"error": "providers_unavailable"}
+        }
+    
+    def _is_cacheable(self, response: Dict) -> bool:
+        """
+        Only successful answers are worth replaying: not errors, and not
+        failover answers (canned mock text while the providers are down
+        would be served for the whole TTL after they recover)
+        """
+        metadata = response.get("metadata", {})
+        if not response.get("content") or "error" in metadata or "failover_from" in metadata:
+            return False
+        return not (self.router and metadata.get("provider") == "mock")
+    
+    async def stream_response(
         self,
         message: str,
         conversation_history: Optional[List[Dict]] = None,
-        system_prompt: Optional[str] = None
-    ) -> Dict:
+        system_prompt: Optional[str] = None,
+        conversation_summary: Optional[str] = None,
+        knowledge: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream AI response as it is generated.
+        
+        Yields {"type": "token", "content": "..."} events while the provider
+        produces text, then exactly one {"type": "done", "content": <full text>,
+        "metadata": {...}} event (also used to report errors).
+        """
+        cache_key = None
+        if self.cache.enabled:
+            cache_key = self.cache.make_key(message, conversation_history, system_prompt, namespace=self.provider)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cached["metadata"]["cached"] = True
+                yield {"type": "token", "content": cached["content"]}
+                yield {"type": "done", **cached}
+                return
+        
+        prompt = self._build_prompt(message, conversation_history, system_prompt, conversation_summary, knowledge)
+        
+        async for event in self._stream(prompt):
+            if event["type"] == "done":
+                self._report_prompt(event["metadata"], prompt)
+            if event["type"] == "done" and cache_key and self._is_cacheable(event):
+                self.cache.set(cache_key, {"content": event["content"], "metadata": event["metadata"]})
+            yield event
+    
+    async def _stream(self, prompt: BuiltPrompt) -> AsyncIterator[Dict]:
+        """
+        Stream from providers in routing order.
+        
+        Failing over is only possible before the first token reaches the
+        client; an error after that ends the stream with the error event.
+        """
+        if not self.router:
+            try:
+                async with self._slot("mock"):
+                    started = time.monotonic()
+                    first_token = None
+                    async for event in self.mock.stream(self._generate_mock(prompt.message)):
+                        if event["type"] == "token" and first_token is None:
+                            first_token = time.monotonic() - started
+                        elif event["type"] == "done":
+                            self.metrics.record("mock", "mock", event, time.monotonic() - started, first_token)
+                        yield event
+            except BulkheadRejected as rejection:
+                yield {"type": "done", **self._overloaded(rejection)}
+            return
+        
+        failed = []
+        last_error = None
+        overloaded = None
+        for provider in self.router.candidates():
+            if provider == "mock":
+                if overloaded:
+                    break
+                stream = self._stream_mock(prompt.message)
+            elif not self.router.claim(provider):
+                continue
+            else:
+                stream = self._stream_with_retries(provider, prompt)
+            
+            emitted = False
+            try:
+                async for event in stream:
+                    if event["type"] == "token":
+                        emitted = True
+                        yield event
+                        continue
+                    
+                    if provider != "mock" and not emitted and self._is_provider_failure(event):
+                        failed.append(provider)
+                        last_error = event
+                        break
+                    
+                    if failed:
+                        self.router.record_failover(provider)
+                        event["metadata"]["failover_from"] = failed
+                    yield event
+                    return
+            except BulkheadRejected as rejection:
+                overloaded = {"type": "done", **self._overloaded(rejection)}
+            finally:
+                await stream.aclose()
+        
+        yield overloaded or last_error or {"type": "done", **self._providers_unavailable()}
+    
+    async def _stream_with_retries(self, provider: str, prompt: BuiltPrompt) -> AsyncIterator[Dict]:
+        """
+        Stream from one provider, hedged when the first event is slower than
+        its p95 and retried with backoff on retryable errors (only before
+        the first token). The slot is held for the whole stream.
+        """
+        attempt = 0
+        while True:
+            final = None
+            first_token = None
+            async with self._slot(provider):
+                started = time.monotonic()
+                stream = self.hedger.stream(
+                    lambda: self._open_stream(provider, prompt),
+                    self.hedger.delay_for(self.router.latency_p95(provider)),
+                    lambda event: event["type"] == "done" and self._is_provider_failure(event),
+                    self.bulkheads.get(provider),
+                )
+                try:
+                    async for event in stream:
+                        if event["type"] == "token":
+                            if first_token is None:
+                                first_token = time.monotonic() - started
+                            yield event
+                            continue
+                        final = event
+                        break
+                finally:
+                    await stream.aclose()
+                elapsed = time.monotonic() - started
+            
+            if final is None:
+                return
+            self.metrics.record(provider, self.models[provider], final, elapsed, first_token)
+            if not self._is_provider_failure(final):
+                self.router.record_success(provider, elapsed)
+                yield final
+                return
+            self.router.record_failure(provider, elapsed)
+            emitted = first_token is not None
+            if emitted or attempt >= self.retry.max_retries or not self._should_retry(provider, final):
+                yield final
+                return
+            await self.retry.backoff(attempt)
+            attempt += 1
+    
+    def _open_stream(self, provider: str, prompt: BuiltPrompt) -> AsyncIterator[Dict]:
+        if provider == "anthropic":
+            return self._stream_anthropic(prompt)
+        return self._stream_openai(prompt)
+    
+    def _anthropic_request(self, prompt: BuiltPrompt) -> Tuple[Dict, Dict]:
+        """Build headers and JSON payload for the Anthropic Messages API"""
+        # Build messages array (must start with a user turn)
+        messages = [dict(msg) for msg in prompt.history]
+        while messages and messages[0]["role"] != "user":
+            messages.pop(0)
+        
+        # Prompt caching: the static system prompt is one cache breakpoint and
+        # the end of the previous turns another, so the next message in this
+        # conversation re-reads the whole stable prefix from cache.
+        system = [{"type": "text", "text": prompt.system}]
+        if prompt.summary:
+            system.append({"type": "text", "text": f"{SUMMARY_HEADER}\n{prompt.summary}"})
+        if self.prompt_caching:
+            system[0]["cache_control"] = {"type": "ephemeral"}
+            if messages:
+                messages[-1]["content"] = [
+                    {"type": "text", "text": messages[-1]["content"], "cache_control": {"type": "ephemeral"}}
+                ]
+        
+        # Add current message; retrieved articles go with it rather than in
+        # the system blocks, so they do not invalidate the cached prefix
+        if prompt.knowledge:
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt.knowledge},
+                    {"type": "text", "text": prompt.message}
+                ]
+            })
+        else:
+            messages.append({
+                "role": "user",
+                "content": prompt.message
+            })
+        
+        headers = {**self._auth_headers("anthropic"), "content-type": "application/json"}
+        payload = {
+            "model": self.models["anthropic"],
+            "max_tokens": 1024,
+            "system": system,
+            "messages": messages
+        }
+        return headers, payload
+    
+    def _openai_request(self, prompt: BuiltPrompt) -> Tuple[Dict, Dict]:
+        """Build headers and JSON payload for the OpenAI Chat Completions API"""
+        # Static system prompt first so OpenAI's automatic prefix caching can
+        # reuse it; the (changing) summary goes in a separate system message
+        messages = [{"role": "system", "content": prompt.system}]
+        if prompt.summary:
+            messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{prompt.summary}"})
+        messages.extend(prompt.history)
+        # Retrieved articles right before the question keep the prefix cacheable
+        if prompt.knowledge:
+            messages.append({"role": "system", "content": prompt.knowledge})
+        messages.append({"role": "user", "content": prompt.message})
+        
+        headers = {**self._auth_headers("openai"), "Content-Type": "application/json"}
+        payload = {
+            "model": self.models["openai"],
+            "messages": messages,
+            "max_tokens": 1024,
+            "temperature": 0.7
+        }
+        return headers, payload
+    
+    def _auth_headers(self, provider: str) -> Dict:
+        """Authentication headers for a provider"""
+        if provider == "anthropic":
+            return {"x-api-key": self.api_keys["anthropic"], "anthropic-version": "2023-06-01"}
+        return {"Authorization": f"Bearer {self.api_keys['openai']}"}
+    
+    @staticmethod
+    def _suggest_escalation(message: str) -> bool:
+        """Detect if the customer is asking for a human"""
+        return intent_matcher.matches_any(message, settings.AI_ESCALATION_INTENTS)
+    
+    async def _generate_anthropic(self, prompt: BuiltPrompt) -> Dict:
         """Generate response using Anthropic Claude"""
         
-        if not self.api_key:
+        if not self.api_keys["anthropic"]:
             return {
                 "content": "Error: ANTHROPIC_API_KEY no configurada. Por favor configura tu API key en Settings.",
                 "metadata": {"error": "missing_api_key"}
             }
         
         try:
-            # Build messages array
-            messages = []
-            if conversation_history:
-                for msg in conversation_history[-10:]:  # Last 10 messages for context
-                    if msg["role"] in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Add current message
-            messages.append({
-                "role": "user",
-                "content": message
-            })
-            
-            # Default banking system prompt
-            if not system_prompt:
-                system_prompt = """Eres un asistente virtual de JoxAI Bank, un banco moderno y confiable. 
-
-Tus responsabilidades:
-- Ayudar a clientes con consultas sobre productos bancarios, saldos, transferencias y servicios
-- Proporcionar información clara y precisa sobre procedimientos bancarios
-- Ser amable, profesional y eficiente
-- Escalar a un agente humano cuando la consulta requiera autorización o información sensible
-
-Productos que ofreces:
-- Tarjetas de crédito (Clásica, Gold, Platinum)
-- Cuentas de ahorro e inversión
-- Transferencias (SPEI y tradicionales)
-- Préstamos personales e hipotecarios
-
-Si el cliente necesita:
-- Acceder a información de cuenta: solicita autenticación
-- Realizar transacciones: deriva a un agente humano
-- Resolver problemas complejos: escala el caso
-
-Responde siempre en español, de forma concisa y útil."""
+            headers, payload = self._anthropic_request(prompt)
             
             # Call Anthropic API with full error handling
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        "https://api.anthropic.com/v1/messages",
-                        headers={
-                            "x-api-key": self.api_key,
-                            "anthropic-version": "2023-06-01",
-                            "content-type": "application/json"
-                        },
-                        json={
-                            "model": self.model,
-                            "max_tokens": 1024,
-                            "system": system_prompt,
-                            "messages": messages
-                        },
-                        timeout=30.0
-                    )
-                    
-                    # Parse response safely
-                    try:
-                        result = response.json()
-                    except Exception as e:
-                        return {
-                            "content": f"Error: Respuesta inválida de Anthropic API (status {response.status_code})",
-                            "metadata": {"error": "invalid_json", "status": response.status_code, "details": str(e)}
-                        }
-                    
-                    if response.status_code != 200:
-                        error_detail = result.get("error", {}).get("message", "Unknown error")
-                        return {
-                            "content": f"Error de IA: {error_detail}",
-                            "metadata": {"error": "api_error", "status": response.status_code}
-                        }
-                    
-                    # Extract content safely with validation
-                    try:
-                        if not isinstance(result, dict):
-                            raise ValueError("Response is not a dictionary")
-                        if "content" not in result or not isinstance(result["content"], list):
-                            raise ValueError("Missing or invalid content field")
-                        if len(result["content"]) == 0:
-                            raise ValueError("Empty content array")
-                        if "text" not in result["content"][0]:
-                            raise ValueError("Missing text field in content")
-                        content = result["content"][0]["text"]
-                    except (KeyError, IndexError, TypeError, ValueError) as e:
-                        return {
-                            "content": f"Error: Formato de respuesta inesperado de Anthropic - {str(e)}",
-                            "metadata": {"error": "invalid_response_format", "details": str(e)}
-                        }
-                    
-                    # Detect if escalation is needed
-                    suggest_escalation = any(keyword in message.lower() for keyword in [
-                        "agente", "humano", "persona", "hablar con alguien", "representante"
-                    ])
-                    
+                client = self.clients.get_client("anthropic")
+                response = await client.post("/v1/messages", headers=headers, json=payload)
+                
+                # Parse response safely
+                try:
+                    result = response.json()
+                except Exception as e:
                     return {
-                        "content": content,
-                        "metadata": {
-                            "model": self.model,
-                            "provider": "anthropic",
-                            "suggest_escalation": suggest_escalation
-                        }
+                        "content": f"Error: Respuesta inválida de Anthropic API (status {response.status_code})",
+                        "metadata": {"error": "invalid_json", "status": response.status_code, "details": str(e)}
                     }
-                    
+                
+                if response.status_code != 200:
+                    error_detail = result.get("error", {}).get("message", "Unknown error")
+                    return {
+                        "content": f"Error de IA: {error_detail}",
+                        "metadata": {"error": "api_error", "status": response.status_code}
+                    }
+                
+                # Extract content safely with validation
+                try:
+                    if not isinstance(result, dict):
+                        raise ValueError("Response is not a dictionary")
+                    if "content" not in result or not isinstance(result["content"], list):
+                        raise ValueError("Missing or invalid content field")
+                    if len(result["content"]) == 0:
+                        raise ValueError("Empty content array")
+                    if "text" not in result["content"][0]:
+                        raise ValueError("Missing text field in content")
+                    content = result["content"][0]["text"]
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    return {
+                        "content": f"Error: Formato de respuesta inesperado de Anthropic - {str(e)}",
+                        "metadata": {"error": "invalid_response_format", "details": str(e)}
+                    }
+                
+                # Detect if escalation is needed
+                suggest_escalation = self._suggest_escalation(prompt.message)
+                
+                return {
+                    "content": content,
+                    "metadata": {
+                        "model": self.models["anthropic"],
+                        "provider": "anthropic",
+                        "suggest_escalation": suggest_escalation,
+                        "usage": _anthropic_usage(result.get("usage"))
+                    }
+                }
+                
             except httpx.TimeoutException:
                 return {
-                    "content": "Error: Timeout al contactar a Anthropic API (30s)",
+                    "content": f"Error: Timeout al contactar a Anthropic API ({self.clients.request_timeout:.0f}s)",
                     "metadata": {"error": "timeout"}
                 }
             except Exception as e:
@@ -190,131 +673,74 @@ Responde siempre en español, de forma concisa y útil."""
                 "metadata": {"error": "exception", "details": str(e)}
             }
     
-    async def _generate_openai(
-        self,
-        message: str,
-        conversation_history: Optional[List[Dict]] = None,
-        system_prompt: Optional[str] = None
-    ) -> Dict:
+    async def _generate_openai(self, prompt: BuiltPrompt) -> Dict:
         """Generate response using OpenAI GPT"""
         
-        if not self.api_key:
+        if not self.api_keys["openai"]:
             return {
                 "content": "Error: OPENAI_API_KEY no configurada. Por favor configura tu API key en Settings.",
                 "metadata": {"error": "missing_api_key"}
             }
         
         try:
-            # Build messages array
-            messages = []
-            
-            # System prompt
-            if not system_prompt:
-                system_prompt = """Eres un asistente virtual de JoxAI Bank, un banco moderno y confiable. 
-
-Tus responsabilidades:
-- Ayudar a clientes con consultas sobre productos bancarios, saldos, transferencias y servicios
-- Proporcionar información clara y precisa sobre procedimientos bancarios
-- Ser amable, profesional y eficiente
-- Escalar a un agente humano cuando la consulta requiera autorización o información sensible
-
-Productos que ofreces:
-- Tarjetas de crédito (Clásica, Gold, Platinum)
-- Cuentas de ahorro e inversión
-- Transferencias (SPEI y tradicionales)
-- Préstamos personales e hipotecarios
-
-Si el cliente necesita:
-- Acceder a información de cuenta: solicita autenticación
-- Realizar transacciones: deriva a un agente humano
-- Resolver problemas complejos: escala el caso
-
-Responde siempre en español, de forma concisa y útil."""
-            
-            messages.append({"role": "system", "content": system_prompt})
-            
-            # Conversation history
-            if conversation_history:
-                for msg in conversation_history[-10:]:  # Last 10 messages
-                    if msg["role"] in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Current message
-            messages.append({"role": "user", "content": message})
+            headers, payload = self._openai_request(prompt)
             
             # Call OpenAI API with full error handling
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": self.model,
-                            "messages": messages,
-                            "max_tokens": 1024,
-                            "temperature": 0.7
-                        },
-                        timeout=30.0
-                    )
-                    
-                    # Parse response safely
-                    try:
-                        result = response.json()
-                    except Exception as e:
-                        return {
-                            "content": f"Error: Respuesta inválida de OpenAI API (status {response.status_code})",
-                            "metadata": {"error": "invalid_json", "status": response.status_code, "details": str(e)}
-                        }
-                    
-                    if response.status_code != 200:
-                        error_detail = result.get("error", {}).get("message", "Unknown error")
-                        return {
-                            "content": f"Error de IA: {error_detail}",
-                            "metadata": {"error": "api_error", "status": response.status_code}
-                        }
-                    
-                    # Extract content safely with validation
-                    try:
-                        if not isinstance(result, dict):
-                            raise ValueError("Response is not a dictionary")
-                        if "choices" not in result or not isinstance(result["choices"], list):
-                            raise ValueError("Missing or invalid choices field")
-                        if len(result["choices"]) == 0:
-                            raise ValueError("Empty choices array")
-                        if "message" not in result["choices"][0]:
-                            raise ValueError("Missing message field in choice")
-                        if "content" not in result["choices"][0]["message"]:
-                            raise ValueError("Missing content field in message")
-                        content = result["choices"][0]["message"]["content"]
-                    except (KeyError, IndexError, TypeError, ValueError) as e:
-                        return {
-                            "content": f"Error: Formato de respuesta inesperado de OpenAI - {str(e)}",
-                            "metadata": {"error": "invalid_response_format", "details": str(e)}
-                        }
-                    
-                    # Detect if escalation is needed
-                    suggest_escalation = any(keyword in message.lower() for keyword in [
-                        "agente", "humano", "persona", "hablar con alguien", "representante"
-                    ])
-                    
+                client = self.clients.get_client("openai")
+                response = await client.post("/v1/chat/completions", headers=headers, json=payload)
+                
+                # Parse response safely
+                try:
+                    result = response.json()
+                except Exception as e:
                     return {
-                        "content": content,
-                        "metadata": {
-                            "model": self.model,
-                            "provider": "openai",
-                            "suggest_escalation": suggest_escalation
-                        }
+                        "content": f"Error: Respuesta inválida de OpenAI API (status {response.status_code})",
+                        "metadata": {"error": "invalid_json", "status": response.status_code, "details": str(e)}
                     }
-                    
+                
+                if response.status_code != 200:
+                    error_detail = result.get("error", {}).get("message", "Unknown error")
+                    return {
+                        "content": f"Error de IA: {error_detail}",
+                        "metadata": {"error": "api_error", "status": response.status_code}
+                    }
+                
+                # Extract content safely with validation
+                try:
+                    if not isinstance(result, dict):
+                        raise ValueError("Response is not a dictionary")
+                    if "choices" not in result or not isinstance(result["choices"], list):
+                        raise ValueError("Missing or invalid choices field")
+                    if len(result["choices"]) == 0:
+                        raise ValueError("Empty choices array")
+                    if "message" not in result["choices"][0]:
+                        raise ValueError("Missing message field in choice")
+                    if "content" not in result["choices"][0]["message"]:
+                        raise ValueError("Missing content field in message")
+                    content = result["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    return {
+                        "content": f"Error: Formato de respuesta inesperado de OpenAI - {str(e)}",
+                        "metadata": {"error": "invalid_response_format", "details": str(e)}
+                    }
+                
+                # Detect if escalation is needed
+                suggest_escalation = self._suggest_escalation(prompt.message)
+                
+                return {
+                    "content": content,
+                    "metadata": {
+                        "model": self.models["openai"],
+                        "provider": "openai",
+                        "suggest_escalation": suggest_escalation,
+                        "usage": _openai_usage(result.get("usage"))
+                    }
+                }
+                
             except httpx.TimeoutException:
                 return {
-                    "content": "Error: Timeout al contactar a OpenAI API (30s)",
+                    "content": f"Error: Timeout al contactar a OpenAI API ({self.clients.request_timeout:.0f}s)",
                     "metadata": {"error": "timeout"}
                 }
             except Exception as e:
@@ -329,39 +755,175 @@ Responde siempre en español, de forma concisa y útil."""
                 "metadata": {"error": "exception", "details": str(e)}
             }
     
-    def _generate_mock(self, message: str) -> Dict:
-        """Generate mock response (for development/testing)"""
-        message_lower = message.lower()
+    async def _stream_anthropic(self, prompt: BuiltPrompt) -> AsyncIterator[Dict]:
+        """Stream response tokens from Anthropic Claude (server-sent events)"""
         
-        # Banking knowledge responses
-        if "saldo" in message_lower or "balance" in message_lower:
-            return {
-                "content": "Para consultar tu saldo, necesito verificar tu identidad. ¿Podrías proporcionarme tu número de cliente o iniciar sesión en la aplicación móvil?",
-                "metadata": {"intent": "balance_inquiry", "requires_auth": True}
+        if not self.api_keys["anthropic"]:
+            yield {
+                "type": "done",
+                "content": "Error: ANTHROPIC_API_KEY no configurada. Por favor configura tu API key en Settings.",
+                "metadata": {"error": "missing_api_key"}
             }
+            return
         
-        elif "tarjeta" in message_lower or "crédito" in message_lower or "credit" in message_lower:
-            return {
-                "content": "Ofrecemos varias opciones de tarjetas de crédito:\n\n🔷 **Tarjeta Clásica**: Sin anualidad el primer año, 3% cashback en supermercados\n🔷 **Tarjeta Gold**: Acceso a salas VIP, 5% cashback en viajes\n🔷 **Tarjeta Platinum**: Servicio de conserjería 24/7, 10% cashback en restaurantes\n\n¿Sobre cuál te gustaría saber más?",
-                "metadata": {"intent": "credit_card_info", "category": "products"}
+        headers, payload = self._anthropic_request(prompt)
+        payload["stream"] = True
+        parts = []
+        usage = {}
+        
+        try:
+            client = self.clients.get_client("anthropic")
+            async with client.stream("POST", "/v1/messages", headers=headers, json=payload) as response:
+                if response.status_code != 200:
+                    yield await self._stream_api_error(response)
+                    return
+                
+                async for event in _iter_sse_data(response):
+                    if event.get("type") == "message_start":
+                        usage.update(event.get("message", {}).get("usage") or {})
+                    elif event.get("type") == "message_delta":
+                        usage.update(event.get("usage") or {})
+                    elif event.get("type") == "content_block_delta":
+                        text = event.get("delta", {}).get("text")
+                        if text:
+                            parts.append(text)
+                            yield {"type": "token", "content": text}
+                    elif event.get("type") == "error":
+                        error_detail = event.get("error", {}).get("message", "Unknown error")
+                        yield {
+                            "type": "done",
+                            "content": f"Error de IA: {error_detail}",
+                            "metadata": {"error": "api_error", "status": response.status_code}
+                        }
+                        return
+        
+        except httpx.TimeoutException:
+            yield {
+                "type": "done",
+                "content": f"Error: Timeout al contactar a Anthropic API ({self.clients.request_timeout:.0f}s)",
+                "metadata": {"error": "timeout"}
+            }
+            return
+        except Exception as e:
+            yield {
+                "type": "done",
+                "content": f"Error al comunicarse con Anthropic: {str(e)}",
+                "metadata": {"error": "connection_error", "details": str(e)}
             }
+            return
         
-        elif "transferencia" in message_lower or "transfer" in message_lower or "enviar dinero" in message_lower:
-            return {
-                "content": "Para hacer una transferencia:\n\n1. Ingresa a tu banca en línea o app móvil\n2. Selecciona 'Transferencias'\n3. Elige el tipo: SPEI (inmediata) o tradicional\n4. Ingresa los datos del beneficiario (CLABE o número de tarjeta)\n5. Confirma el monto y autoriza con tu token\n\n¿Necesitas ayuda con algún paso específico?",
-                "metadata": {"intent": "transfer_help", "category": "transactions"}
+        yield {
+            "type": "done",
+            "content": "".join(parts),
+            "metadata": {
+                "model": self.models["anthropic"],
+                "provider": "anthropic",
+                "suggest_escalation": self._suggest_escalation(prompt.message),
+                "usage": _anthropic_usage(usage),
+                "streamed": True
             }
+        }
+    
+    async def _stream_openai(self, prompt: BuiltPrompt) -> AsyncIterator[Dict]:
+        """Stream response tokens from OpenAI GPT (server-sent events)"""
         
-        elif "plan" in message_lower or "ahorro" in message_lower or "inversión" in message_lower:
-            return {
-                "content": "Tenemos excelentes planes de ahorro e inversión:\n\n💰 **Plan Ahorro Básico**: 4% anual, sin comisiones\n💰 **Inversión Plus**: 6-8% anual, liquidez a 30 días\n💰 **Portafolio Premium**: Gestión profesional, rendimientos variables\n\n¿Te gustaría que un asesor te contacte para personalizar un plan?",
-                "metadata": {"intent": "savings_plans", "category": "financial_planning"}
+        if not self.api_keys["openai"]:
+            yield {
+                "type": "done",
+                "content": "Error: OPENAI_API_KEY no configurada. Por favor configura tu API key en Settings.",
+                "metadata": {"error": "missing_api_key"}
+            }
+            return
+        
+        headers, payload = self._openai_request(prompt)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        parts = []
+        usage = None
+        
+        try:
+            client = self.clients.get_client("openai")
+            async with client.stream("POST", "/v1/chat/completions", headers=headers, json=payload) as response:
+                if response.status_code != 200:
+                    yield await self._stream_api_error(response)
+                    return
+                
+                async for chunk in _iter_sse_data(response):
+                    # The last chunk carries token usage and no choices
+                    usage = chunk.get("usage") or usage
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        parts.append(text)
+                        yield {"type": "token", "content": text}
+        
+        except httpx.TimeoutException:
+            yield {
+                "type": "done",
+                "content": f"Error: Timeout al contactar a OpenAI API ({self.clients.request_timeout:.0f}s)",
+                "metadata": {"error": "timeout"}
             }
+            return
+        except Exception as e:
+            yield {
+                "type": "done",
+                "content": f"Error al comunicarse con OpenAI: {str(e)}",
+                "metadata": {"error": "connection_error", "details": str(e)}
+            }
+            return
+        
+        yield {
+            "type": "done",
+            "content": "".join(parts),
+            "metadata": {
+                "model": self.models["openai"],
+                "provider": "openai",
+                "suggest_escalation": self._suggest_escalation(prompt.message),
+                "usage": _openai_usage(usage),
+                "streamed": True
+            }
+        }
+    
+    @staticmethod
+    async def _stream_api_error(response: httpx.Response) -> Dict:
+        """Build the final stream event for a non-200 provider response"""
+        body = await response.aread()
+        try:
+            error_detail = json.loads(body).get("error", {}).get("message", "Unknown error")
+        except Exception:
+            error_detail = "Unknown error"
+        return {
+            "type": "done",
+            "content": f"Error de IA: {error_detail}",
+            "metadata": {"error": "api_error", "status": response.status_code}
+        }
+    
+    async def _stream_mock(self, message: str) -> AsyncIterator[Dict]:
+        """Stream the mock response word by word (instant fallback for real providers)"""
+        result = self._generate_mock(message)
+        
+        for token in split_tokens(result["content"]):
+            yield {"type": "token", "content": token}
+            await asyncio.sleep(0)
+        
+        yield {
+            "type": "done",
+            "content": result["content"],
+            "metadata": {**result["metadata"], "provider": "mock", "streamed": True}
+        }
+    
+    def _generate_mock(self, message: str) -> Dict:
+        """Generate mock response (for development/testing)"""
+        intent = intent_matcher.best(message)
         
-        elif "agente" in message_lower or "humano" in message_lower or "persona" in message_lower:
+        # Banking knowledge responses
+        if intent in MOCK_RESPONSES:
+            response = MOCK_RESPONSES[intent]
             return {
-                "content": "Entiendo que prefieres hablar con un agente humano. Puedo escalar tu consulta a nuestro equipo de soporte.\n\n¿Podrías describirme brevemente tu consulta para asignarla al departamento correcto?",
-                "metadata": {"intent": "agent_request", "suggest_escalation": True}
+                "content": response["content"],
+                "metadata": {"intent": intent, **response["metadata"]}
             }
         
         # Default response
@@ -371,5 +933,48 @@ Responde siempre en español, de forma concisa y útil."""
         }
 
 
+def _anthropic_usage(raw: Optional[Dict]) -> Optional[Dict]:
+    """
+    Normalize Anthropic token usage.
+    input_tokens is the whole prompt (Anthropic reports cached parts separately).
+    """
+    if not raw:
+        return None
+    cache_read = raw.get("cache_read_input_tokens") or 0
+    cache_write = raw.get("cache_creation_input_tokens") or 0
+    return {
+        "input_tokens": (raw.get("input_tokens") or 0) + cache_read + cache_write,
+        "output_tokens": raw.get("output_tokens"),
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": cache_write
+    }
+
+
+def _openai_usage(raw: Optional[Dict]) -> Optional[Dict]:
+    """Normalize OpenAI token usage (cached tokens are included in prompt_tokens)"""
+    if not raw:
+        return None
+    return {
+        "input_tokens": raw.get("prompt_tokens"),
+        "output_tokens": raw.get("completion_tokens"),
+        "cache_read_tokens": (raw.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+        "cache_write_tokens": 0
+    }
+
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncIterator[Dict]:
+    """Yield the decoded JSON `data:` payloads of a server-sent events stream"""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            continue
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            continue
+
+
 # Global instance
 ai_service = AIService()
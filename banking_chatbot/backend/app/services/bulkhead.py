@@ -0,0 +1,150 @@
+# backend/app/services/bulkhead.py
+"""
+Bounded concurrency (bulkhead) for calls to one AI provider.
+
+At most max_concurrent calls run at once; further callers wait in a FIFO
+queue of at most max_queue entries for at most queue_timeout seconds.
+A caller that finds the queue full, or whose deadline passes while
+queued, is rejected right away with BulkheadRejected. During spikes this
+sheds load before it reaches the provider (and its 429s) instead of
+letting requests pile up until they time out.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.config import settings
+from app.services.provider_router import percentile
+
+
+class BulkheadRejected(Exception):
+    """The call was not admitted (reason: "queue_full" or "queue_timeout")"""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} bulkhead rejected the call: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class Bulkhead:
+    """Concurrency limiter with a bounded wait queue and queue-time deadline"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        max_samples: int = 500,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent or settings.AI_MAX_CONCURRENT_REQUESTS
+        self.max_queue = settings.AI_MAX_QUEUED_REQUESTS if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.AI_QUEUE_TIMEOUT_SECONDS
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._waits: Deque[float] = deque(maxlen=max_samples)
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.peak_queued = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the seconds spent queued"""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self._admit(0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise BulkheadRejected(self.name, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued_total += 1
+        self.peak_queued = max(self.peak_queued, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.rejected["queue_timeout"] += 1
+            raise BulkheadRejected(self.name, "queue_timeout")
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+        waited = time.monotonic() - started
+        self._admit(waited)
+        return waited
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing (for optional extra work such as hedges)"""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest live waiter"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self._waits.append(waited)
+
+    def _abandon(self, future: asyncio.Future) -> None:
+        """A waiter gave up: leave the queue, or pass on a slot it was handed meanwhile"""
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            if future.done() and not future.cancelled():
+                self.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """async with bulkhead.slot() as waited: ..."""
+        waited = await self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        """Queue depth, wait times (ms) and rejection counters"""
+        waits = list(self._waits)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+            "wait_ms": {
+                "p50": ms(percentile(waits, 50)),
+                "p95": ms(percentile(waits, 95)),
+                "max": ms(max(waits) if waits else None),
+            },
+        }
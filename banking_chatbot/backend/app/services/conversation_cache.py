@@ -0,0 +1,172 @@
+# backend/app/services/conversation_cache.py
+"""
+In-process cache of active conversations for the chat send path.
+
+Keyed by the public conversation UUID, each entry holds what a chat turn
+needs from the database: the primary key, the active / escalated flags,
+the running summary and a rolling window of the latest messages. The chat
+endpoints append every message they store and invalidate the entry on
+escalation or end, so a steady-state turn resolves the conversation and
+builds its history without reading the database.
+
+The cache is per worker process: writes made by another worker are picked
+up when the entry expires (AI_CONVERSATION_CACHE_TTL_SECONDS) or is
+evicted (least recently used first, AI_CONVERSATION_CACHE_MAX_ENTRIES).
+"""
+
+import time
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from app.config import settings
+
+
+class CachedConversation:
+    """Conversation fields used by a chat turn, plus its latest messages"""
+
+    __slots__ = (
+        "id", "conversation_id", "user_id", "is_active", "is_escalated",
+        "summary", "summarized_until_id", "messages", "loaded_at",
+    )
+
+    def __init__(self, conversation, messages: Iterable, window: int, loaded_at: float):
+        self.id = conversation.id
+        self.conversation_id = conversation.conversation_id
+        self.user_id = conversation.user_id
+        self.is_active = conversation.is_active
+        self.is_escalated = conversation.is_escalated
+        self.summary = conversation.summary
+        self.summarized_until_id = conversation.summarized_until_id
+        self.messages: Deque = deque((snapshot(m) for m in messages), maxlen=window)
+        self.loaded_at = loaded_at
+
+    def history(self, limit: int) -> List:
+        """Latest messages not folded into the summary yet, oldest first"""
+        until = self.summarized_until_id
+        recent = [m for m in self.messages if until is None or m.id is None or m.id > until]
+        return recent[-limit:] if limit > 0 else []
+
+
+def snapshot(message):
+    """
+    Detached copy of the message fields a prompt uses (ORM objects expire on
+    commit). Rows of the write-behind buffer are kept as is: their id is
+    filled in when they are written.
+    """
+    if isinstance(message, SimpleNamespace):
+        return message
+    return SimpleNamespace(
+        id=message.id, role=message.role, content=message.content, created_at=message.created_at
+    )
+
+
+class ConversationCache:
+    """LRU + TTL cache of CachedConversation entries"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        window: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = settings.AI_CONVERSATION_CACHE_ENABLED if enabled is None else enabled
+        self.max_entries = max_entries or settings.AI_CONVERSATION_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.AI_CONVERSATION_CACHE_TTL_SECONDS
+        self.window = window or settings.AI_PROMPT_HISTORY_MAX_MESSAGES
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedConversation]" = OrderedDict()
+        self._by_pk: Dict[int, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, conversation_id: str) -> Optional[CachedConversation]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        if self._clock() - entry.loaded_at > self.ttl_seconds:
+            self._drop(conversation_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(conversation_id)
+        self.hits += 1
+        return entry
+
+    def put(self, conversation, messages: Iterable) -> CachedConversation:
+        """Cache a conversation row with its latest messages (oldest first)"""
+        entry = CachedConversation(conversation, messages, self.window, self._clock())
+        if not self.enabled:
+            return entry
+        self._drop(entry.conversation_id)
+        self._entries[entry.conversation_id] = entry
+        self._by_pk[entry.id] = entry.conversation_id
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._by_pk.pop(evicted.id, None)
+            self.evictions += 1
+        return entry
+
+    def _by_primary_key(self, conversation_pk: int) -> Optional[CachedConversation]:
+        key = self._by_pk.get(conversation_pk)
+        return self._entries.get(key) if key is not None else None
+
+    # ---------- writes ----------
+
+    def append_message(self, conversation_pk: int, message) -> None:
+        """A message was stored for the conversation: add it to the window"""
+        entry = self._by_primary_key(conversation_pk)
+        if entry is not None:
+            entry.messages.append(snapshot(message))
+
+    def update_summary(self, conversation_pk: int, summary: str, summarized_until_id: int) -> None:
+        entry = self._by_primary_key(conversation_pk)
+        if entry is not None:
+            entry.summary = summary
+            entry.summarized_until_id = summarized_until_id
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Forget a conversation (escalated, ended, or a failed write)"""
+        if self._drop(conversation_id):
+            self.invalidations += 1
+
+    def _drop(self, conversation_id: str) -> bool:
+        entry = self._entries.pop(conversation_id, None)
+        if entry is None:
+            return False
+        self._by_pk.pop(entry.id, None)
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_pk.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global instance
+conversation_cache = ConversationCache()
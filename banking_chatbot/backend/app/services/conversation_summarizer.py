@@ -0,0 +1,173 @@
+# backend/app/services/conversation_summarizer.py
+"""
+Rolling conversation summaries.
+
+After each assistant reply, messages older than the live window are folded
+into a running summary stored on the conversation. Prompts then carry the
+summary plus only the recent turns, so their size stays roughly constant
+no matter how long the conversation gets.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from app.config import settings
+from app.database import get_db_context
+from app.models.db_conversation import DBConversation
+from app.models.db_message import MessageRole
+from app.repositories.conversation_repository import ConversationRepository
+from app.repositories.message_repository import MessageRepository
+from app.services.ai_service import ai_service
+from app.services.conversation_cache import conversation_cache
+from app.services.prompt_builder import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = """Resumes conversaciones de atención al cliente de JoxAI Bank.
+
+Actualiza el resumen existente incorporando los mensajes nuevos:
+- Conserva los datos relevantes: productos, montos, fechas, problemas, acuerdos y pendientes
+- Omite saludos y cortesías
+- No inventes información
+
+Responde solo con el resumen actualizado, en español, en texto plano y de forma breve."""
+
+ROLE_LABELS = {MessageRole.USER: "Cliente", MessageRole.ASSISTANT: "Asistente"}
+
+# Longest excerpt of a single message kept in a summary transcript
+_LINE_TOKENS = 150
+
+
+def format_transcript(turns: List[Dict]) -> str:
+    """Render turns as 'Cliente: ...' / 'Asistente: ...' lines"""
+    return "\n".join(
+        f"{turn['speaker']}: {truncate_to_tokens(' '.join(turn['content'].split()), _LINE_TOKENS)}"
+        for turn in turns
+    )
+
+
+def extractive_summary(previous: Optional[str], transcript: str, max_tokens: int) -> str:
+    """Fallback without an LLM: append the new lines and keep the most recent ones"""
+    lines = [line for line in (previous or "").splitlines() + transcript.splitlines() if line.strip()]
+    kept: List[str] = []
+    tokens = 0
+    for line in reversed(lines):
+        tokens += estimate_tokens(line)
+        if kept and tokens > max_tokens:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+class ConversationSummarizer:
+    """
+    Folds old messages of a conversation into its running summary.
+
+    Runs in the background after a reply; at most one summarization per
+    conversation is in flight (a reply arriving meanwhile is picked up by
+    the next run).
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        live_messages: Optional[int] = None,
+        min_batch: Optional[int] = None,
+        max_batch: Optional[int] = None,
+        max_summary_tokens: Optional[int] = None,
+    ):
+        self.enabled = settings.AI_SUMMARY_ENABLED if enabled is None else enabled
+        self.live_messages = live_messages or settings.AI_SUMMARY_LIVE_MESSAGES
+        self.min_batch = min_batch or settings.AI_SUMMARY_MIN_BATCH
+        self.max_batch = max_batch or settings.AI_SUMMARY_MAX_BATCH
+        self.max_summary_tokens = max_summary_tokens or settings.AI_SUMMARY_MAX_TOKENS
+
+        self._running: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.runs = 0
+        self.llm_summaries = 0
+        self.fallback_summaries = 0
+        self.failures = 0
+
+    def schedule(self, conversation_id: int) -> None:
+        """Summarize a conversation in the background (after its reply is committed)"""
+        if not self.enabled or conversation_id in self._running:
+            return
+        self._running.add(conversation_id)
+        task = asyncio.create_task(self._run(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, conversation_id: int) -> None:
+        try:
+            await self.summarize(conversation_id)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error summarizing conversation {conversation_id}: {e}")
+        finally:
+            self._running.discard(conversation_id)
+
+    async def summarize(self, conversation_id: int) -> bool:
+        """Fold messages older than the live window into the summary; True if updated"""
+        with get_db_context() as db:
+            conversation = db.get(DBConversation, conversation_id)
+            if not conversation:
+                return False
+            previous = conversation.summary
+            until_id = conversation.summarized_until_id
+            messages = MessageRepository(db).get_after(
+                conversation_id, after_id=until_id, limit=self.max_batch + self.live_messages
+            )
+            pending = messages[:-self.live_messages] if len(messages) > self.live_messages else []
+            if len(pending) < self.min_batch:
+                return False
+            turns = [
+                {"speaker": ROLE_LABELS[msg.role], "content": msg.content}
+                for msg in pending
+                if msg.role in ROLE_LABELS and not msg.is_internal and msg.content
+            ]
+            last_id = pending[-1].id
+
+        self.runs += 1
+        transcript = format_transcript(turns)
+        summary = None
+        if transcript:
+            summary = await ai_service.complete_text(
+                f"Resumen actual:\n{previous or '(vacío)'}\n\nMensajes nuevos:\n{transcript}",
+                SUMMARY_SYSTEM_PROMPT,
+            )
+        if summary:
+            self.llm_summaries += 1
+            summary = truncate_to_tokens(summary, self.max_summary_tokens)
+        else:
+            self.fallback_summaries += 1
+            summary = extractive_summary(previous, transcript, self.max_summary_tokens)
+
+        with get_db_context() as db:
+            updated = ConversationRepository(db).update_summary(
+                conversation_id, summary, summarized_until_id=last_id, expected_until_id=until_id
+            )
+        if updated:
+            conversation_cache.update_summary(conversation_id, summary, last_id)
+        return updated
+
+    async def shutdown(self) -> None:
+        """Wait for in-flight summaries (called from the app lifespan)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "live_messages": self.live_messages,
+            "in_flight": len(self._running),
+            "runs": self.runs,
+            "llm_summaries": self.llm_summaries,
+            "fallback_summaries": self.fallback_summaries,
+            "failures": self.failures,
+        }
+
+
+# Global instance
+conversation_summarizer = ConversationSummarizer()
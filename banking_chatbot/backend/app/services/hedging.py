@@ -0,0 +1,191 @@
+# backend/app/services/hedging.py
+"""
+Tail-latency controls for provider calls: hedged requests and retries.
+
+Hedging: when an attempt has not answered (or, when streaming, produced
+its first event) after the provider's recent p95 latency, a second
+identical request is sent and whichever answers first wins; the other is
+cancelled. Only ~5% of calls should ever be hedged, so the extra load is
+small while the slowest responses are cut short.
+
+Retries: retryable errors (429, 5xx, connection errors) are retried after
+a jittered exponential backoff ("full jitter": a random delay between 0
+and base * 2^attempt, capped), which spreads retries out instead of
+having every worker hit the provider again at the same moment.
+"""
+
+import asyncio
+import random
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class RetryPolicy:
+    """Number of retries and jittered exponential backoff between them"""
+
+    def __init__(
+        self,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.max_retries = settings.AI_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = settings.AI_RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+        self.max_delay = settings.AI_RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self._random = random.Random(seed)
+        self.retries = 0
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number attempt + 1 (attempt starts at 0)"""
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def backoff(self, attempt: int) -> None:
+        self.retries += 1
+        await asyncio.sleep(self.delay(attempt))
+
+    def stats(self) -> Dict:
+        return {
+            "max_retries": self.max_retries,
+            "base_delay": self.base_delay,
+            "max_delay": self.max_delay,
+            "retries": self.retries,
+        }
+
+
+async def _first_success(tasks: List[asyncio.Future], is_failure: Callable[[T], bool]) -> asyncio.Future:
+    """First task to finish with a usable result (or the last one to fail)"""
+    pending = set(tasks)
+    while True:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finished = sorted(done, key=tasks.index)
+        for task in finished:
+            if task.exception() is None and not is_failure(task.result()):
+                return task
+        if not pending:
+            return finished[-1]
+
+
+async def _cancel(task: asyncio.Future) -> None:
+    if not task.done():
+        task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+class Hedger:
+    """Hedging policy plus counters (the hedge rate is hedged / calls)"""
+
+    def __init__(self, enabled: Optional[bool] = None, min_delay: Optional[float] = None):
+        self.enabled = settings.AI_HEDGE_ENABLED if enabled is None else enabled
+        self.min_delay = settings.AI_HEDGE_MIN_DELAY_SECONDS if min_delay is None else min_delay
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped_no_capacity = 0
+
+    def delay_for(self, p95: Optional[float]) -> Optional[float]:
+        """Seconds to wait before hedging (None: do not hedge)"""
+        if not self.enabled or p95 is None:
+            return None
+        return max(p95, self.min_delay)
+
+    def _take_slot(self, bulkhead) -> bool:
+        """Hedges only use spare capacity: no slot, no hedge"""
+        if bulkhead is None or bulkhead.try_acquire():
+            self.hedged += 1
+            return True
+        self.skipped_no_capacity += 1
+        return False
+
+    async def call(
+        self,
+        make_call: Callable[[], Awaitable[T]],
+        delay: Optional[float],
+        is_failure: Callable[[T], bool],
+        bulkhead=None,
+    ) -> T:
+        """
+        Await make_call(); if it has not finished after delay seconds, start
+        a second make_call() (in a free bulkhead slot) and return the first
+        usable result.
+        """
+        self.calls += 1
+        tasks = [asyncio.ensure_future(make_call())]
+        hedge_slot = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._take_slot(bulkhead):
+                    hedge_slot = bulkhead is not None
+                    tasks.append(asyncio.ensure_future(make_call()))
+            winner = await _first_success(tasks, is_failure)
+            if winner is not tasks[0]:
+                self.hedge_wins += 1
+            return winner.result()
+        finally:
+            for task in tasks:
+                await _cancel(task)
+            if hedge_slot:
+                bulkhead.release()
+
+    async def stream(
+        self,
+        open_stream: Callable[[], AsyncIterator[T]],
+        delay: Optional[float],
+        is_failure: Callable[[T], bool],
+        bulkhead=None,
+    ) -> AsyncIterator[T]:
+        """
+        Streaming variant: the race is for the first event, after which
+        the winning stream is relayed and the other one is closed.
+        """
+        self.calls += 1
+        streams = [open_stream()]
+        tasks = [asyncio.ensure_future(streams[0].__anext__())]
+        hedge_slot = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._take_slot(bulkhead):
+                    hedge_slot = bulkhead is not None
+                    streams.append(open_stream())
+                    tasks.append(asyncio.ensure_future(streams[1].__anext__()))
+            first = await _first_success(tasks, is_failure)
+            winner = streams[tasks.index(first)]
+            if winner is not streams[0]:
+                self.hedge_wins += 1
+            for task, stream in zip(tasks, streams):
+                if stream is not winner:
+                    await _cancel(task)
+                    await stream.aclose()
+            if hedge_slot:
+                # Only one request is left in flight
+                hedge_slot = False
+                bulkhead.release()
+
+            yield first.result()
+            async for event in winner:
+                yield event
+        finally:
+            for task, stream in zip(tasks, streams):
+                await _cancel(task)
+                await stream.aclose()
+            if hedge_slot:
+                bulkhead.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "min_delay": self.min_delay,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped_no_capacity": self.skipped_no_capacity,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+        }
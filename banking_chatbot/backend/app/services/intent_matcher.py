@@ -0,0 +1,180 @@
+# backend/app/services/intent_matcher.py
+"""
+Single-pass keyword matcher for intents and escalation requests.
+
+All keywords of the intent table are compiled into one regular expression,
+so a message is scanned once no matter how many intents exist (instead of
+one substring check per keyword). The alternation is factored as a trie
+(shared prefixes are tested once), which keeps the cost nearly flat as the
+table grows; see benchmarks/bench_intent_matcher.py. Accents are folded into
+the pattern ("e" compiles to a class with "é", "è", ...) rather than out of
+each message, so a message only needs to be lowercased before scanning.
+
+Matching is case-insensitive and accent-insensitive ("crédito" ==
+"credito"), and keywords match at the start of a word, so "tarjeta" also
+finds "tarjetas". Matches may overlap: the pattern is a lookahead tried at
+every word start, and the keywords a longer match starts with are reported
+too, so "tarjeta de crédito" finds "tarjeta de credito", "tarjeta" and
+"credito" when all three are keywords.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+
+
+def _build_fold_table() -> Dict[int, str]:
+    """One-to-one lowercase + accent folding for Latin letters (keeps string offsets intact)"""
+    table = {code: chr(code).lower() for code in range(ord("A"), ord("Z") + 1)}
+    for code in range(0xC0, 0x250):
+        decomposed = unicodedata.normalize("NFKD", chr(code).lower())
+        base = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+        if len(base) == 1 and base != chr(code):
+            table[code] = base
+    return table
+
+
+_FOLD = _build_fold_table()
+
+# Base letter -> every lowercase Latin letter folding to it ("e" -> "eéèêë...")
+_VARIANTS: Dict[str, str] = {}
+for _code, _base in _FOLD.items():
+    if chr(_code).islower():
+        _VARIANTS[_base] = _VARIANTS.get(_base, _base) + chr(_code)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip accents without changing the length of the text"""
+    return text.translate(_FOLD)
+
+
+def _canonical(keyword: str) -> str:
+    return " ".join(fold_text(keyword).split())
+
+
+def _char_pattern(ch: str) -> str:
+    if ch == " ":
+        return r"\s+"
+    if ch in _VARIANTS:
+        return "[" + re.escape(_VARIANTS[ch]) + "]"
+    return re.escape(ch)
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex alternation of the keywords, factored by common prefixes"""
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [
+            _char_pattern(ch) + emit(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        # A keyword ending here makes the rest optional; regex quantifiers are
+        # greedy, so the longest keyword still wins
+        return group + "?" if "" in node else group
+
+    return emit(trie)
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    keyword: str
+    start: int
+    end: int
+
+
+class IntentMatcher:
+    """
+    Matches messages against an intent -> keywords table.
+
+    The table order is the intent priority used by best().
+    """
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self.intents = list(table)
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+        self._by_keyword: Dict[str, List[str]] = {}
+        for intent, keywords in table.items():
+            for keyword in keywords:
+                canonical = _canonical(keyword)
+                if canonical and intent not in self._by_keyword.setdefault(canonical, []):
+                    self._by_keyword[canonical].append(intent)
+
+        # Zero-width, so the scan resumes at the next word start instead of after the match
+        self._pattern = re.compile(r"\b(?=(" + _trie_pattern(self._by_keyword) + "))") if self._by_keyword else None
+
+        # Keyword -> shorter keywords it starts with ("hablar con alguien" -> ["hablar"]):
+        # the pattern only returns the longest keyword at each position
+        self._prefixes: Dict[str, List[str]] = {}
+        for keyword in self._by_keyword:
+            prefixes = [keyword[:i] for i in range(1, len(keyword)) if keyword[:i] in self._by_keyword]
+            if prefixes:
+                self._prefixes[keyword] = prefixes
+        self._prefix_patterns = {
+            prefix: re.compile(_trie_pattern([prefix]))
+            for prefixes in self._prefixes.values()
+            for prefix in prefixes
+        }
+
+    def _keywords(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """(keyword, start, end) of every keyword occurrence, overlapping ones included"""
+        if not self._pattern or not text:
+            return
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to several ("İ"); keep offsets exact
+            lowered = fold_text(text)
+        for match in self._pattern.finditer(lowered):
+            start, end = match.span(1)
+            keyword = _canonical(match.group(1))
+            for prefix in self._prefixes.get(keyword, ()):
+                yield prefix, start, self._prefix_patterns[prefix].match(lowered, start).end()
+            yield keyword, start, end
+
+    def find_all(self, text: str) -> List[IntentMatch]:
+        """Every keyword occurrence with its intent and position in the original text"""
+        return [
+            IntentMatch(intent, keyword, start, end)
+            for keyword, start, end in self._keywords(text)
+            for intent in self._by_keyword[keyword]
+        ]
+
+    def match_intents(self, text: str) -> List[str]:
+        """Distinct matched intents, highest priority first"""
+        found = {m.intent for m in self.find_all(text)}
+        return sorted(found, key=self._priority.__getitem__)
+
+    def best(self, text: str) -> Optional[str]:
+        """Highest-priority matched intent, if any"""
+        best = None
+        for keyword, _, _ in self._keywords(text):
+            for intent in self._by_keyword[keyword]:
+                if best is None or self._priority[intent] < self._priority[best]:
+                    best = intent
+        return best
+
+    def matches_any(self, text: str, intents: Iterable[str]) -> bool:
+        """Whether the text mentions any of the given intents"""
+        wanted = set(intents)
+        return any(
+            intent in wanted
+            for keyword, _, _ in self._keywords(text)
+            for intent in self._by_keyword[keyword]
+        )
+
+
+# Global instance (intent table from settings)
+intent_matcher = IntentMatcher(settings.AI_INTENT_KEYWORDS)
@@ -0,0 +1,306 @@
+# backend/app/services/knowledge_retriever.py
+"""
+Retrieval of knowledge-base articles for the chat prompt.
+
+Active articles live in an in-process index (BM25 over accent-folded
+words, or cosine similarity over local embeddings with
+AI_RAG_INDEX=vector, see vector_index.py): it is loaded at startup, updated by the knowledge API on every
+write and reloaded periodically to pick up writes made by other workers.
+A lookup only walks the postings of the query words, so it stays far
+below the 5 ms budget of the chat pipeline even with thousands of
+articles (see benchmarks/bench_knowledge_retrieval.py).
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.provider_router import percentile
+from app.services.text_analysis import STOPWORDS, tokenize  # noqa: F401  (re-exported)
+from app.services.vector_index import VectorIndex, text_hash
+
+logger = logging.getLogger(__name__)
+
+
+def article_text(article: Dict) -> str:
+    """Indexed text of an article: the title counts twice"""
+    tags = " ".join(article.get("tags") or [])
+    return f"{article['title']} {article['title']} {tags} {article.get('category') or ''} {article['content']}"
+
+
+class LexicalIndex:
+    """
+    Okapi BM25 over an inverted index, with incremental updates.
+
+    Words present in almost every article (idf below MIN_IDF) barely change
+    the ranking but have the longest posting lists, so they are skipped.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MIN_IDF = 0.2
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._hashes: Dict[int, int] = {}
+        self._total_length = 0
+        self._norms: Optional[Dict[int, float]] = None
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def upsert(self, doc_id: int, text: str) -> None:
+        self.remove(doc_id)
+        terms = tokenize(text)
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+        self._doc_terms[doc_id] = set(terms)
+        self._lengths[doc_id] = len(terms)
+        self._hashes[doc_id] = text_hash(text)
+        self._total_length += len(terms)
+        self._norms = None
+
+    def remove(self, doc_id: int) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        self._hashes.pop(doc_id, None)
+        self._norms = None
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def sync(self, docs: Dict[int, str]) -> None:
+        """Make the index match docs (id -> text), re-indexing only changed texts"""
+        for doc_id in [doc_id for doc_id in self._lengths if doc_id not in docs]:
+            self.remove(doc_id)
+        for doc_id, text in docs.items():
+            if self._hashes.get(doc_id) != text_hash(text):
+                self.upsert(doc_id, text)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, score) pairs, best first"""
+        if not self._lengths:
+            return []
+        n = len(self._lengths)
+        norms = self._length_norms()
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if idf < self.MIN_IDF:
+                continue
+            weight = idf * (self.K1 + 1)
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def _length_norms(self) -> Dict[int, float]:
+        """Per-document length normalization (recomputed after writes)"""
+        if self._norms is None:
+            avg_length = self._total_length / len(self._lengths) or 1.0
+            self._norms = {
+                doc_id: self.K1 * (1 - self.B + self.B * length / avg_length)
+                for doc_id, length in self._lengths.items()
+            }
+        return self._norms
+
+
+class KnowledgeRetriever:
+    """Keeps the index of active articles and returns the best ones for a message"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None,
+        refresh_seconds: Optional[float] = None,
+        index: Optional[str] = None,
+        index_path: Optional[str] = None,
+    ):
+        self.enabled = settings.AI_RAG_ENABLED if enabled is None else enabled
+        self.top_k = top_k or settings.AI_RAG_TOP_K
+        self.refresh_seconds = refresh_seconds or settings.AI_RAG_REFRESH_SECONDS
+        self.index_type = index or settings.AI_RAG_INDEX
+
+        # BM25 scores and cosine similarities live on different scales
+        if self.index_type == "vector":
+            self.index = VectorIndex(path=index_path or settings.AI_VECTOR_INDEX_PATH)
+            default_min_score = settings.AI_VECTOR_MIN_SCORE
+        else:
+            self.index = LexicalIndex()
+            default_min_score = settings.AI_RAG_MIN_SCORE
+        self.min_score = default_min_score if min_score is None else min_score
+
+        self.articles: Dict[int, Dict] = {}
+        self.loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._timings: Deque[float] = deque(maxlen=500)
+
+        self.retrievals = 0
+        self.hits = 0
+
+    # ---------- index maintenance ----------
+
+    @staticmethod
+    def _as_dict(article) -> Dict:
+        """Plain copy of an ORM article (safe to keep after the session closes)"""
+        return {
+            "id": article.id,
+            "title": article.title,
+            "content": article.content,
+            "category": article.category,
+            "tags": list(article.tags or []),
+        }
+
+    def upsert(self, article) -> None:
+        """Index a created/updated article (inactive articles are dropped)"""
+        if not article.is_active:
+            self.remove(article.id)
+            return
+        data = self._as_dict(article)
+        self.articles[data["id"]] = data
+        self.index.upsert(data["id"], article_text(data))
+
+    def remove(self, article_id: int) -> None:
+        self.articles.pop(article_id, None)
+        self.index.remove(article_id)
+
+    def load(self, articles: Iterable) -> None:
+        """Make the index match the given articles (inactive ones are dropped)"""
+        self._apply({
+            article.id: self._as_dict(article)
+            for article in articles
+            if article.is_active
+        })
+
+    def _apply(self, fresh: Dict[int, Dict]) -> None:
+        """
+        Sync the index with a full set of active articles.
+
+        Only new or changed articles are re-indexed. Runs on the event loop
+        thread, like every other index write, so searches never see an
+        index that is being modified. When an article was added, changed or
+        removed by another worker, cached AI answers are dropped too: they
+        may quote the old article (the worker that made the write has
+        already dropped its own).
+        """
+        changed = self.loaded_at is not None and fresh != self.articles
+        self.index.sync({doc_id: article_text(data) for doc_id, data in fresh.items()})
+        self.articles = fresh
+        self.loaded_at = time.time()
+        if changed:
+            from app.services.ai_service import ai_service
+
+            ai_service.cache.invalidate()
+
+    def fetch(self) -> Dict[int, Dict]:
+        """Every active article in the database, as plain dicts"""
+        from app.database import get_db_context
+        from app.repositories.knowledge_base_repository import KnowledgeBaseRepository
+
+        with get_db_context() as db:
+            articles = KnowledgeBaseRepository(db).get_all_active(limit=settings.AI_RAG_MAX_ARTICLES)
+            return {article.id: self._as_dict(article) for article in articles}
+
+    def reload(self) -> None:
+        """Load every active article from the database"""
+        self._apply(self.fetch())
+        logger.info(f"Knowledge index loaded with {len(self.articles)} articles")
+
+    async def start(self) -> None:
+        """Initial load and periodic refresh (called from the app lifespan)"""
+        if not self.enabled:
+            return
+        await self._refresh()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        await self._persist()
+
+    async def _refresh(self) -> None:
+        try:
+            fresh = await asyncio.to_thread(self.fetch)
+        except Exception as e:
+            logger.warning(f"Could not load the knowledge index: {e}")
+            return
+        self._apply(fresh)
+        logger.info(f"Knowledge index loaded with {len(self.articles)} articles")
+        await self._persist()
+
+    async def _persist(self) -> None:
+        """Save changed vectors to disk (the copy is taken here, the write runs in a thread)"""
+        if not isinstance(self.index, VectorIndex) or not self.index.path or not self.index.dirty:
+            return
+        snapshot = self.index.snapshot()
+        try:
+            await asyncio.to_thread(self.index.write, snapshot)
+        except OSError as e:
+            self.index.dirty = True
+            logger.warning(f"Could not save the vector index: {e}")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._refresh()
+
+    # ---------- retrieval ----------
+
+    def retrieve(self, query: str, k: Optional[int] = None, category: Optional[str] = None) -> List[Dict]:
+        """Best matching active articles for a message, with their scores"""
+        if not self.enabled or not query:
+            return []
+        started = time.perf_counter()
+        k = k or self.top_k
+        # With a category filter, look further down the ranking for k matches
+        candidates = self.index.search(query, k * 10 if category else k)
+        results = [
+            {**self.articles[doc_id], "score": round(score, 4)}
+            for doc_id, score in candidates
+            if score >= self.min_score
+            and doc_id in self.articles
+            and (category is None or self.articles[doc_id]["category"] == category)
+        ][:k]
+        self._timings.append(time.perf_counter() - started)
+        self.retrievals += 1
+        self.hits += bool(results)
+        return results
+
+    def stats(self) -> Dict:
+        timings = list(self._timings)
+        p95 = percentile(timings, 95)
+        return {
+            "enabled": self.enabled,
+            "index": self.index_type,
+            "articles": len(self.articles),
+            "loaded_at": self.loaded_at,
+            "retrievals": self.retrievals,
+            "hits": self.hits,
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+            **({"vectors": self.index.stats()} if isinstance(self.index, VectorIndex) else {}),
+        }
+
+
+# Global instance
+knowledge_retriever = KnowledgeRetriever()
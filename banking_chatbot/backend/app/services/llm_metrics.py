@@ -0,0 +1,122 @@
+# backend/app/services/llm_metrics.py
+"""
+Per-call instrumentation of LLM providers.
+
+Every provider attempt (retries included) records its latency, time to
+first token, token usage and cost in the metrics registry, labelled by
+provider, model and outcome ("ok" or the error code). The figures of the
+answer are also added to the response metadata (latency_ms, ttft_ms,
+cost_usd) so the chat API can add them to the conversation totals.
+
+Time to first token is measured on the first streamed token; a
+non-streaming call delivers every token at once, so it equals the total
+latency there.
+"""
+
+from typing import Dict, Optional
+
+from app.config import settings
+from app.core.metrics import MetricsRegistry, metrics
+
+# Token counts in usage metadata -> "type" label of llm_tokens_total
+TOKEN_TYPES = ("input", "output", "cache_read", "cache_write")
+
+
+def call_cost(pricing: Dict[str, float], usage: Dict) -> float:
+    """
+    Cost in USD of one call. Prices are per million tokens; input_tokens
+    includes the cached parts, which are billed at their own price.
+    """
+    cache_read = usage.get("cache_read_tokens") or 0
+    cache_write = usage.get("cache_write_tokens") or 0
+    uncached = max(0, (usage.get("input_tokens") or 0) - cache_read - cache_write)
+    return (
+        uncached * pricing.get("input", 0.0)
+        + cache_read * pricing.get("cache_read", pricing.get("input", 0.0))
+        + cache_write * pricing.get("cache_write", pricing.get("input", 0.0))
+        + (usage.get("output_tokens") or 0) * pricing.get("output", 0.0)
+    ) / 1_000_000
+
+
+class LLMMetrics:
+    """Records provider calls into the registry and annotates their metadata"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, pricing: Optional[Dict] = None):
+        registry = registry or metrics
+        self.pricing = settings.AI_MODEL_PRICING if pricing is None else pricing
+
+        labels = ("provider", "model", "outcome")
+        self.calls = registry.counter("llm_calls_total", "LLM provider calls", labels)
+        self.latency = registry.histogram(
+            "llm_request_duration_seconds", "Total latency of LLM provider calls", labels
+        )
+        self.ttft = registry.histogram(
+            "llm_time_to_first_token_seconds", "Time to the first token of successful LLM calls",
+            ("provider", "model"),
+        )
+        self.tokens = registry.counter(
+            "llm_tokens_total", "Tokens reported by LLM providers", ("provider", "model", "type")
+        )
+        self.cost = registry.counter(
+            "llm_cost_usd_total", "Cost of LLM provider calls (AI_MODEL_PRICING)", ("provider", "model")
+        )
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        response: Dict,
+        latency: float,
+        ttft: Optional[float] = None,
+    ) -> None:
+        """Record one finished call; successful calls get latency_ms/ttft_ms/cost_usd metadata"""
+        metadata = response.setdefault("metadata", {})
+        outcome = metadata.get("error") or "ok"
+        self.calls.inc(provider=provider, model=model, outcome=outcome)
+        self.latency.observe(latency, provider=provider, model=model, outcome=outcome)
+        if outcome != "ok":
+            return
+
+        ttft = latency if ttft is None else ttft
+        self.ttft.observe(ttft, provider=provider, model=model)
+        metadata["latency_ms"] = round(latency * 1000, 1)
+        metadata["ttft_ms"] = round(ttft * 1000, 1)
+
+        usage = metadata.get("usage")
+        if not usage:
+            return
+        for token_type in TOKEN_TYPES:
+            count = usage.get(f"{token_type}_tokens") or 0
+            if count:
+                self.tokens.inc(count, provider=provider, model=model, type=token_type)
+        pricing = self.pricing.get(model)
+        if pricing:
+            cost = call_cost(pricing, usage)
+            self.cost.inc(cost, provider=provider, model=model)
+            metadata["cost_usd"] = round(cost, 8)
+
+    def stats(self) -> Dict:
+        """Per provider/model: calls by outcome, average latency and TTFT, tokens and cost"""
+        summary: Dict[str, Dict] = {}
+
+        def entry(sample: Dict) -> Dict:
+            return summary.setdefault(f"{sample['provider']}/{sample['model']}", {
+                "calls": {}, "tokens": {}, "cost_usd": 0.0
+            })
+
+        for sample in self.calls.snapshot():
+            entry(sample)["calls"][sample["outcome"]] = int(sample["value"])
+        for sample in self.latency.snapshot():
+            if sample["outcome"] == "ok":
+                entry(sample)["avg_latency_ms"] = round(sample["avg"] * 1000, 1)
+        for sample in self.ttft.snapshot():
+            entry(sample)["avg_ttft_ms"] = round(sample["avg"] * 1000, 1)
+        for sample in self.tokens.snapshot():
+            entry(sample)["tokens"][sample["type"]] = int(sample["value"])
+        for sample in self.cost.snapshot():
+            entry(sample)["cost_usd"] = round(sample["value"], 6)
+        return summary
+
+
+# Global instance
+llm_metrics = LLMMetrics()
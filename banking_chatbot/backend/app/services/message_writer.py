@@ -0,0 +1,274 @@
+# backend/app/services/message_writer.py
+"""
+Write-behind persistence of chat messages.
+
+With AI_MESSAGE_WRITE_BEHIND enabled, the chat endpoints hand user and
+assistant messages to this buffer instead of inserting them in the request.
+A single background task writes the buffer in multi-row INSERTs every
+AI_MESSAGE_FLUSH_MS milliseconds, or as soon as AI_MESSAGE_FLUSH_ROWS
+messages are waiting, so the response no longer waits for the inserts.
+
+Guarantees:
+
+- Order: there is one FIFO queue and one writer, so the messages of a
+  conversation are inserted in the order they were accepted. created_at is
+  set when the message is accepted (UTC, like the database clock) and kept
+  strictly increasing per conversation, so ordering by created_at or by id
+  gives the same result.
+- Read-your-writes: pending(conversation_pk) returns what is not in the
+  database yet; the history reads merge it with the rows they load
+  (merge_pending), so a message is visible as soon as it is accepted.
+- Durability: stop() (app shutdown) writes everything still buffered. A
+  failed batch is kept at the head of the queue and retried. A process
+  crash loses at most the messages of the last few milliseconds.
+- Poison rows: a batch that fails AI_MESSAGE_FLUSH_ATTEMPTS times in a row
+  is written row by row, and rows that still fail (e.g. their conversation
+  was deleted) are logged and dropped, so they cannot hold back the rest of
+  the queue. While the database itself is unreachable nothing is dropped.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.config import settings
+from app.database import get_db_context
+from app.models.db_message import DBMessage, MessageRole
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """In-process write-behind buffer for message inserts"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        flush_ms: Optional[float] = None,
+        flush_rows: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.enabled = settings.AI_MESSAGE_WRITE_BEHIND if enabled is None else enabled
+        self.flush_seconds = (flush_ms or settings.AI_MESSAGE_FLUSH_MS) / 1000
+        self.flush_rows = flush_rows or settings.AI_MESSAGE_FLUSH_ROWS
+        self.max_attempts = max_attempts or settings.AI_MESSAGE_FLUSH_ATTEMPTS
+
+        self._queue: Deque[SimpleNamespace] = deque()
+        # conversation pk -> rows accepted but not committed yet (queued or being written)
+        self._pending: Dict[int, List[SimpleNamespace]] = {}
+        self._last_created: Dict[int, datetime] = {}
+        # Created on the running loop (_bind): each app lifespan has its own
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Consecutive failures of the batch at the head of the queue
+        self._attempts = 0
+
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.max_batch = 0
+        self.flush_ms_total = 0.0
+
+    def add(
+        self,
+        conversation_pk: int,
+        role: MessageRole,
+        content: str,
+        message_metadata: Optional[dict] = None,
+    ) -> SimpleNamespace:
+        """Buffer a message; returns its row (id is filled in once written)"""
+        created_at = datetime.utcnow()
+        last = self._last_created.get(conversation_pk)
+        if last is not None and created_at <= last:
+            created_at = last + timedelta(microseconds=1)
+        self._last_created[conversation_pk] = created_at
+
+        # Same attributes as a DBMessage, so readers can mix both
+        row = SimpleNamespace(
+            id=None,
+            conversation_id=conversation_pk,
+            role=role,
+            content=content,
+            # A copy: the caller's dict must not change a row that is still buffered
+            message_metadata=copy.deepcopy(message_metadata),
+            is_internal=False,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        self._queue.append(row)
+        self._pending.setdefault(conversation_pk, []).append(row)
+        if len(self._queue) >= self.flush_rows and self._wakeup is not None:
+            self._wakeup.set()
+        return row
+
+    def pending(self, conversation_pk: int) -> List[SimpleNamespace]:
+        """Rows of a conversation not written yet, oldest first"""
+        return list(self._pending.get(conversation_pk, ()))
+
+    # ---------- writing ----------
+
+    def _bind(self) -> None:
+        """Event and lock of the running loop (a new lifespan runs on a new loop)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+
+    def _insert(self, batch: List[SimpleNamespace]) -> None:
+        """One multi-row INSERT for the batch; fills in the generated ids"""
+        columns = ("conversation_id", "role", "content", "message_metadata", "is_internal", "created_at", "updated_at")
+        with get_db_context() as db:
+            result = db.execute(
+                insert(DBMessage).returning(DBMessage.id, sort_by_parameter_order=True),
+                [{column: getattr(row, column) for column in columns} for row in batch],
+            )
+            ids = result.scalars().all()
+            # Set before the commit: once a row is visible in the database,
+            # readers can tell its buffered copy apart by id
+            for row, message_id in zip(batch, ids):
+                row.id = message_id
+
+    def _settled(self, batch: List[SimpleNamespace]) -> None:
+        """The rows are no longer pending (written or dropped)"""
+        for row in batch:
+            rows = self._pending.get(row.conversation_id)
+            if rows:
+                rows.remove(row)
+                if not rows:
+                    del self._pending[row.conversation_id]
+                    self._last_created.pop(row.conversation_id, None)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far (in batches of flush_rows); returns rows written"""
+        written = 0
+        self._bind()
+        async with self._lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.flush_rows, len(self._queue)))]
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._insert, batch)
+                except Exception as e:
+                    for row in batch:
+                        row.id = None
+                    self.failures += 1
+                    self._attempts += 1
+                    if self._attempts < self.max_attempts:
+                        self._queue.extendleft(reversed(batch))
+                        raise
+                    self._attempts = 0
+                    logger.warning(f"A batch of {len(batch)} messages failed {self.max_attempts} times, writing it row by row: {e}")
+                    written += await self._write_rows(batch)
+                    continue
+                self._attempts = 0
+                self.flush_ms_total += (time.perf_counter() - started) * 1000
+                self._settled(batch)
+                written += len(batch)
+                self.written += len(batch)
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(batch))
+        return written
+
+    async def _write_rows(self, batch: List[SimpleNamespace]) -> int:
+        """Insert a failing batch one row at a time, dropping the rows that cannot be written"""
+        written = 0
+        for i, row in enumerate(batch):
+            try:
+                await asyncio.to_thread(self._insert, [row])
+            except (OperationalError, InterfaceError):
+                # The database is unreachable, not the row: retry the rest later
+                for pending in batch[i:]:
+                    pending.id = None
+                self._queue.extendleft(reversed(batch[i:]))
+                raise
+            except Exception as e:
+                row.id = None
+                self.dropped += 1
+                logger.error(
+                    f"Dropping a {row.role} message of conversation {row.conversation_id} "
+                    f"created at {row.created_at} that cannot be written: {e}"
+                )
+            else:
+                written += 1
+                self.written += 1
+            self._settled([row])
+        return written
+
+    async def start(self) -> None:
+        """Start the background writer (called from the app lifespan)"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._bind()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the background writer and write what is still buffered"""
+        if self._task is not None:
+            # Let a batch in progress finish instead of cancelling it mid-insert
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        # Up to max_attempts flushes, so a poison row is dropped instead of the whole buffer
+        for attempt in range(1, self.max_attempts + 1):
+            if not self._queue:
+                break
+            try:
+                written = await self.flush()
+                logger.info(f"Message buffer flushed on shutdown: {written} messages")
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Could not write {len(self._queue)} buffered messages on shutdown: {e}")
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._queue or self._stopping:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Could not write {len(self._queue)} buffered messages, retrying: {e}")
+                await asyncio.sleep(min(1.0, self.flush_seconds * 10))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._queue),
+            "written": self.written,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "avg_flush_ms": round(self.flush_ms_total / self.batches, 2) if self.batches else 0.0,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+
+def merge_pending(rows: List, pending: List[SimpleNamespace]) -> List:
+    """
+    Database rows of a conversation followed by its buffered messages, minus
+    buffered ones the rows already include (written while they were read).
+    """
+    seen = {row.id for row in rows}
+    return list(rows) + [row for row in pending if row.id is None or row.id not in seen]
+
+
+# Global instance
+message_writer = MessageWriter()
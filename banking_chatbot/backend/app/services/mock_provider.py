@@ -0,0 +1,180 @@
+# backend/app/services/mock_provider.py
+"""
+Latency simulation for the mock AI provider.
+
+With AI_PROVIDER=mock the canned answers are returned instantly, which
+hides how the app behaves while hundreds of requests wait on a slow LLM.
+A MockLatencyProfile adds realistic timing on top of those answers:
+time-to-first-token drawn from a fixed, normal or long-tail (lognormal)
+distribution, a per-token streaming cadence, and a configurable share of
+server errors, rate limits (429) and timeouts.
+
+Only the mock *provider* is simulated; the mock used as a last-resort
+fallback for real providers always answers immediately.
+"""
+
+import asyncio
+import math
+import random
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+
+LATENCY_MODES = ["none", "fixed", "normal", "long_tail"]
+
+_TOKENS = re.compile(r"\S+\s*|\s+")
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split a canned answer into word-sized streaming tokens"""
+    return _TOKENS.findall(text)
+
+
+class MockLatencyProfile:
+    """
+    Timing and failure model applied to mock responses.
+
+    latency_ms is the fixed / mean / median time to first token depending
+    on the mode; each generated token then takes token_interval_ms, both
+    when streaming and (in total) for regular responses.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        latency_ms: Optional[float] = None,
+        stddev_ms: Optional[float] = None,
+        tail_sigma: Optional[float] = None,
+        token_interval_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        timeout_rate: Optional[float] = None,
+        timeout_seconds: Optional[float] = None,
+        seed: Optional[int] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.mode = (mode or settings.AI_MOCK_LATENCY_MODE).lower()
+        if self.mode not in LATENCY_MODES:
+            raise ValueError(f"Unknown mock latency mode: {self.mode} (expected one of {LATENCY_MODES})")
+        self.latency_ms = settings.AI_MOCK_LATENCY_MS if latency_ms is None else latency_ms
+        self.stddev_ms = settings.AI_MOCK_LATENCY_STDDEV_MS if stddev_ms is None else stddev_ms
+        self.tail_sigma = settings.AI_MOCK_LATENCY_TAIL_SIGMA if tail_sigma is None else tail_sigma
+        self.token_interval_ms = settings.AI_MOCK_TOKEN_INTERVAL_MS if token_interval_ms is None else token_interval_ms
+        self.error_rate = settings.AI_MOCK_ERROR_RATE if error_rate is None else error_rate
+        self.rate_limit_rate = settings.AI_MOCK_RATE_LIMIT_RATE if rate_limit_rate is None else rate_limit_rate
+        self.timeout_rate = settings.AI_MOCK_TIMEOUT_RATE if timeout_rate is None else timeout_rate
+        self.timeout_seconds = timeout_seconds or settings.AI_REQUEST_TIMEOUT
+        self._random = random.Random(settings.AI_MOCK_SEED if seed is None else seed)
+        self._sleep = sleep
+
+        self.outcomes = {"ok": 0, "error": 0, "rate_limited": 0, "timeout": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any timing or failure simulation is configured"""
+        return (
+            self.mode != "none"
+            or self.token_interval_ms > 0
+            or self.error_rate + self.rate_limit_rate + self.timeout_rate > 0
+        )
+
+    def sample_latency(self) -> float:
+        """Time to first token in seconds"""
+        if self.mode == "fixed":
+            ms = self.latency_ms
+        elif self.mode == "normal":
+            ms = self._random.gauss(self.latency_ms, self.stddev_ms)
+        elif self.mode == "long_tail":
+            ms = self._random.lognormvariate(math.log(max(self.latency_ms, 1e-3)), self.tail_sigma)
+        else:
+            ms = 0.0
+        return max(ms, 0.0) / 1000
+
+    def sample_outcome(self) -> str:
+        """Pick ok / error / rate_limited / timeout according to the configured rates"""
+        roll = self._random.random()
+        for outcome, rate in (
+            ("timeout", self.timeout_rate),
+            ("rate_limited", self.rate_limit_rate),
+            ("error", self.error_rate),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    def _failure(self, outcome: str) -> Dict:
+        """Error response shaped like the real providers' errors"""
+        if outcome == "timeout":
+            return {
+                "content": f"Error: Timeout al contactar a Mock API ({self.timeout_seconds:.0f}s)",
+                "metadata": {"error": "timeout", "simulated": True}
+            }
+        if outcome == "rate_limited":
+            return {
+                "content": "Error de IA: Límite de solicitudes alcanzado (simulado)",
+                "metadata": {"error": "api_error", "status": 429, "simulated": True}
+            }
+        return {
+            "content": "Error de IA: Error interno del proveedor (simulado)",
+            "metadata": {"error": "api_error", "status": 500, "simulated": True}
+        }
+
+    async def generate(self, result: Dict) -> Dict:
+        """Delay (or fail) a complete mock response"""
+        if not self.enabled:
+            return result
+
+        outcome = self.sample_outcome()
+        self.outcomes[outcome] += 1
+        if outcome == "timeout":
+            await self._sleep(self.timeout_seconds)
+            return self._failure(outcome)
+
+        latency = self.sample_latency()
+        if outcome != "ok":
+            await self._sleep(latency)
+            return self._failure(outcome)
+
+        latency += len(split_tokens(result["content"])) * self.token_interval_ms / 1000
+        await self._sleep(latency)
+        result["metadata"]["simulated_latency_ms"] = round(latency * 1000, 1)
+        return result
+
+    async def stream(self, result: Dict) -> AsyncIterator[Dict]:
+        """Stream a mock response with simulated time to first token and cadence"""
+        outcome = self.sample_outcome() if self.enabled else "ok"
+        self.outcomes[outcome] += 1
+        if outcome == "timeout":
+            await self._sleep(self.timeout_seconds)
+            yield {"type": "done", **self._failure(outcome)}
+            return
+
+        latency = self.sample_latency()
+        await self._sleep(latency)
+        if outcome != "ok":
+            yield {"type": "done", **self._failure(outcome)}
+            return
+
+        interval = self.token_interval_ms / 1000
+        for i, token in enumerate(split_tokens(result["content"])):
+            if i:
+                await self._sleep(interval)
+            yield {"type": "token", "content": token}
+
+        metadata = {**result["metadata"], "streamed": True}
+        if self.enabled:
+            metadata["simulated_latency_ms"] = round(latency * 1000, 1)
+        yield {"type": "done", "content": result["content"], "metadata": metadata}
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "latency_ms": self.latency_ms,
+            "token_interval_ms": self.token_interval_ms,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "timeout_rate": self.timeout_rate,
+            "outcomes": dict(self.outcomes),
+        }
@@ -0,0 +1,235 @@
+# backend/app/services/prompt_builder.py
+"""
+Token-budget-aware prompt assembly.
+
+Instead of always sending the last N messages, the builder fills a token
+budget with the most recent conversation turns (newest first), truncating
+oversized messages such as pasted statements. Retrieved knowledge-base
+articles get a separate budget. Token counts come from a
+fast local estimate, so no tokenizer library or network call is needed.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+# Words, numbers and individual punctuation marks
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Long words are split by BPE tokenizers into roughly 4-character chunks
+_CHARS_PER_TOKEN = 4
+
+# Framing overhead per chat message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = " […]"
+
+SUMMARY_HEADER = "Resumen de la conversación hasta ahora:"
+
+KNOWLEDGE_HEADER = "Información de la base de conocimiento de JoxAI Bank (úsala solo si es relevante para la consulta):"
+
+# Articles that would have to be cut below this size are left out instead
+_MIN_ARTICLE_TOKENS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of LLM tokens in a text"""
+    if not text:
+        return 0
+    return sum(
+        (len(piece) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+        for piece in _TOKEN_PIECES.findall(text)
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text so that its estimated size (marker included) fits in max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARKER)
+    tokens = 0
+    for match in _TOKEN_PIECES.finditer(text):
+        tokens += (len(match.group()) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+        if tokens > budget:
+            return text[:match.start()].rstrip() + TRUNCATION_MARKER
+    return text
+
+
+class BuiltPrompt:
+    """System prompt, selected history and current message ready to send"""
+
+    def __init__(
+        self,
+        system: Optional[str],
+        history: List[Dict],
+        message: str,
+        system_tokens: int,
+        history_tokens: int,
+        message_tokens: int,
+        history_dropped: int,
+        truncated_messages: int,
+        summary: Optional[str] = None,
+        summary_tokens: int = 0,
+        version: Optional[str] = None,
+        knowledge: Optional[str] = None,
+        knowledge_tokens: int = 0,
+        knowledge_ids: Optional[List[int]] = None,
+    ):
+        self.system = system
+        self.history = history
+        self.message = message
+        self.system_tokens = system_tokens
+        self.history_tokens = history_tokens
+        self.message_tokens = message_tokens
+        self.history_dropped = history_dropped
+        self.truncated_messages = truncated_messages
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+        self.version = version
+        self.knowledge = knowledge
+        self.knowledge_tokens = knowledge_tokens
+        self.knowledge_ids = knowledge_ids or []
+
+    @property
+    def system_text(self) -> Optional[str]:
+        """System prompt followed by the conversation summary and retrieved articles (if any)"""
+        parts = [self.system or ""]
+        if self.summary:
+            parts.append(f"{SUMMARY_HEADER}\n{self.summary}")
+        if self.knowledge:
+            parts.append(self.knowledge)
+        return "\n\n".join(parts).strip() if len(parts) > 1 else self.system
+
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.system_tokens + self.summary_tokens + self.knowledge_tokens
+            + self.history_tokens + self.message_tokens
+        )
+
+    def stats(self) -> Dict:
+        """Prompt size report included in the response metadata"""
+        return {
+            "version": self.version,
+            "estimated_tokens": self.total_tokens,
+            "system_tokens": self.system_tokens,
+            "summary_tokens": self.summary_tokens,
+            "knowledge_tokens": self.knowledge_tokens,
+            "knowledge_articles": len(self.knowledge_ids),
+            "history_tokens": self.history_tokens,
+            "message_tokens": self.message_tokens,
+            "history_messages": len(self.history),
+            "history_dropped": self.history_dropped,
+            "truncated_messages": self.truncated_messages,
+        }
+
+
+class PromptBuilder:
+    """
+    Selects conversation history within a token budget.
+
+    history_budget bounds the tokens spent on previous turns; any single
+    message (history or current) larger than max_message_tokens is cut.
+    knowledge_budget bounds the retrieved articles.
+    """
+
+    def __init__(
+        self,
+        history_budget: Optional[int] = None,
+        max_message_tokens: Optional[int] = None,
+        knowledge_budget: Optional[int] = None,
+    ):
+        self.history_budget = settings.AI_PROMPT_HISTORY_TOKEN_BUDGET if history_budget is None else history_budget
+        self.max_message_tokens = max_message_tokens or settings.AI_PROMPT_MAX_MESSAGE_TOKENS
+        self.knowledge_budget = settings.AI_RAG_TOKEN_BUDGET if knowledge_budget is None else knowledge_budget
+
+    def _fit(self, content: str):
+        """Truncate one message if needed; returns (content, tokens, truncated)"""
+        tokens = estimate_tokens(content)
+        if tokens <= self.max_message_tokens:
+            return content, tokens, False
+        content = truncate_to_tokens(content, self.max_message_tokens)
+        return content, estimate_tokens(content), True
+
+    def _fit_knowledge(self, articles: List[Dict]):
+        """
+        Format retrieved articles (best first) within the knowledge budget;
+        returns (text, tokens, article ids).
+        """
+        if not articles:
+            return None, 0, []
+        used = estimate_tokens(KNOWLEDGE_HEADER)
+        entries, ids = [], []
+        for article in articles:
+            entry = f"[{article['id']}] {article['title']}\n{article['content']}"
+            tokens = estimate_tokens(entry)
+            remaining = self.knowledge_budget - used
+            if tokens > remaining:
+                if remaining < _MIN_ARTICLE_TOKENS:
+                    break
+                entry = truncate_to_tokens(entry, remaining)
+                tokens = estimate_tokens(entry)
+            entries.append(entry)
+            ids.append(article["id"])
+            used += tokens
+        if not entries:
+            return None, 0, []
+        return "\n\n".join([KNOWLEDGE_HEADER] + entries), used, ids
+
+    def build(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]] = None,
+        system_prompt: Optional[str] = None,
+        summary: Optional[str] = None,
+        version: Optional[str] = None,
+        knowledge: Optional[List[Dict]] = None,
+    ) -> BuiltPrompt:
+        """
+        Assemble the prompt, keeping the most recent turns that fit the budget.
+
+        summary is the running summary of turns older than conversation_history
+        (see conversation_summarizer); it is sent after the system prompt.
+        version identifies the system prompt (see prompts.py) in the stats.
+        knowledge are retrieved articles ({"id", "title", "content"}), best
+        first (see knowledge_retriever); they are sent after the summary.
+        """
+        message, message_tokens, truncated = self._fit(message)
+        truncated_messages = int(truncated)
+
+        turns = [
+            msg for msg in (conversation_history or [])
+            if str(msg.get("role", "")).lower() in ["user", "assistant"] and msg.get("content")
+        ]
+
+        selected: List[Dict] = []
+        history_tokens = 0
+        for msg in reversed(turns):
+            content, tokens, truncated = self._fit(msg["content"])
+            cost = tokens + MESSAGE_OVERHEAD_TOKENS
+            if history_tokens + cost > self.history_budget:
+                break
+            selected.append({"role": str(msg["role"]).lower(), "content": content})
+            history_tokens += cost
+            truncated_messages += int(truncated)
+        selected.reverse()
+
+        knowledge_text, knowledge_tokens, knowledge_ids = self._fit_knowledge(knowledge or [])
+
+        return BuiltPrompt(
+            system=system_prompt,
+            history=selected,
+            message=message,
+            system_tokens=estimate_tokens(system_prompt or ""),
+            history_tokens=history_tokens,
+            message_tokens=message_tokens + MESSAGE_OVERHEAD_TOKENS,
+            history_dropped=len(turns) - len(selected),
+            truncated_messages=truncated_messages,
+            summary=summary or None,
+            summary_tokens=estimate_tokens(f"{SUMMARY_HEADER}\n{summary}") if summary else 0,
+            version=version,
+            knowledge=knowledge_text,
+            knowledge_tokens=knowledge_tokens,
+            knowledge_ids=knowledge_ids,
+        )
@@ -0,0 +1,45 @@
+# backend/app/services/prompts.py
+"""
+System prompts sent to the AI providers.
+
+Each prompt is defined once and versioned: a new wording gets a new key
+instead of editing an existing one, so responses (and provider prompt
+caches) can always be traced to the exact text that produced them.
+The prompt text must stay byte-for-byte stable within a version, since
+providers only reuse cached prefixes that match exactly.
+"""
+
+from typing import Optional, Tuple
+
+from app.config import settings
+
+BANKING_SYSTEM_PROMPTS = {
+    "v1": """Eres un asistente virtual de JoxAI Bank, un banco moderno y confiable. 
+
+Tus responsabilidades:
+- Ayudar a clientes con consultas sobre productos bancarios, saldos, transferencias y servicios
+- Proporcionar información clara y precisa sobre procedimientos bancarios
+- Ser amable, profesional y eficiente
+- Escalar a un agente humano cuando la consulta requiera autorización o información sensible
+
+Productos que ofreces:
+- Tarjetas de crédito (Clásica, Gold, Platinum)
+- Cuentas de ahorro e inversión
+- Transferencias (SPEI y tradicionales)
+- Préstamos personales e hipotecarios
+
+Si el cliente necesita:
+- Acceder a información de cuenta: solicita autenticación
+- Realizar transacciones: deriva a un agente humano
+- Resolver problemas complejos: escala el caso
+
+Responde siempre en español, de forma concisa y útil.""",
+}
+
+
+def get_system_prompt(version: Optional[str] = None) -> Tuple[str, str]:
+    """Return (version, text) of the banking system prompt (default: configured version)"""
+    version = version or settings.AI_SYSTEM_PROMPT_VERSION
+    if version not in BANKING_SYSTEM_PROMPTS:
+        raise ValueError(f"Unknown system prompt version: {version}")
+    return version, BANKING_SYSTEM_PROMPTS[version]
@@ -0,0 +1,157 @@
+# backend/app/services/provider_clients.py
+"""
+Shared HTTP clients for LLM provider calls.
+
+One long-lived httpx.AsyncClient per provider, opened at app startup and
+closed at shutdown, so consecutive chat messages reuse warm TCP/TLS
+connections instead of paying DNS + handshake on every call.
+"""
+
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def get_provider_base_urls() -> Dict[str, str]:
+    """Base URL per provider (overridable for stub servers in tests)"""
+    return {
+        "anthropic": settings.ANTHROPIC_BASE_URL,
+        "openai": settings.OPENAI_BASE_URL,
+    }
+
+
+class ProviderClientPool:
+    """
+    Keeps one pooled AsyncClient per provider.
+
+    Clients are created in startup() (or lazily on first use, e.g. in
+    scripts and tests that never run the app lifespan) and must be closed
+    with shutdown() from the same event loop.
+    """
+
+    def __init__(
+        self,
+        base_urls: Optional[Dict[str, str]] = None,
+        http2: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        request_timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_urls = base_urls or get_provider_base_urls()
+        requested_http2 = settings.AI_HTTP2_ENABLED if http2 is None else http2
+        self.http2 = requested_http2 and HTTP2_AVAILABLE
+        if requested_http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested for AI providers but 'h2' is not installed; using HTTP/1.1")
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or settings.AI_HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.request_timeout = request_timeout or settings.AI_REQUEST_TIMEOUT
+        self.timeout = httpx.Timeout(
+            self.request_timeout,
+            connect=connect_timeout or settings.AI_HTTP_CONNECT_TIMEOUT,
+        )
+        # Only used by tests (e.g. httpx.MockTransport)
+        self._transport = transport
+
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._request_counts: Dict[str, int] = {}
+
+    def _build_client(self, provider: str) -> httpx.AsyncClient:
+        """Create the pooled client for a provider"""
+        transport = self._transport or httpx.AsyncHTTPTransport(
+            http2=self.http2,
+            limits=self.limits,
+        )
+
+        async def count_request(request: httpx.Request) -> None:
+            self._request_counts[provider] = self._request_counts.get(provider, 0) + 1
+
+        return httpx.AsyncClient(
+            base_url=self.base_urls[provider],
+            transport=transport,
+            timeout=self.timeout,
+            event_hooks={"request": [count_request]},
+        )
+
+    async def startup(self, providers=None) -> None:
+        """Open clients for the given providers (default: all known providers)"""
+        for provider in providers or self.base_urls.keys():
+            if provider not in self._clients:
+                self._clients[provider] = self._build_client(provider)
+                logger.info(f"AI HTTP client ready for {provider} (http2={self.http2})")
+
+    def get_client(self, provider: str) -> httpx.AsyncClient:
+        """Return the shared client for a provider, creating it if needed"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._build_client(provider)
+            self._clients[provider] = client
+        return client
+
+    async def shutdown(self) -> None:
+        """Close all clients and their pooled connections"""
+        for provider, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing AI HTTP client for {provider}: {e}")
+        self._clients.clear()
+
+    def _pool_stats(self, client: httpx.AsyncClient) -> Dict:
+        """Inspect the underlying httpcore pool (best effort)"""
+        stats = {"connections": 0, "idle": 0, "active": 0, "http2_connections": 0}
+        try:
+            connections = client._transport._pool.connections
+        except AttributeError:
+            return stats
+
+        for conn in connections:
+            stats["connections"] += 1
+            if conn.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+            if "HTTP/2" in conn.info():
+                stats["http2_connections"] += 1
+        return stats
+
+    def stats(self) -> Dict:
+        """Connection pool statistics per provider"""
+        providers = {}
+        for provider in self.base_urls:
+            client = self._clients.get(provider)
+            entry = {
+                "open": client is not None and not client.is_closed,
+                "requests": self._request_counts.get(provider, 0),
+            }
+            if entry["open"]:
+                entry.update(self._pool_stats(client))
+            providers[provider] = entry
+
+        return {
+            "http2": self.http2,
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+            },
+            "timeout": self.request_timeout,
+            "providers": providers,
+        }
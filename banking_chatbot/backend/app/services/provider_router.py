@@ -0,0 +1,273 @@
+# backend/app/services/provider_router.py
+"""
+Latency-aware routing between AI providers with circuit breakers.
+
+Each provider keeps a rolling window of call latencies and outcomes.
+Repeated failures open its circuit so requests skip it immediately
+(instead of waiting for a timeout) and fail over to the next provider;
+a background probe closes the circuit again once the provider recovers.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class ProviderHealth:
+    """Rolling latency/error statistics and circuit breaker for one provider"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        cooldown_seconds: float,
+        window_seconds: float,
+        max_samples: int = 200,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=max_samples)
+
+        self.state = CircuitState.CLOSED
+        self.opened_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self.times_opened = 0
+
+    def _prune(self) -> None:
+        cutoff = self._clock() - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def record_success(self, latency: float) -> None:
+        self._samples.append((self._clock(), latency, True))
+        self.close()
+
+    def close(self) -> None:
+        """Close the circuit (provider is healthy again)"""
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"AI provider {self.name} recovered; closing circuit")
+        self.state = CircuitState.CLOSED
+        self.opened_at = None
+        self.consecutive_failures = 0
+
+    def record_failure(self, latency: float) -> None:
+        self._samples.append((self._clock(), latency, False))
+        self.consecutive_failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        """Open the circuit (or restart its cooldown)"""
+        if self.state != CircuitState.OPEN:
+            self.times_opened += 1
+            logger.warning(
+                f"AI provider {self.name} circuit opened after {self.consecutive_failures} consecutive failures"
+            )
+        self.state = CircuitState.OPEN
+        self.opened_at = self._clock()
+
+    def cooldown_elapsed(self) -> bool:
+        return self.opened_at is not None and self._clock() - self.opened_at >= self.cooldown_seconds
+
+    def available(self) -> bool:
+        """Whether the provider may be tried (no side effects, used for ordering)"""
+        return self.state == CircuitState.CLOSED or self.cooldown_elapsed()
+
+    def allow_request(self) -> bool:
+        """Whether live traffic may be sent to this provider now (claims the half-open trial)"""
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.cooldown_elapsed():
+            # No probe has closed it yet: let one live request through as a
+            # trial, and allow the next one only after another cooldown
+            self.state = CircuitState.HALF_OPEN
+            self.opened_at = self._clock()
+            return True
+        return False
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        self._prune()
+        return percentile([latency for _, latency, ok in self._samples if ok], pct)
+
+    def error_rate(self) -> float:
+        self._prune()
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, _, ok in self._samples if not ok) / len(self._samples)
+
+    def stats(self) -> Dict:
+        self._prune()
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            "state": self.state,
+            "samples": len(self._samples),
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class ProviderRouter:
+    """
+    Orders providers for each request.
+
+    The primary provider is preferred unless its rolling p50 latency is more
+    than latency_slack times slower than another healthy provider. Providers
+    with an open circuit are skipped; "mock" is appended as a last resort
+    when fallback_to_mock is enabled.
+    """
+
+    def __init__(
+        self,
+        providers: List[str],
+        primary: str,
+        fallback_to_mock: Optional[bool] = None,
+        failure_threshold: Optional[int] = None,
+        cooldown_seconds: Optional[float] = None,
+        window_seconds: Optional[float] = None,
+        probe_interval_seconds: Optional[float] = None,
+        latency_slack: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.providers = [primary] + [p for p in providers if p != primary]
+        self.fallback_to_mock = settings.AI_FALLBACK_TO_MOCK if fallback_to_mock is None else fallback_to_mock
+        self.probe_interval_seconds = probe_interval_seconds or settings.AI_HEALTH_PROBE_INTERVAL_SECONDS
+        self.latency_slack = latency_slack or settings.AI_LATENCY_SLACK
+        self.health: Dict[str, ProviderHealth] = {
+            name: ProviderHealth(
+                name,
+                failure_threshold=failure_threshold or settings.AI_CIRCUIT_FAILURE_THRESHOLD,
+                cooldown_seconds=cooldown_seconds or settings.AI_CIRCUIT_COOLDOWN_SECONDS,
+                window_seconds=window_seconds or settings.AI_HEALTH_WINDOW_SECONDS,
+                clock=clock,
+            )
+            for name in self.providers
+        }
+        self.failovers = 0
+        self.mock_fallbacks = 0
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def candidates(self) -> List[str]:
+        """
+        Providers to try for the next request, in order. Does not claim a
+        half-open trial: call claim() right before sending to a provider.
+        """
+        available = [p for p in self.providers if self.health[p].available()]
+
+        def rank(provider: str) -> Tuple[float, int]:
+            p50 = self.health[provider].latency_percentile(50)
+            if p50 is None:
+                # Without recent data keep the configured preference
+                score = 0.0 if provider == self.primary else float("inf")
+            elif provider == self.primary:
+                score = p50 / self.latency_slack
+            else:
+                score = p50
+            return score, self.providers.index(provider)
+
+        ordered = sorted(available, key=rank)
+        if self.fallback_to_mock:
+            ordered.append("mock")
+        return ordered
+
+    def claim(self, provider: str) -> bool:
+        """Whether the request may go to this provider now ("mock" always may)"""
+        health = self.health.get(provider)
+        return health is None or health.allow_request()
+
+    def record_success(self, provider: str, latency: float) -> None:
+        if provider in self.health:
+            self.health[provider].record_success(latency)
+
+    def record_failure(self, provider: str, latency: float) -> None:
+        if provider in self.health:
+            self.health[provider].record_failure(latency)
+
+    def record_failover(self, provider: str) -> None:
+        """Count a request answered by a provider other than the first choice"""
+        self.failovers += 1
+        if provider == "mock":
+            self.mock_fallbacks += 1
+
+    def latency_p95(self, provider: str) -> Optional[float]:
+        health = self.health.get(provider)
+        return health.latency_percentile(95) if health else None
+
+    # ---------- background recovery probing ----------
+
+    def start_probing(self, probe: Callable[[str], Awaitable[bool]]) -> None:
+        """Start the background task that probes providers with open circuits"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(probe))
+
+    async def stop_probing(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def probe_once(self, probe: Callable[[str], Awaitable[bool]]) -> None:
+        """Probe every open circuit whose cooldown has elapsed"""
+        for provider, health in self.health.items():
+            if health.state == CircuitState.CLOSED or not health.cooldown_elapsed():
+                continue
+            try:
+                healthy = await probe(provider)
+            except Exception as e:
+                logger.warning(f"Health probe for {provider} failed: {e}")
+                healthy = False
+            if healthy:
+                health.close()
+            else:
+                health.trip()
+
+    async def _probe_loop(self, probe: Callable[[str], Awaitable[bool]]) -> None:
+        while True:
+            await asyncio.sleep(self.probe_interval_seconds)
+            try:
+                await self.probe_once(probe)
+            except Exception as e:
+                logger.error(f"Provider health probing error: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "primary": self.primary,
+            "order": self.providers,
+            "fallback_to_mock": self.fallback_to_mock,
+            "failovers": self.failovers,
+            "mock_fallbacks": self.mock_fallbacks,
+            "providers": {name: health.stats() for name, health in self.health.items()},
+        }
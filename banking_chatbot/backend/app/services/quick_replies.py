@@ -0,0 +1,176 @@
+# backend/app/services/quick_replies.py
+"""
+Precomputed answers for the widget quick replies.
+
+The quick replies advertised by /chat/config are read from the system
+setting "chat.quick_replies" (AI_QUICK_REPLIES when it is not set) and
+their answers are computed ahead of time: a fixed answer from the setting,
+or one generated by the AI service without history. Answers are warmed in
+the background at startup and refreshed periodically, so a click, by far
+the most common first message, is answered from memory instead of going
+through retrieval and the LLM.
+
+Setting value: a list of labels, or of {"label": ..., "answer": ...}.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUICK_REPLIES_SETTING = "chat.quick_replies"
+
+# Metadata of the warm-up call that does not describe the stored answer
+_CALL_METADATA = ("usage", "prompt", "latency_ms", "ttft_ms", "cost_usd", "cached", "coalesced", "streamed")
+
+
+def normalize(message: str) -> str:
+    """Case- and whitespace-insensitive key of a quick reply"""
+    return " ".join(message.casefold().split())
+
+
+class QuickReplies:
+    """Quick reply labels and their precomputed answers"""
+
+    def __init__(self, enabled: Optional[bool] = None, refresh_seconds: Optional[float] = None):
+        self.enabled = settings.AI_QUICK_REPLIES_ENABLED if enabled is None else enabled
+        self.refresh_seconds = refresh_seconds or settings.AI_QUICK_REPLIES_REFRESH_SECONDS
+
+        self.definitions: List[Dict] = self._parse(settings.AI_QUICK_REPLIES)
+        self.answers: Dict[str, Dict] = {}
+        self.refreshed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Created in start(): an Event belongs to the loop of the lifespan that uses it
+        self._refresh_now: Optional[asyncio.Event] = None
+
+        self.hits = 0
+        self.failures = 0
+
+    @staticmethod
+    def _parse(value) -> List[Dict]:
+        """Setting value -> [{"label", "answer"}] (answer None = generate it)"""
+        definitions = []
+        for item in value or []:
+            if isinstance(item, str):
+                item = {"label": item}
+            if isinstance(item, dict) and str(item.get("label") or "").strip():
+                definitions.append({"label": item["label"].strip(), "answer": item.get("answer")})
+        return definitions
+
+    def labels(self) -> List[str]:
+        return [definition["label"] for definition in self.definitions]
+
+    def match(self, message: str) -> Optional[Dict]:
+        """Precomputed answer ({"content", "metadata"}) if the message is a quick reply"""
+        if not self.enabled or not self.answers:
+            return None
+        answer = self.answers.get(normalize(message))
+        if answer is None:
+            return None
+        self.hits += 1
+        return {"content": answer["content"], "metadata": dict(answer["metadata"])}
+
+    # ---------- warm-up ----------
+
+    def fetch(self) -> List[Dict]:
+        """Quick replies from the settings table (AI_QUICK_REPLIES if not set)"""
+        from app.database import get_db_context
+        from app.repositories import SettingRepository
+
+        with get_db_context() as db:
+            value = SettingRepository(db).get_system_setting(QUICK_REPLIES_SETTING)
+        return self._parse(value) if value is not None else self._parse(settings.AI_QUICK_REPLIES)
+
+    async def _answer(self, definition: Dict) -> Optional[Dict]:
+        if definition["answer"]:
+            return {"content": definition["answer"], "metadata": {}}
+
+        from app.services.ai_service import ai_service
+
+        response = await ai_service.generate_response(message=definition["label"])
+        metadata = response.get("metadata", {})
+        if "error" in metadata or not response.get("content"):
+            return None
+        # Failover answers (canned mock text during an outage) keep the previous answer
+        if "failover_from" in metadata or (ai_service.router and metadata.get("provider") == "mock"):
+            return None
+        return {
+            "content": response["content"],
+            "metadata": {k: v for k, v in metadata.items() if k not in _CALL_METADATA},
+        }
+
+    async def refresh(self) -> None:
+        """Reload the definitions and recompute every answer (failed ones keep the previous answer)"""
+        try:
+            self.definitions = await asyncio.to_thread(self.fetch)
+        except Exception as e:
+            logger.warning(f"Could not load quick replies, using the current ones: {e}")
+
+        computed = await asyncio.gather(*(self._answer(d) for d in self.definitions), return_exceptions=True)
+        answers = {}
+        refreshed_at = time.time()
+        for definition, answer in zip(self.definitions, computed):
+            key = normalize(definition["label"])
+            if isinstance(answer, dict):
+                answer["metadata"].update({"quick_reply": True, "precomputed_at": refreshed_at})
+                answers[key] = answer
+            else:
+                self.failures += 1
+                if key in self.answers:
+                    answers[key] = self.answers[key]
+        self.answers = answers
+        self.refreshed_at = refreshed_at
+        logger.info(f"Quick replies warmed: {len(answers)}/{len(self.definitions)}")
+
+    def schedule_refresh(self) -> None:
+        """Refresh as soon as possible (e.g. after the setting was edited)"""
+        if self._refresh_now is not None:
+            self._refresh_now.set()
+
+    async def start(self) -> None:
+        """Warm the answers in the background and keep them fresh (called from the app lifespan)"""
+        if self.enabled and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_now = asyncio.Event()
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.warning(f"Quick replies refresh task had failed: {e}")
+            self._refresh_task = None
+            self._refresh_now = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            self._refresh_now.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Could not warm quick replies: {e}")
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "labels": len(self.definitions),
+            "warm": len(self.answers),
+            "refreshed_at": self.refreshed_at,
+            "hits": self.hits,
+            "failures": self.failures,
+        }
+
+
+# Global instance
+quick_replies = QuickReplies()
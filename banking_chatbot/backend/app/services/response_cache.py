@@ -0,0 +1,125 @@
+# backend/app/services/response_cache.py
+"""
+In-process cache for AI responses to frequently asked questions.
+
+Keys combine the normalized customer message with a fingerprint of the
+last few conversation turns, so "¿Consultar saldo?" and "consultar  saldo"
+share an entry while the same words in a different context do not.
+"""
+
+import copy
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of successful AI responses.
+
+    Bounded by max_entries (least recently used entries are evicted first);
+    entries older than ttl_seconds are treated as misses.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        history_turns: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = settings.AI_CACHE_ENABLED if enabled is None else enabled
+        self.max_entries = max_entries or settings.AI_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.AI_CACHE_TTL_SECONDS
+        self.history_turns = settings.AI_CACHE_HISTORY_TURNS if history_turns is None else history_turns
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(
+        self,
+        message: str,
+        conversation_history: Optional[List[Dict]] = None,
+        system_prompt: Optional[str] = None,
+        namespace: str = "",
+    ) -> str:
+        """Build the cache key for a message in its conversational context"""
+        parts = [namespace, system_prompt or "", normalize_text(message)]
+        if conversation_history and self.history_turns > 0:
+            for msg in conversation_history[-self.history_turns:]:
+                parts.append(f"{str(msg.get('role', '')).lower()}:{normalize_text(msg.get('content', ''))}")
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of the cached response, or None on miss/expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, response = entry
+        if self._clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(response)
+
+    def set(self, key: str, response: Dict) -> None:
+        """Store a response, evicting least recently used entries if full"""
+        self._entries[key] = (self._clock(), copy.deepcopy(response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> int:
+        """Drop every entry (e.g. after knowledge-base changes)"""
+        count = len(self._entries)
+        self._entries.clear()
+        self.invalidations += 1
+        return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
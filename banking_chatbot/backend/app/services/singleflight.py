@@ -0,0 +1,84 @@
+# backend/app/services/singleflight.py
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key while a call is already in
+flight, they all wait for that one call instead of starting their own.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def make_flight_key(
+    message: str,
+    conversation_history: Optional[List[Dict]] = None,
+    system_prompt: Optional[str] = None,
+    namespace: str = "",
+) -> str:
+    """Exact fingerprint of a prompt (system prompt + history window + message)"""
+    history = [
+        [str(msg.get("role", "")), msg.get("content", "")]
+        for msg in (conversation_history or [])
+    ]
+    raw = json.dumps([namespace, system_prompt or "", history, message], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call per key between concurrent callers.
+
+    The shared call runs as its own task, so a waiter that is cancelled
+    (e.g. the client disconnected) does not cancel it for the others. The
+    result is snapshotted when the call finishes and every caller, the one
+    that started it included, gets its own copy: no caller can change what
+    the others receive.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() unless an identical call is already in flight.
+
+        Returns (result, shared): shared is True when the result came from a
+        call started by another caller. The result is always a private copy.
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+
+        if shared:
+            self.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(self._snapshot(fn))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, k=key: self._forget(k, done))
+            self.upstream_calls += 1
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), shared
+
+    @staticmethod
+    async def _snapshot(fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the call and keep a copy of its result nobody else holds"""
+        return copy.deepcopy(await fn())
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Remove a finished call so later requests start a fresh one"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict:
+        """Coalescing counters"""
+        return {
+            "in_flight": len(self._in_flight),
+            "upstream_calls": self.upstream_calls,
+            "deduplicated": self.deduplicated,
+        }
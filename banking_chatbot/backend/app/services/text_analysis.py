@@ -0,0 +1,32 @@
+# backend/app/services/text_analysis.py
+"""
+Text normalization shared by the knowledge-base indexes.
+
+Queries and articles must be analyzed the same way, so both the lexical
+(BM25) and the vector index use tokenize() from here.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+_WORD = re.compile(r"\w+")
+
+# Frequent Spanish words that carry no meaning for retrieval
+STOPWORDS = frozenset("""
+    a al algo como con cual cuales cuando de del donde el ella en es esa ese eso esta este esto
+    hay la las lo los mas me mi mis muy no nos o para pero por que quiero se si sin sobre su sus
+    te tengo ti tu tus un una uno unos unas y ya yo hola gracias favor
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent-folded, lowercased words without stopwords (plural "s" removed)"""
+    # Decompose and drop everything non-ASCII: "Límite" -> "limite", "año" -> "ano"
+    folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    words = _WORD.findall(folded)
+    return [
+        word[:-1] if len(word) > 4 and word.endswith("s") else word
+        for word in words
+        if len(word) > 1 and word not in STOPWORDS
+    ]
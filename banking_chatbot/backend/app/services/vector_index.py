@@ -0,0 +1,254 @@
+# backend/app/services/vector_index.py
+"""
+In-process vector index for knowledge-base search.
+
+Articles are embedded locally (hashing vectorizer over the same tokens as
+the BM25 index, so no network call and no model download) and kept as
+L2-normalized float32 rows of one NumPy matrix; a query is a single
+matrix-vector product (cosine similarity) plus a partial sort. Writes are
+incremental: a changed article overwrites its row, a deleted one is
+replaced by the last row.
+
+Search is exact (brute force). It reads the whole matrix, so latency
+grows with memory bandwidth: about 0.7 ms at 10k articles (the default
+AI_RAG_MAX_ARTICLES) and about 10 ms at 100k passages on one core.
+
+With a path, the matrix is saved as .npy files and opened again with
+np.load(mmap_mode="r"), so a restart neither re-embeds unchanged articles
+nor has to read the whole file before answering (pages are loaded on
+demand by the OS). The database stays the source of truth: sync()
+compares a hash of each article's text and only re-embeds what changed.
+See benchmarks/bench_vector_index.py for latency at 100k passages.
+"""
+
+import json
+import logging
+import math
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.text_analysis import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> int:
+    """Cheap fingerprint used to detect changed articles"""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class HashingEmbedder:
+    """
+    Stateless text embedding: words and word pairs hashed into dim buckets.
+
+    The sign of each feature comes from the hash too, so collisions tend
+    to cancel out instead of adding up. Term counts are dampened (1 + log tf)
+    and the result is L2-normalized. crc32 is used instead of hash() because
+    Python salts str hashes per process and saved vectors must stay valid.
+    """
+
+    version = "hashing-v1"
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim or settings.AI_VECTOR_DIM
+
+    def features(self, text: str) -> List[str]:
+        words = tokenize(text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        counts: Dict[str, int] = {}
+        for feature in self.features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+
+        buckets, weights = [], []
+        for feature, count in counts.items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            buckets.append(h % self.dim)
+            weight = 1.0 + math.log(count)
+            weights.append(weight if h & 0x80000000 else -weight)
+
+        vector = np.bincount(buckets, weights=weights, minlength=self.dim).astype(np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class VectorIndex:
+    """
+    Cosine similarity search over an embedded float32 matrix.
+
+    Same interface as LexicalIndex (upsert / remove / sync / search), so the
+    KnowledgeRetriever can use either one.
+    """
+
+    MIN_CAPACITY = 64
+
+    def __init__(self, dim: Optional[int] = None, path: Optional[str] = None, embedder=None):
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.dim = self.embedder.dim
+        self.path = path
+
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._hashes: Dict[int, int] = {}
+        self._count = 0
+        self.dirty = False
+        self.embedded = 0
+
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ---------- writes ----------
+
+    def upsert(self, doc_id: int, text: str) -> None:
+        self.add_vector(doc_id, self.embedder.embed(text), text_hash(text))
+
+    def add_vector(self, doc_id: int, vector: np.ndarray, fingerprint: int = 0) -> None:
+        """Store a (normalized) vector for a document, replacing any previous one"""
+        row = self._rows.get(doc_id)
+        if row is None:
+            self._reserve(self._count + 1)
+            row = self._count
+            self._count += 1
+            self._rows[doc_id] = row
+            self._ids[row] = doc_id
+        else:
+            self._reserve(self._count)
+        self._vectors[row] = vector
+        self._hashes[doc_id] = fingerprint
+        self.embedded += 1
+        self.dirty = True
+
+    def remove(self, doc_id: int) -> None:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        self._hashes.pop(doc_id, None)
+        self._reserve(self._count)
+        last = self._count - 1
+        if row != last:
+            # Keep the matrix dense: move the last row into the hole
+            moved = int(self._ids[last])
+            self._vectors[row] = self._vectors[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._count = last
+        self.dirty = True
+
+    def sync(self, docs: Dict[int, str]) -> None:
+        """Make the index match docs (id -> text), embedding only new or changed texts"""
+        for doc_id in [doc_id for doc_id in self._rows if doc_id not in docs]:
+            self.remove(doc_id)
+        for doc_id, text in docs.items():
+            fingerprint = text_hash(text)
+            if self._hashes.get(doc_id) != fingerprint or doc_id not in self._rows:
+                self.add_vector(doc_id, self.embedder.embed(text), fingerprint)
+
+    def _reserve(self, rows: int) -> None:
+        """Writable in-memory storage for at least `rows` rows (copies a read-only memmap)"""
+        capacity = len(self._vectors)
+        if rows <= capacity and self._vectors.flags.writeable:
+            return
+        capacity = max(self.MIN_CAPACITY, rows, capacity * 2 if rows > capacity else capacity)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        vectors[:self._count] = self._vectors[:self._count]
+        ids[:self._count] = self._ids[:self._count]
+        self._vectors, self._ids = vectors, ids
+
+    # ---------- search ----------
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, cosine similarity) pairs, best first"""
+        return self.search_vector(self.embedder.embed(query), k)
+
+    def search_vector(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Exact top-k by cosine similarity (one pass over the matrix)"""
+        n = self._count
+        if not n or k <= 0 or not vector.any():
+            return []
+        scores = self._vectors[:n] @ vector
+        k = min(k, n)
+        top = np.argpartition(scores, n - k)[n - k:] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+    # ---------- persistence ----------
+
+    def _files(self) -> Dict[str, str]:
+        return {
+            name: os.path.join(self.path, f"{name}.npy")
+            for name in ("vectors", "ids", "hashes")
+        }
+
+    def _meta(self) -> Dict:
+        return {"dim": self.dim, "embedder": self.embedder.version}
+
+    def _load(self) -> None:
+        """Open saved vectors as a read-only memmap (ignored if missing or incompatible)"""
+        meta_path = os.path.join(self.path, "meta.json")
+        files = self._files()
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path) as f:
+                if json.load(f) != self._meta():
+                    logger.info("Saved vector index was built with other settings; rebuilding")
+                    return
+            vectors = np.load(files["vectors"], mmap_mode="r")
+            ids = np.load(files["ids"])
+            hashes = np.load(files["hashes"])
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not open the saved vector index: {e}")
+            return
+        if not len(vectors) == len(ids) == len(hashes) or vectors.shape[1:] != (self.dim,):
+            logger.warning("Saved vector index is incomplete; rebuilding")
+            return
+
+        self._vectors, self._ids = vectors, ids
+        self._count = len(ids)
+        self._rows = {int(doc_id): row for row, doc_id in enumerate(ids)}
+        self._hashes = {int(doc_id): int(h) for doc_id, h in zip(ids, hashes)}
+        logger.info(f"Vector index opened with {self._count} vectors from {self.path}")
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Copy of the current rows, safe to write from another thread"""
+        n = self._count
+        ids = self._ids[:n].copy()
+        hashes = np.array([self._hashes.get(int(doc_id), 0) for doc_id in ids], dtype=np.uint32)
+        self.dirty = False
+        return np.array(self._vectors[:n]), ids, hashes
+
+    def write(self, snapshot: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> None:
+        """Write a snapshot to self.path (each file replaced atomically)"""
+        os.makedirs(self.path, exist_ok=True)
+        for (name, target), array in zip(self._files().items(), snapshot):
+            tmp = f"{target}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, target)
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._meta(), f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def save(self) -> None:
+        if self.path:
+            self.write(self.snapshot())
+
+    def stats(self) -> Dict:
+        return {
+            "vectors": self._count,
+            "dim": self.dim,
+            "embedder": self.embedder.version,
+            "memory_mapped": isinstance(self._vectors, np.memmap),
+            "embedded": self.embedded,
+        }
@@ -0,0 +1,144 @@
+# backend/benchmarks/bench_async_db.py
+"""
+Benchmark: concurrent request throughput, sync Session vs AsyncSession.
+
+Each simulated request does what GET /conversations/{id} does on the
+database (conversation lookup + last messages) plus one query that waits
+RTT_MS inside the database driver, standing in for the network round trip
+and server time of PostgreSQL. It runs CONCURRENCY requests at a time on
+one event loop:
+
+  sync   Session queries called from async def (the current routers):
+         the wait happens on the event loop thread, so requests run one
+         after another and every other task on the worker stalls.
+  async  AsyncSession (aiosqlite here, asyncpg in production): the wait
+         happens off the loop and requests overlap.
+
+"loop lag" is the worst delay seen by a task that wakes up every 10 ms,
+i.e. how long a chat stream or WebSocket on the same worker was frozen.
+SQLite (file database, one round trip simulated per request) keeps the
+benchmark self-contained; the driver wait is what differs, not the engine.
+
+Usage (from backend/, needs aiosqlite):
+    python -m benchmarks.bench_async_db
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.repositories import (
+    AsyncConversationRepository,
+    AsyncMessageRepository,
+    ConversationRepository,
+    MessageRepository,
+)
+
+CONVERSATIONS = 200
+MESSAGES = 50
+REQUESTS = 400
+CONCURRENCY = [1, 10, 50]
+RTT_MS = 2.0
+POOL_SIZE = 20
+
+
+def add_round_trip(dbapi_conn, _record):
+    """SQL function rtt() that blocks the driver for RTT_MS"""
+    dbapi_conn.create_function("rtt", 0, lambda: time.sleep(RTT_MS / 1000) or 0)
+
+
+def populate(url: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(DBConversation), [
+            {"conversation_id": f"conv-{i}", "user_id": "bench", "is_active": True, "is_escalated": False}
+            for i in range(CONVERSATIONS)
+        ])
+        started = datetime(2026, 1, 1)
+        conn.execute(insert(DBMessage), [
+            {
+                "conversation_id": c + 1,
+                "role": MessageRole.USER if m % 2 == 0 else MessageRole.ASSISTANT,
+                "content": f"mensaje {m}",
+                "is_internal": False,
+                "created_at": started + timedelta(seconds=m),
+                "updated_at": started + timedelta(seconds=m),
+            }
+            for c in range(CONVERSATIONS)
+            for m in range(MESSAGES)
+        ])
+    engine.dispose()
+
+
+async def watch_loop(lag: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        lag.append(time.perf_counter() - expected)
+
+
+async def run(handler, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    lag, stop = [], asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(lag, stop))
+
+    async def request(i: int):
+        async with semaphore:
+            await handler(f"conv-{i % CONVERSATIONS}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await watcher
+    return REQUESTS / elapsed, max(lag, default=0.0) * 1000
+
+
+async def main() -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    populate(f"sqlite:///{path}")
+
+    sync_engine = create_engine(
+        f"sqlite:///{path}", pool_size=POOL_SIZE, connect_args={"check_same_thread": False}
+    )
+    event.listen(sync_engine, "connect", add_round_trip)
+    SessionLocal = sessionmaker(bind=sync_engine)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=POOL_SIZE)
+    event.listen(async_engine.sync_engine, "connect", add_round_trip)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def sync_handler(conversation_id: str):
+        with SessionLocal() as db:
+            db.execute(text("SELECT rtt()"))
+            conversation = ConversationRepository(db).get_by_conversation_id(conversation_id)
+            MessageRepository(db).get_recent(conversation.id, limit=20)
+
+    async def async_handler(conversation_id: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT rtt()"))
+            conversation = await AsyncConversationRepository(db).get_by_conversation_id(conversation_id)
+            await AsyncMessageRepository(db).get_recent(conversation.id, limit=20)
+
+    print(f"simulated round trip: {RTT_MS} ms, {REQUESTS} requests")
+    print(f"{'concurrency':>11} {'sync req/s':>11} {'lag ms':>7} {'async req/s':>12} {'lag ms':>7}")
+    for concurrency in CONCURRENCY:
+        sync_rps, sync_lag = await run(sync_handler, concurrency)
+        async_rps, async_lag = await run(async_handler, concurrency)
+        print(f"{concurrency:>11} {sync_rps:>11.0f} {sync_lag:>7.1f} {async_rps:>12.0f} {async_lag:>7.1f}")
+
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
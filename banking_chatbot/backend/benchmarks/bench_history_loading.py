@@ -0,0 +1,91 @@
+# backend/benchmarks/bench_history_loading.py
+"""
+Microbenchmark: database time to load the prompt history of one message.
+
+Fills a SQLite database with conversations of growing length (plus
+background conversations, so the messages table is not tiny) and times:
+
+  get_after   full ORM messages, oldest first, up to 100 (previous send path)
+  get_recent  last N (role, content, created_at) rows, newest-first on the
+              (conversation_id, created_at) index, then reversed
+
+SQLite keeps the numbers reproducible without a server; on PostgreSQL the
+shape is the same (an index scan backwards that stops after N rows).
+
+Usage (from backend/):
+    python -m benchmarks.bench_history_loading
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.repositories import MessageRepository
+from app.services.provider_router import percentile
+
+LENGTHS = [10, 100, 1000, 10000]
+BACKGROUND_CONVERSATIONS = 2000
+BACKGROUND_MESSAGES = 20
+HISTORY_MESSAGES = 20
+RUNS = 200
+
+
+def add_conversation(db, conversation_id: str, length: int, rng: random.Random) -> int:
+    conversation = DBConversation(conversation_id=conversation_id, user_id="bench")
+    db.add(conversation)
+    db.flush()
+    started = datetime(2026, 1, 1) + timedelta(minutes=rng.randint(0, 100000))
+    db.execute(insert(DBMessage), [
+        {
+            "conversation_id": conversation.id,
+            "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            "content": "Mensaje de prueba sobre saldo, tarjetas y transferencias. " * 4,
+            "message_metadata": {"intent": "general_inquiry"},
+            "is_internal": False,
+            "created_at": started + timedelta(seconds=30 * i),
+            "updated_at": started + timedelta(seconds=30 * i),
+        }
+        for i in range(length)
+    ])
+    return conversation.id
+
+
+def time_ms(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    rng = random.Random(7)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        for i in range(BACKGROUND_CONVERSATIONS):
+            add_conversation(db, f"background-{i}", BACKGROUND_MESSAGES, rng)
+        targets = {length: add_conversation(db, f"target-{length}", length, rng) for length in LENGTHS}
+        db.commit()
+
+    print(f"{'messages':>9} {'get_after p50':>14} {'p95':>7} {'get_recent p50':>15} {'p95':>7}")
+    for length, conversation_pk in targets.items():
+        old, new = [], []
+        for _ in range(RUNS):
+            with Session() as db:
+                old.append(time_ms(lambda: MessageRepository(db).get_after(conversation_pk)))
+            with Session() as db:
+                new.append(time_ms(lambda: MessageRepository(db).get_recent(conversation_pk, HISTORY_MESSAGES)))
+        print(
+            f"{length:>9} {percentile(old, 50):>14.3f} {percentile(old, 95):>7.3f} "
+            f"{percentile(new, 50):>15.3f} {percentile(new, 95):>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
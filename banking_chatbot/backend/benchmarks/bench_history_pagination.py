@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_history_pagination.py
+"""
+Microbenchmark: database time to load the latest page of a conversation.
+
+Fills a SQLite database like bench_history_loading and times, for
+conversations of growing length, reading the newest PAGE_SIZE messages:
+
+  offset   get_by_conversation(skip=count - PAGE_SIZE): count, then OFFSET,
+           which walks every older row first
+  keyset   get_page(): newest-first range read on the
+           (conversation_id, created_at, id) index, stops after PAGE_SIZE + 1
+
+plus a keyset page taken from the middle of the conversation (a "before"
+cursor), which should cost the same as the latest one.
+
+Usage (from backend/):
+    python -m benchmarks.bench_history_pagination
+"""
+
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import DBConversation, DBMessage
+from app.repositories import MessageRepository
+from app.services.provider_router import percentile
+from benchmarks.bench_history_loading import (
+    BACKGROUND_CONVERSATIONS,
+    BACKGROUND_MESSAGES,
+    add_conversation,
+    time_ms,
+)
+
+LENGTHS = [10, 100, 1000, 5000, 20000]
+PAGE_SIZE = 50
+RUNS = 200
+
+
+def offset_latest_page(db, conversation_pk: int):
+    repo = MessageRepository(db)
+    total = repo.count_by_conversation(conversation_pk)
+    return repo.get_by_conversation(conversation_pk, skip=max(total - PAGE_SIZE, 0), limit=PAGE_SIZE)
+
+
+def main() -> None:
+    rng = random.Random(7)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        for i in range(BACKGROUND_CONVERSATIONS):
+            add_conversation(db, f"background-{i}", BACKGROUND_MESSAGES, rng)
+        targets = {length: add_conversation(db, f"target-{length}", length, rng) for length in LENGTHS}
+        db.commit()
+
+    print(f"{'messages':>9} {'offset p50':>11} {'p95':>7} {'keyset p50':>11} {'p95':>7} {'middle p50':>11}")
+    for length, conversation_pk in targets.items():
+        with Session() as db:
+            messages = MessageRepository(db).get_by_conversation(conversation_pk, limit=length)
+            middle = messages[len(messages) // 2]
+            cursor = (middle.created_at, middle.id)
+
+        offset, keyset, deep = [], [], []
+        for _ in range(RUNS):
+            with Session() as db:
+                offset.append(time_ms(lambda: offset_latest_page(db, conversation_pk)))
+            with Session() as db:
+                keyset.append(time_ms(lambda: MessageRepository(db).get_page(conversation_pk, PAGE_SIZE)))
+            with Session() as db:
+                deep.append(time_ms(
+                    lambda: MessageRepository(db).get_page(conversation_pk, PAGE_SIZE, before=cursor)
+                ))
+        print(
+            f"{length:>9} {percentile(offset, 50):>11.3f} {percentile(offset, 95):>7.3f} "
+            f"{percentile(keyset, 50):>11.3f} {percentile(keyset, 95):>7.3f} {percentile(deep, 50):>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
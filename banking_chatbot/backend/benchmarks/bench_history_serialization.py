@@ -0,0 +1,122 @@
+# backend/benchmarks/bench_history_serialization.py
+"""
+Microbenchmark: CPU to turn 1,000 history rows into a response body.
+
+Times the work /chat/history does after the rows are fetched, the way
+FastAPI runs it for a dict return value (jsonable_encoder, then the
+response class renders the bytes):
+
+  text + json      message_metadata as Text: json.loads per row in the
+                   endpoint, JSONResponse (stdlib json)
+  jsonb + orjson   message_metadata decoded by the driver with orjson.loads
+                   (JSONB column, engine json_deserializer), ORJSONResponse
+  jsonb, direct    same rows, the endpoint returns ORJSONResponse(payload)
+                   itself: the payload is already JSON types, so FastAPI
+                   skips jsonable_encoder (what the history endpoints do)
+
+The "decode" column is the per-row metadata decoding, "encode" the
+jsonable_encoder + render step.
+
+Usage (from backend/):
+    python -m benchmarks.bench_history_serialization
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models import MessageRole
+from app.services.provider_router import percentile
+
+MESSAGES = 1000
+RUNS = 50
+
+METADATA = {
+    "intent": "balance_inquiry",
+    "model": "claude-3-5-sonnet",
+    "latency_ms": 812.4,
+    "usage": {"input_tokens": 1432, "output_tokens": 187},
+    "cost_usd": 0.00711,
+    "knowledge": [{"id": 12, "title": "Consulta de saldo", "score": 7.31}],
+}
+
+
+def make_rows(metadata_text: bool):
+    started = datetime(2026, 1, 1)
+    raw = json.dumps(METADATA)
+    return [
+        SimpleNamespace(
+            id=i,
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content="Mensaje de prueba sobre saldo, tarjetas y transferencias. " * 4,
+            created_at=started + timedelta(seconds=30 * i),
+            message_metadata=raw if metadata_text else orjson.loads(raw),
+        )
+        for i in range(MESSAGES)
+    ]
+
+
+def history_payload(rows, decode) -> dict:
+    return {
+        "conversation": {"id": "conv-1", "user_id": "user-1", "is_escalated": False, "is_active": True},
+        "messages": [
+            {
+                "id": msg.id,
+                "role": msg.role.value,
+                "content": msg.content,
+                "timestamp": msg.created_at.isoformat(),
+                "metadata": decode(msg.message_metadata),
+            }
+            for msg in rows
+        ],
+    }
+
+
+def run(rows, decode, response_class, direct=False):
+    started = time.perf_counter()
+    payload = history_payload(rows, decode)
+    decoded = time.perf_counter()
+    body = response_class(payload if direct else jsonable_encoder(payload)).body
+    done = time.perf_counter()
+    return (decoded - started) * 1000, (done - decoded) * 1000, len(body)
+
+
+def main() -> None:
+    variants = {
+        "text + json": (make_rows(True), lambda raw: json.loads(raw) if raw else {}, JSONResponse, False),
+        "jsonb + orjson": (make_rows(False), lambda value: value or {}, ORJSONResponse, False),
+        "jsonb, direct": (make_rows(False), lambda value: value or {}, ORJSONResponse, True),
+    }
+    # Driver-side decoding of the JSONB values (once per row, at fetch time)
+    raw = [json.dumps(METADATA)] * MESSAGES
+    driver = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        [orjson.loads(value) for value in raw]
+        driver.append((time.perf_counter() - started) * 1000)
+
+    print(f"{MESSAGES} messages, {RUNS} runs")
+    print(f"{'variant':>15} {'decode p50':>11} {'encode p50':>11} {'total p50':>10} {'p95':>7} {'bytes':>8}")
+    for name, (rows, decode, response_class, direct) in variants.items():
+        decode_ms, encode_ms, total_ms, size = [], [], [], 0
+        for _ in range(RUNS):
+            d, e, size = run(rows, decode, response_class, direct)
+            decode_ms.append(d)
+            encode_ms.append(e)
+            total_ms.append(d + e)
+        if name.startswith("jsonb"):
+            decode_ms = [d + x for d, x in zip(decode_ms, driver)]
+            total_ms = [t + x for t, x in zip(total_ms, driver)]
+        print(
+            f"{name:>15} {percentile(decode_ms, 50):>11.2f} {percentile(encode_ms, 50):>11.2f} "
+            f"{percentile(total_ms, 50):>10.2f} {percentile(total_ms, 95):>7.2f} {size:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
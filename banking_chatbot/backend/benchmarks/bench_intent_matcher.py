@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_intent_matcher.py
+"""
+Microbenchmark: compiled IntentMatcher vs. chained substring checks.
+
+The baseline reproduces the previous approach (message.lower() followed by
+one `keyword in message` test per keyword, per intent). Both are timed on
+the real intent table and on synthetic tables with hundreds of intents.
+
+Usage (from backend/):
+    python -m benchmarks.bench_intent_matcher
+"""
+
+import random
+import string
+import timeit
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.intent_matcher import IntentMatcher
+
+MESSAGES = [
+    "Hola, quiero consultar mi saldo por favor",
+    "¿Qué tarjeta de crédito me recomiendan para viajar?",
+    "Necesito hacer una transferencia SPEI a otra cuenta",
+    "Me gustaría hablar con alguien de soporte, llevo días esperando una respuesta sobre mi préstamo",
+    "Buenas tardes, tengo una duda general sobre los horarios de las sucursales en mi ciudad",
+]
+
+
+def chained_best(table: Dict[str, List[str]], message: str) -> Optional[str]:
+    """The previous approach: substring checks in table order"""
+    message_lower = message.lower()
+    for intent, keywords in table.items():
+        if any(keyword in message_lower for keyword in keywords):
+            return intent
+    return None
+
+
+def synthetic_table(intents: int, keywords_per_intent: int = 4, seed: int = 1) -> Dict[str, List[str]]:
+    """Random keyword table that (mostly) misses, i.e. the worst case for chained checks"""
+    rng = random.Random(seed)
+    table = dict(settings.AI_INTENT_KEYWORDS)
+    while len(table) < intents:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))) for _ in range(keywords_per_intent)]
+        table[f"intent_{len(table)}"] = words
+    return table
+
+
+def bench(table: Dict[str, List[str]], number: int) -> Dict[str, float]:
+    matcher = IntentMatcher(table)
+    chained = timeit.timeit(lambda: [chained_best(table, m) for m in MESSAGES], number=number)
+    compiled = timeit.timeit(lambda: [matcher.best(m) for m in MESSAGES], number=number)
+    calls = number * len(MESSAGES)
+    return {"chained_us": chained / calls * 1e6, "compiled_us": compiled / calls * 1e6}
+
+
+def main() -> None:
+    print(f"{'intents':>8} {'keywords':>9} {'chained µs/msg':>15} {'compiled µs/msg':>16} {'speedup':>8}")
+    for size in [len(settings.AI_INTENT_KEYWORDS), 50, 200, 500]:
+        table = synthetic_table(size)
+        keywords = sum(len(k) for k in table.values())
+        result = bench(table, number=max(200, 20000 // size))
+        print(
+            f"{size:>8} {keywords:>9} {result['chained_us']:>15.2f} {result['compiled_us']:>16.2f} "
+            f"{result['chained_us'] / result['compiled_us']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
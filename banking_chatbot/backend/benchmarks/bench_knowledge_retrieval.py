@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_knowledge_retrieval.py
+"""
+Microbenchmark: knowledge retrieval latency per chat message.
+
+Builds synthetic knowledge bases (articles of ~120 words drawn from a
+Zipf-like vocabulary, so common words have long posting lists) and times
+KnowledgeRetriever.retrieve() for realistic customer messages. The chat
+pipeline budget for this step is 5 ms.
+
+Usage (from backend/):
+    python -m benchmarks.bench_knowledge_retrieval
+"""
+
+import random
+import string
+import time
+from types import SimpleNamespace
+from typing import List
+
+from app.services.knowledge_retriever import KnowledgeRetriever
+from app.services.provider_router import percentile
+
+BANKING_WORDS = (
+    "saldo cuenta tarjeta credito debito transferencia spei limite comision anualidad prestamo "
+    "hipoteca tasa interes ahorro inversion plazo pago nomina cajero sucursal horario bloqueo "
+    "robo fraude aclaracion estado movimiento cargo abono token app banca linea cheque seguro"
+).split()
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = list(BANKING_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))))
+    return words
+
+
+def make_articles(count: int, vocabulary: List[str], rng: random.Random) -> List[SimpleNamespace]:
+    # Zipf-like weights: low ranks (including the banking words) are frequent
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    articles = []
+    for i in range(count):
+        words = rng.choices(vocabulary, weights=weights, k=120)
+        articles.append(SimpleNamespace(
+            id=i + 1,
+            title=" ".join(words[:5]).capitalize(),
+            content=" ".join(words[5:]),
+            category="general",
+            tags=words[:2],
+            is_active=True,
+        ))
+    return articles
+
+
+def make_queries(count: int, vocabulary: List[str], rng: random.Random) -> List[str]:
+    queries = []
+    for _ in range(count):
+        words = rng.sample(BANKING_WORDS, 3) + rng.sample(vocabulary, 5)
+        queries.append("Hola, quiero saber " + " ".join(words) + " por favor")
+    return queries
+
+
+def main() -> None:
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    queries = make_queries(500, vocabulary, rng)
+
+    print(f"{'articles':>9} {'index s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for count in [100, 1000, 5000, 10000]:
+        articles = make_articles(count, vocabulary, rng)
+        retriever = KnowledgeRetriever(enabled=True, top_k=3)
+        started = time.perf_counter()
+        retriever.load(articles)
+        index_seconds = time.perf_counter() - started
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            retriever.retrieve(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{count:>9} {index_seconds:>8.2f} {percentile(timings, 50):>8.3f} "
+            f"{percentile(timings, 95):>8.3f} {max(timings):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
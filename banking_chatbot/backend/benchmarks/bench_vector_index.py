@@ -0,0 +1,70 @@
+# backend/benchmarks/bench_vector_index.py
+"""
+Microbenchmark: vector index build, search and restart at up to 100k passages.
+
+Uses the synthetic articles of bench_knowledge_retrieval (~120 Zipf-like
+words each). For every size it reports the time to embed all passages,
+the search latency (brute-force cosine over the float32 matrix) and the
+time to save the vectors and open them again as a memmap, which is what a
+restarted worker pays instead of re-embedding.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_index
+"""
+
+import random
+import tempfile
+import time
+
+from app.services.knowledge_retriever import article_text
+from app.services.provider_router import percentile
+from app.services.vector_index import VectorIndex
+from benchmarks.bench_knowledge_retrieval import make_articles, make_queries, make_vocabulary
+
+
+def main() -> None:
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    queries = make_queries(500, vocabulary, rng)
+
+    print(
+        f"{'passages':>9} {'embed s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+        f"{'MB':>6} {'save s':>7} {'open ms':>8}"
+    )
+    for count in [1000, 10000, 100000]:
+        docs = {
+            article.id: article_text(vars(article))
+            for article in make_articles(count, vocabulary, rng)
+        }
+        with tempfile.TemporaryDirectory() as path:
+            index = VectorIndex(path=path)
+            started = time.perf_counter()
+            index.sync(docs)
+            embed_seconds = time.perf_counter() - started
+
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                index.search(query, 3)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            index.save()
+            save_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            reopened = VectorIndex(path=path)
+            reopened.sync(docs)
+            open_ms = (time.perf_counter() - started) * 1000
+            assert reopened.embedded == 0
+
+            megabytes = count * index.dim * 4 / 1e6
+            print(
+                f"{count:>9} {embed_seconds:>8.2f} {percentile(timings, 50):>8.3f} "
+                f"{percentile(timings, 95):>8.3f} {max(timings):>8.3f} {megabytes:>6.0f} "
+                f"{save_seconds:>7.2f} {open_ms:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
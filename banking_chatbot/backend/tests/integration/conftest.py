@@ -2,11 +2,13 @@
 import pytest
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from app.main import app
-from app.database import Base
+from app.database import Base, async_database_url, get_async_db
 from app.dependencies import get_db
 from app.repositories.user_repository import UserRepository
 from app.core.security import get_password_hash
@@ -35,11 +37,27 @@ def integration_client(integration_db):
             yield integration_db
         finally:
             pass
-    
+
+    # Routers on the async session (e.g. conversations) use the same test database.
+    # NullPool: no connection outlives the event loop of this client.
+    async_engine = create_async_engine(async_database_url(TEST_DATABASE_URL), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            try:
+                yield db
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     with TestClient(app) as test_client:
         yield test_client
+        test_client.portal.call(async_engine.dispose)
     
     app.dependency_overrides.clear()
 
@@ -68,3 +68,144 @@ async def test_ai_service_with_custom_system_prompt(monkeypatch):
     assert response is not None
     assert isinstance(response, dict)
     assert "content" in response
+
+@pytest.mark.asyncio
+async def test_mock_stream_response(monkeypatch):
+    """Test mock provider streams tokens and ends with a done event"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    
+    events = [event async for event in service.stream_response(message="Consultar saldo")]
+    
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert events[-1]["type"] == "done"
+    assert "".join(tokens) == events[-1]["content"]
+    assert events[-1]["metadata"]["streamed"] is True
+
+@pytest.mark.asyncio
+async def test_anthropic_stream_response(monkeypatch):
+    """Test Anthropic SSE deltas are forwarded as tokens"""
+    import json
+    import httpx
+    from app.services.provider_clients import ProviderClientPool
+    
+    body = (
+        'event: message_start\ndata: {"type": "message_start"}\n\n'
+        'event: content_block_delta\ndata: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hola"}}\n\n'
+        'event: content_block_delta\ndata: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": " cliente"}}\n\n'
+        'event: message_stop\ndata: {"type": "message_stop"}\n\n'
+    )
+    
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+    
+    monkeypatch.setenv("AI_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    service = AIService()
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    
+    events = [event async for event in service.stream_response(message="Hola")]
+    
+    assert [e["content"] for e in events if e["type"] == "token"] == ["Hola", " cliente"]
+    assert events[-1]["content"] == "Hola cliente"
+    assert events[-1]["metadata"]["provider"] == "anthropic"
+    await service.shutdown()
+
+@pytest.mark.asyncio
+async def test_openai_stream_error_status(monkeypatch):
+    """Test a non-200 streaming response ends with an error done event"""
+    import httpx
+    from app.services.provider_clients import ProviderClientPool
+    
+    def handler(request):
+        return httpx.Response(429, json={"error": {"message": "Rate limit reached"}})
+    
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    service = AIService()
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    service.router.fallback_to_mock = False
+    
+    events = [event async for event in service.stream_response(message="Hola")]
+    
+    assert len(events) == 1
+    assert events[0]["type"] == "done"
+    assert events[0]["metadata"]["error"] == "api_error"
+    assert events[0]["metadata"]["status"] == 429
+    await service.shutdown()
+
+@pytest.mark.asyncio
+async def test_anthropic_prompt_caching(monkeypatch):
+    """Test the system prompt and previous turns are marked cacheable and cache reads reported"""
+    import json
+    import httpx
+    from app.services.provider_clients import ProviderClientPool
+    from app.services.prompts import get_system_prompt
+    
+    sent = {}
+    
+    def handler(request):
+        sent.update(json.loads(request.content))
+        return httpx.Response(200, json={
+            "content": [{"type": "text", "text": "Claro"}],
+            "usage": {"input_tokens": 20, "cache_read_input_tokens": 1500, "cache_creation_input_tokens": 0, "output_tokens": 5}
+        })
+    
+    monkeypatch.setenv("AI_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    service = AIService()
+    service.cache.enabled = False
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    
+    history = [
+        {"role": "user", "content": "Quiero una tarjeta"},
+        {"role": "assistant", "content": "Tenemos Clásica, Gold y Platinum"}
+    ]
+    response = await service.generate_response(
+        message="¿Cuál me conviene?",
+        conversation_history=history,
+        conversation_summary="El cliente es nuevo."
+    )
+    
+    version, text = get_system_prompt()
+    assert sent["system"][0] == {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+    assert "cache_control" not in sent["system"][1]
+    assert sent["messages"][1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert sent["messages"][-1] == {"role": "user", "content": "¿Cuál me conviene?"}
+    assert response["metadata"]["usage"]["cache_read_tokens"] == 1500
+    assert response["metadata"]["usage"]["input_tokens"] == 1520
+    assert response["metadata"]["prompt"]["version"] == version
+    await service.shutdown()
+
+@pytest.mark.asyncio
+async def test_openai_cached_tokens_reported(monkeypatch):
+    """Test OpenAI prefix-cache hits are reported and the static system prompt comes first"""
+    import json
+    import httpx
+    from app.services.provider_clients import ProviderClientPool
+    from app.services.prompts import get_system_prompt
+    
+    sent = {}
+    
+    def handler(request):
+        sent.update(json.loads(request.content))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "Claro"}}],
+            "usage": {"prompt_tokens": 1300, "completion_tokens": 4, "prompt_tokens_details": {"cached_tokens": 1152}}
+        })
+    
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = AIService()
+    service.cache.enabled = False
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    
+    response = await service.generate_response(message="Hola", conversation_summary="El cliente es nuevo.")
+    
+    assert sent["messages"][0] == {"role": "system", "content": get_system_prompt()[1]}
+    assert sent["messages"][1]["role"] == "system"
+    assert response["metadata"]["usage"]["cache_read_tokens"] == 1152
+    await service.shutdown()
@@ -0,0 +1,132 @@
+# Unit tests for the async database layer (AsyncSession repositories)
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.conversations import get_conversation, get_conversations
+from app.database import Base, async_database_url
+from app.models import DBConversation, DBMessage, DBTicket, DBUser, MessageRole, TicketPriority
+from app.repositories import AsyncConversationRepository, AsyncMessageRepository
+
+pytest.importorskip("aiosqlite")
+
+
+@asynccontextmanager
+async def async_session():
+    """aiosqlite session with the conversation tables"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[DBUser.__table__, DBConversation.__table__, DBMessage.__table__, DBTicket.__table__],
+        )
+    async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+        yield db
+    await engine.dispose()
+
+
+async def create_conversation(db, message_count):
+    conversation = await AsyncConversationRepository(db).create(
+        conversation_id="conv-1", user_id="user-1"
+    )
+    started = datetime(2026, 1, 1)
+    for i in range(message_count):
+        db.add(DBMessage(
+            conversation_id=conversation.id,
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content=f"mensaje {i}",
+            created_at=started + timedelta(seconds=i),
+        ))
+    await db.commit()
+    return conversation
+
+
+def test_async_database_url_uses_async_drivers():
+    """Sync URLs map to asyncpg / aiosqlite; sslmode becomes asyncpg's ssl"""
+    assert async_database_url("postgresql://u:p@db:5432/chat") == "postgresql+asyncpg://u:p@db:5432/chat"
+    assert async_database_url("postgresql://u:p@db/chat?sslmode=require") == (
+        "postgresql+asyncpg://u:p@db/chat?ssl=require"
+    )
+    assert async_database_url("sqlite:///./chat.db") == "sqlite+aiosqlite:///./chat.db"
+    assert async_database_url("postgresql+asyncpg://u:p@db/chat") == "postgresql+asyncpg://u:p@db/chat"
+
+
+@pytest.mark.asyncio
+async def test_async_repositories_read_and_write():
+    """Async repositories mirror the sync ones (lookups, counts, last-N history)"""
+    async with async_session() as db:
+        conversation = await create_conversation(db, 12)
+        conv_repo = AsyncConversationRepository(db)
+        msg_repo = AsyncMessageRepository(db)
+
+        assert (await conv_repo.get_by_conversation_id("conv-1")).id == conversation.id
+        assert await conv_repo.exists(conversation_id="conv-1")
+        assert await msg_repo.count_by_conversation(conversation.id) == 12
+        recent = await msg_repo.get_recent(conversation.id, limit=3)
+        assert [row.content for row in recent] == ["mensaje 9", "mensaje 10", "mensaje 11"]
+        assert (await msg_repo.get_latest_message(conversation.id)).content == "mensaje 11"
+
+        escalated = await conv_repo.escalate("conv-1", "fraude")
+        assert escalated.is_escalated and escalated.escalation_reason == "fraude"
+        assert [c.id for c in await conv_repo.get_escalated_conversations()] == [conversation.id]
+
+
+@pytest.mark.asyncio
+async def test_async_update_summary_detects_concurrent_writer():
+    """Compare-and-set on summarized_until_id works through the async session"""
+    async with async_session() as db:
+        conversation = await create_conversation(db, 2)
+        conv_repo = AsyncConversationRepository(db)
+
+        assert await conv_repo.update_summary(conversation.id, "resumen", 2, expected_until_id=None)
+        assert not await conv_repo.update_summary(conversation.id, "otro", 3, expected_until_id=None)
+        await conv_repo.add_llm_usage(conversation.id, input_tokens=100, output_tokens=20, cost_usd=0.01)
+        await db.commit()
+
+        await db.refresh(conversation)
+        assert conversation.summary == "resumen"
+        assert (conversation.llm_calls, conversation.llm_input_tokens) == (1, 100)
+
+
+@pytest.mark.asyncio
+async def test_async_escalate_with_ticket():
+    """Escalation in one operation (UPDATE/INSERT ... RETURNING) on an AsyncSession"""
+    async with async_session() as db:
+        created = await create_conversation(db, 1)
+        created.customer_name = "Ana"
+        await db.commit()
+        conversation, ticket = await AsyncConversationRepository(db).escalate_with_ticket(
+            "conv-1", reason="fraude", ticket_id="TKT-1", subject="Escalation: general",
+            description="Cargo no reconocido", priority=TicketPriority.URGENT, system_message="Escalado",
+        )
+        await db.commit()
+
+        assert conversation.is_escalated and ticket.customer_id == "user-1" and ticket.id
+        assert await AsyncMessageRepository(db).count_by_conversation(conversation.id) == 2
+        assert await AsyncConversationRepository(db).escalate_with_ticket(
+            "missing", reason="x", ticket_id="TKT-2", subject="s", description="d", priority=TicketPriority.LOW,
+        ) is None
+
+
+@pytest.mark.asyncio
+async def test_conversations_router_uses_async_session():
+    """The migrated conversations endpoints run on an AsyncSession"""
+    async with async_session() as db:
+        await create_conversation(db, 3)
+
+        listing = await get_conversations(db=db)
+        detail = json.loads((await get_conversation("conv-1", limit=2, before=None, after=None, db=db)).body)
+        older = json.loads(
+            (await get_conversation("conv-1", limit=2, before=detail["page"]["before"], after=None, db=db)).body
+        )
+
+        assert [c["id"] for c in listing["conversations"]] == ["conv-1"]
+        assert [m["content"] for m in detail["messages"]] == ["mensaje 1", "mensaje 2"]
+        assert [m["content"] for m in older["messages"]] == ["mensaje 0"] and not older["page"]["has_older"]
+        with pytest.raises(HTTPException):
+            await get_conversation("missing", limit=50, before=None, after=None, db=db)
@@ -0,0 +1,107 @@
+# Unit tests for the per-provider concurrency bulkhead
+import asyncio
+
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.bulkhead import Bulkhead, BulkheadRejected
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrency_in_fifo_order():
+    """Test at most max_concurrent calls run and waiters are served in order"""
+    bulkhead = Bulkhead("test", max_concurrent=2, max_queue=10, queue_timeout=5)
+    gate = asyncio.Event()
+    running, peak, order = 0, 0, []
+
+    async def call(i):
+        nonlocal running, peak
+        async with bulkhead.slot():
+            running += 1
+            peak = max(peak, running)
+            order.append(i)
+            await gate.wait()
+            running -= 1
+
+    tasks = [asyncio.create_task(call(i)) for i in range(5)]
+    await asyncio.sleep(0)
+    assert bulkhead.stats()["active"] == 2
+    assert bulkhead.stats()["queued"] == 3
+
+    gate.set()
+    await asyncio.gather(*tasks)
+
+    assert peak == 2
+    assert order == [0, 1, 2, 3, 4]
+    stats = bulkhead.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 5 and stats["queued_total"] == 3 and stats["peak_queued"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    """Test callers beyond the queue bound are rejected without waiting"""
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=5)
+    await bulkhead.acquire()
+    waiter = asyncio.create_task(bulkhead.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(BulkheadRejected) as rejected:
+        await bulkhead.acquire()
+
+    assert rejected.value.reason == "queue_full"
+    bulkhead.release()
+    await waiter
+    assert bulkhead.stats()["rejected"] == {"queue_full": 1, "queue_timeout": 0}
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline():
+    """Test a queued caller gives up after queue_timeout and frees its place"""
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=5, queue_timeout=0.01)
+    await bulkhead.acquire()
+
+    with pytest.raises(BulkheadRejected) as rejected:
+        await bulkhead.acquire()
+
+    assert rejected.value.reason == "queue_timeout"
+    assert bulkhead.queued == 0
+    bulkhead.release()
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    """Test a cancelled waiter leaves the queue and later callers still get in"""
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=5, queue_timeout=5)
+    await bulkhead.acquire()
+    waiter = asyncio.create_task(bulkhead.acquire())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    bulkhead.release()
+
+    assert await bulkhead.acquire() == 0.0
+    assert bulkhead.active == 1 and bulkhead.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_ai_service_sheds_load_with_friendly_message(monkeypatch):
+    """Test a full queue answers immediately in Spanish, for regular and streamed replies"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache.enabled = False
+    service.bulkheads["mock"] = Bulkhead("mock", max_concurrent=1, max_queue=0, queue_timeout=5)
+    await service.bulkheads["mock"].acquire()
+
+    response = await service.generate_response(message="Consultar saldo")
+    events = [event async for event in service.stream_response(message="Consultar saldo")]
+
+    for result in (response, events[-1]):
+        assert result["metadata"]["error"] == "overloaded"
+        assert result["metadata"]["reason"] == "queue_full"
+        assert "intenta de nuevo" in result["content"]
+    assert len(events) == 1
+    assert service.get_stats()["bulkheads"]["mock"]["rejected"]["queue_full"] == 2
@@ -0,0 +1,85 @@
+# Unit tests for persistence of streamed chat answers (/chat/message/stream)
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.v1.chat as chat_module
+from app.api.v1.chat import SendMessageRequest, send_message_stream
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.services.conversation_cache import ConversationCache
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """SQLite conversation, with a provider stream of three tokens"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    with SessionLocal() as db:
+        db.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1"))
+        db.commit()
+
+    @contextmanager
+    def get_db_context():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    async def stream_response(message, context):
+        for word in ("Tu ", "saldo ", "es 100"):
+            yield {"type": "token", "content": word}
+            await asyncio.sleep(0)
+        yield {"type": "done", "content": "Tu saldo es 100", "metadata": {"provider": "openai"}}
+
+    monkeypatch.setattr(chat_module, "get_db_context", get_db_context)
+    monkeypatch.setattr(chat_module, "stream_response", stream_response)
+    monkeypatch.setattr(chat_module, "conversation_cache", ConversationCache(enabled=False))
+    monkeypatch.setattr(chat_module.knowledge_retriever, "retrieve", lambda message: [])
+    monkeypatch.setattr(chat_module.conversation_summarizer, "schedule", lambda conversation_pk: None)
+    monkeypatch.setattr(chat_module.quick_replies, "match", lambda message: None)
+    yield SessionLocal
+    engine.dispose()
+
+
+async def open_stream(SessionLocal):
+    with SessionLocal() as db:
+        response = await send_message_stream.__wrapped__(  # without the rate limiter
+            request=None, db=db, msg_request=SendMessageRequest(conversation_id="conv-1", message="¿Mi saldo?")
+        )
+    return response.body_iterator
+
+
+def assistant_messages(SessionLocal):
+    with SessionLocal() as db:
+        return [
+            (m.content, m.message_metadata)
+            for m in db.query(DBMessage).filter(DBMessage.role == MessageRole.ASSISTANT)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_streamed_answer_is_stored_when_the_stream_ends(sessions):
+    """Token events, then done; the full answer is stored once the stream ends"""
+    events = [event async for event in await open_stream(sessions)]
+
+    assert [event.split("\n")[0] for event in events] == ["event: token"] * 3 + ["event: done"]
+    assert assistant_messages(sessions) == [("Tu saldo es 100", {"provider": "openai"})]
+
+
+@pytest.mark.asyncio
+async def test_partial_answer_is_stored_when_the_client_disconnects(sessions):
+    """Closing the stream after the first token stores the text sent so far"""
+    events = await open_stream(sessions)
+    first = await events.__anext__()
+    await events.aclose()
+
+    assert first.startswith("event: token")
+    assert assistant_messages(sessions) == [("Tu ", {"stream_interrupted": True})]
@@ -0,0 +1,134 @@
+# Unit tests for the hot conversation cache
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.v1.chat as chat_module
+from app.api.v1.chat import SendMessageRequest, _prepare_turn, _store_message
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.services.conversation_cache import ConversationCache
+from app.services.message_writer import MessageWriter
+
+
+def conversation_row(pk, conversation_id, summarized_until_id=None):
+    return SimpleNamespace(
+        id=pk, conversation_id=conversation_id, user_id="user-1", is_active=True,
+        is_escalated=False, summary=None, summarized_until_id=summarized_until_id,
+    )
+
+
+def message(message_id, content):
+    return SimpleNamespace(id=message_id, role=MessageRole.USER, content=content, created_at=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_hit_ratio():
+    """Least recently used conversations are evicted; hits and misses are counted"""
+    cache = ConversationCache(max_entries=2, enabled=True)
+    cache.put(conversation_row(1, "a"), [])
+    cache.put(conversation_row(2, "b"), [])
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.put(conversation_row(3, "c"), [])
+
+    assert cache.get("b") is None
+    assert cache.get("c").id == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+    assert stats["hit_ratio"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_entries_expire_after_ttl():
+    """Entries are re-read after the TTL (writes from other workers)"""
+    clock = FakeClock()
+    cache = ConversationCache(ttl_seconds=60, enabled=True, clock=clock)
+    cache.put(conversation_row(1, "a"), [])
+
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_window_follows_writes_and_summary():
+    """Appended messages roll the window; summarized ones leave the history"""
+    cache = ConversationCache(window=3, enabled=True)
+    cache.put(conversation_row(1, "a"), [message(1, "m1"), message(2, "m2")])
+    for i in (3, 4):
+        cache.append_message(1, message(i, f"m{i}"))
+
+    entry = cache.get("a")
+    assert [m.content for m in entry.history(10)] == ["m2", "m3", "m4"]
+    cache.update_summary(1, "resumen", summarized_until_id=3)
+    assert [m.content for m in entry.history(10)] == ["m4"]
+    assert entry.summary == "resumen"
+
+    cache.invalidate("a")
+    assert cache.get("a") is None and cache.stats()["invalidations"] == 1
+
+
+def test_steady_state_turn_reads_nothing_from_the_database(monkeypatch):
+    """After the first turn, a chat turn only writes (no SELECT)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1"))
+    db.commit()
+
+    monkeypatch.setattr(chat_module, "conversation_cache", ConversationCache(enabled=True))
+    monkeypatch.setattr(chat_module.knowledge_retriever, "retrieve", lambda message: [])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+
+    request = SendMessageRequest(conversation_id="conv-1", message="Hola")
+    conversation, _ = _prepare_turn(db, request)
+    _store_message(db, conversation.id, MessageRole.ASSISTANT, "¿En qué te ayudo?", {})
+    db.commit()
+    assert any(sql.lstrip().upper().startswith("SELECT") for sql in statements)
+
+    statements.clear()
+    request = SendMessageRequest(conversation_id="conv-1", message="Mi saldo")
+    _, context = _prepare_turn(db, request)
+    db.commit()
+
+    assert not [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    assert [turn["content"] for turn in context["history"]] == ["Hola", "¿En qué te ayudo?"]
+    assert chat_module.conversation_cache.stats()["hits"] == 1
+    db.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_user_message_metadata_is_the_request_context(monkeypatch, write_behind):
+    """Building the AI context does not add history / knowledge to the stored message"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    db = sessionmaker(bind=engine, autoflush=False)()
+    db.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1"))
+    db.commit()
+
+    monkeypatch.setattr(chat_module, "conversation_cache", ConversationCache(enabled=True))
+    monkeypatch.setattr(chat_module, "message_writer", MessageWriter(enabled=write_behind))
+    monkeypatch.setattr(chat_module.knowledge_retriever, "retrieve", lambda message: [{"id": 9}])
+
+    request = SendMessageRequest(conversation_id="conv-1", message="Hola", context={"channel": "web"})
+    _, context = _prepare_turn(db, request)
+    db.commit()
+
+    assert context["knowledge"] == [{"id": 9}] and request.context == {"channel": "web"}
+    if write_behind:
+        stored = chat_module.message_writer.pending(1)[0].message_metadata
+    else:
+        stored = db.query(DBMessage).one().message_metadata
+    assert stored == {"channel": "web"}
+    db.close()
+    engine.dispose()
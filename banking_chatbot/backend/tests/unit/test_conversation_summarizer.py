@@ -0,0 +1,133 @@
+# Unit tests for rolling conversation summaries
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.conversation_summarizer as summarizer_module
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.services.conversation_summarizer import ConversationSummarizer, extractive_summary
+from app.services.prompt_builder import SUMMARY_HEADER, PromptBuilder
+
+
+class FakeAIService:
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    async def complete_text(self, message, system_prompt, max_message_tokens=4000):
+        self.requests.append(message)
+        return self.reply
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """SQLite database with the conversation tables, used by the summarizer"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    @contextmanager
+    def get_db_context():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    monkeypatch.setattr(summarizer_module, "get_db_context", get_db_context)
+    yield SessionLocal
+    engine.dispose()
+
+
+def create_conversation(SessionLocal, message_count):
+    db = SessionLocal()
+    conversation = DBConversation(conversation_id="conv-1", user_id="user-1")
+    db.add(conversation)
+    db.flush()
+    for i in range(message_count):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        db.add(DBMessage(conversation_id=conversation.id, role=role, content=f"mensaje {i}"))
+        db.flush()
+    db.commit()
+    conversation_id = conversation.id
+    db.close()
+    return conversation_id
+
+
+def load(SessionLocal, conversation_id):
+    db = SessionLocal()
+    conversation = db.get(DBConversation, conversation_id)
+    ids = [m.id for m in db.query(DBMessage).order_by(DBMessage.id)]
+    db.close()
+    return conversation, ids
+
+
+@pytest.mark.asyncio
+async def test_short_conversation_is_not_summarized(session_factory, monkeypatch):
+    """Test nothing is folded while the conversation fits the live window"""
+    fake = FakeAIService("Resumen")
+    monkeypatch.setattr(summarizer_module, "ai_service", fake)
+    conversation_id = create_conversation(session_factory, 8)
+    summarizer = ConversationSummarizer(enabled=True, live_messages=6, min_batch=4, max_batch=20)
+
+    assert await summarizer.summarize(conversation_id) is False
+    assert fake.requests == []
+
+
+@pytest.mark.asyncio
+async def test_old_messages_are_folded_into_summary(session_factory, monkeypatch):
+    """Test messages older than the live window are summarized and the cursor advances"""
+    fake = FakeAIService("El cliente pidió información de tarjetas.")
+    monkeypatch.setattr(summarizer_module, "ai_service", fake)
+    conversation_id = create_conversation(session_factory, 12)
+    summarizer = ConversationSummarizer(enabled=True, live_messages=6, min_batch=4, max_batch=20)
+
+    assert await summarizer.summarize(conversation_id) is True
+
+    conversation, ids = load(session_factory, conversation_id)
+    assert conversation.summary == "El cliente pidió información de tarjetas."
+    assert conversation.summarized_until_id == ids[5]
+    assert "Cliente: mensaje 0" in fake.requests[0]
+    assert "mensaje 6" not in fake.requests[0]
+
+    # Nothing new to fold until more messages arrive
+    assert await summarizer.summarize(conversation_id) is False
+    assert summarizer.stats()["llm_summaries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_extractive_fallback_without_llm(session_factory, monkeypatch):
+    """Test a summary is still produced when no provider is available"""
+    monkeypatch.setattr(summarizer_module, "ai_service", FakeAIService(None))
+    conversation_id = create_conversation(session_factory, 10)
+    summarizer = ConversationSummarizer(enabled=True, live_messages=6, min_batch=4, max_batch=20)
+
+    assert await summarizer.summarize(conversation_id) is True
+
+    conversation, _ = load(session_factory, conversation_id)
+    assert conversation.summary.splitlines() == [
+        "Cliente: mensaje 0", "Asistente: mensaje 1", "Cliente: mensaje 2", "Asistente: mensaje 3"
+    ]
+    assert summarizer.stats()["fallback_summaries"] == 1
+
+
+def test_extractive_summary_keeps_recent_lines():
+    """Test the fallback summary drops the oldest lines first"""
+    previous = "\n".join(f"Cliente: antiguo {i}" for i in range(50))
+    summary = extractive_summary(previous, "Asistente: nuevo", max_tokens=20)
+
+    assert summary.endswith("Asistente: nuevo")
+    assert "antiguo 0" not in summary
+
+
+def test_summary_is_sent_after_system_prompt():
+    """Test the running summary is part of the system text and its token count"""
+    prompt = PromptBuilder(history_budget=100).build("hola", [], "Sistema", summary="El cliente pidió un préstamo.")
+
+    assert prompt.system_text == f"Sistema\n\n{SUMMARY_HEADER}\nEl cliente pidió un préstamo."
+    assert prompt.stats()["summary_tokens"] > 0
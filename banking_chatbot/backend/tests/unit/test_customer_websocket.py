@@ -0,0 +1,124 @@
+# Unit tests for the customer chat WebSocket
+from contextlib import contextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.websockets import WebSocketDisconnect
+
+import app.api.v1.chat as chat_module
+import app.api.v1.tickets as tickets_module
+from app.core.security import create_conversation_token, verify_conversation_token, verify_token
+from app.core.websocket_manager import ConnectionManager
+from app.database import Base, get_db
+from app.models import DBConversation, DBMessage, DBTicket, DBUser, MessageRole
+from app.services.conversation_cache import ConversationCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Chat and ticket routers on SQLite, with a scripted streaming answer"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        DBUser.__table__, DBConversation.__table__, DBMessage.__table__, DBTicket.__table__
+    ])
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    @contextmanager
+    def get_db_context():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def override_get_db():
+        with get_db_context() as db:
+            yield db
+
+    async def stream_response(message, context):
+        for word in ("Tu ", "saldo ", "es 100"):
+            yield {"type": "token", "content": word}
+        yield {"type": "done", "content": "Tu saldo es 100", "metadata": {}}
+
+    manager = ConnectionManager()
+    monkeypatch.setattr(chat_module, "manager", manager)
+    monkeypatch.setattr(tickets_module, "manager", manager)
+    monkeypatch.setattr(chat_module, "get_db_context", get_db_context)
+    monkeypatch.setattr(chat_module, "stream_response", stream_response)
+    monkeypatch.setattr(chat_module, "conversation_cache", ConversationCache(enabled=False))
+    monkeypatch.setattr(chat_module.knowledge_retriever, "retrieve", lambda message: [])
+    monkeypatch.setattr(chat_module.conversation_summarizer, "schedule", lambda conversation_pk: None)
+    monkeypatch.setattr(chat_module.quick_replies, "match", lambda message: None)
+
+    app = FastAPI()
+    app.include_router(chat_module.router, prefix="/chat")
+    app.include_router(tickets_module.router, prefix="/tickets")
+    app.dependency_overrides[get_db] = override_get_db
+    with SessionLocal() as db:
+        db.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1", customer_name="Ana"))
+        db.commit()
+
+    with TestClient(app) as test_client:
+        test_client.sessions = SessionLocal
+        test_client.manager = manager
+        yield test_client
+    engine.dispose()
+
+
+def test_conversation_token_is_bound_to_its_conversation():
+    """Widget tokens open one conversation and are not staff credentials"""
+    token = create_conversation_token("conv-1")
+
+    assert verify_conversation_token(token, "conv-1")
+    assert not verify_conversation_token(token, "conv-2")
+    with pytest.raises(Exception):
+        verify_token(token)
+
+
+@pytest.mark.parametrize("query", ["", "?token=invalid", f"?token={create_conversation_token('conv-2')}"])
+def test_websocket_requires_the_conversation_token(client, query):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/chat/ws/conv-1{query}") as websocket:
+            websocket.receive_json()
+
+    assert closed.value.code in (4001, 4003)
+
+
+def test_message_is_answered_with_streamed_tokens(client):
+    """A message over the socket streams token events, then done; both messages are stored"""
+    with client.websocket_connect(f"/chat/ws/conv-1?token={create_conversation_token('conv-1')}") as websocket:
+        websocket.send_json({"type": "message", "message": "¿Mi saldo?"})
+        events = [websocket.receive_json() for _ in range(4)]
+        websocket.send_json({"type": "message", "message": "   "})
+        error = websocket.receive_json()
+
+    assert [event["content"] for event in events[:3]] == ["Tu ", "saldo ", "es 100"]
+    assert events[3] == {"type": "done", "message": "Tu saldo es 100", "metadata": {}, "conversation_id": "conv-1"}
+    assert (error["type"], error["status"]) == ("error", 422)
+    with client.sessions() as db:
+        assert [(m.role, m.content) for m in db.query(DBMessage).order_by(DBMessage.id)] == [
+            (MessageRole.USER, "¿Mi saldo?"), (MessageRole.ASSISTANT, "Tu saldo es 100")
+        ]
+
+
+def test_escalation_and_agent_replies_are_pushed(client):
+    """Escalating over the socket confirms with a push; agent replies arrive without polling"""
+    with client.websocket_connect(f"/chat/ws/conv-1?token={create_conversation_token('conv-1')}") as websocket:
+        websocket.send_json({"type": "escalate", "category": "fraude"})
+        escalated = websocket.receive_json()
+        assert client.manager.get_connection_stats()["customer_connections"] == 1
+
+        response = client.post(f"/tickets/{escalated['data']['ticket_id']}/messages", json={"message": "Hola, soy Ana"})
+        reply = websocket.receive_json()
+
+    assert escalated["type"] == "escalated"
+    assert response.status_code == 200
+    assert (reply["type"], reply["data"]["content"], reply["conversation_id"]) == (
+        "agent_message", "Hola, soy Ana", "conv-1"
+    )
+    assert client.manager.get_connection_stats()["customer_connections"] == 0
@@ -0,0 +1,73 @@
+# Unit tests for the single-transaction escalation path
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.chat import EscalateRequest, escalate_to_agent
+from app.database import Base
+from app.models import DBConversation, DBMessage, DBTicket, DBUser, MessageRole, TicketPriority
+
+
+@pytest.fixture
+def db():
+    """SQLite session with a conversation, counting the statements sent to the database"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[
+        DBUser.__table__, DBConversation.__table__, DBMessage.__table__, DBTicket.__table__
+    ])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add(DBConversation(
+        conversation_id="conv-1", user_id="user-1", customer_name="Ana", customer_email="ana@example.com"
+    ))
+    session.commit()
+
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: session.statements.append(sql))
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_escalation_uses_three_statements(db):
+    """Conversation update, ticket insert and system message: one round trip each"""
+    response = await escalate_to_agent(
+        EscalateRequest(conversation_id="conv-1", priority="high", description="Cargo no reconocido"), db=db
+    )
+    db.commit()
+
+    assert len(db.statements) == 3
+    assert [sql.split()[0].upper() for sql in db.statements] == ["UPDATE", "INSERT", "INSERT"]
+    assert all("RETURNING" in sql.upper() for sql in db.statements[:2])
+    assert response["ticket"]["priority"] == "HIGH" and response["ticket"]["created_at"]
+
+
+@pytest.mark.asyncio
+async def test_escalation_writes_conversation_ticket_and_message(db):
+    """The single operation leaves the same rows as the step-by-step version"""
+    response = await escalate_to_agent(EscalateRequest(conversation_id="conv-1", category="fraude"), db=db)
+    db.commit()
+
+    conversation = db.query(DBConversation).one()
+    ticket = db.query(DBTicket).one()
+    notice = db.query(DBMessage).one()
+    assert conversation.is_escalated and conversation.escalation_reason == "Customer escalation"
+    assert (ticket.ticket_id, ticket.customer_name, ticket.customer_email) == (
+        response["ticket_id"], "Ana", "ana@example.com"
+    )
+    assert (ticket.priority, ticket.category, ticket.subject) == (TicketPriority.MEDIUM, "fraude", "Escalation: fraude")
+    assert notice.role == MessageRole.SYSTEM and response["ticket_id"] in notice.content
+    assert notice.message_metadata == {"type": "escalation", "ticket_id": ticket.id}
+
+
+@pytest.mark.asyncio
+async def test_escalating_unknown_conversation_writes_nothing(db):
+    """A missing conversation is a 404 after a single statement"""
+    with pytest.raises(HTTPException) as error:
+        await escalate_to_agent(EscalateRequest(conversation_id="missing"), db=db)
+
+    assert error.value.status_code == 404
+    assert len(db.statements) == 1
+    assert db.query(DBTicket).count() == 0
@@ -0,0 +1,138 @@
+# Unit tests for hedged requests and jittered retries
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.bulkhead import Bulkhead
+from app.services.hedging import Hedger, RetryPolicy
+from app.services.provider_clients import ProviderClientPool
+
+
+def openai_service(monkeypatch, handler):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    service = AIService()
+    service.cache.enabled = False
+    service.single_flight_enabled = False
+    service.router.fallback_to_mock = False
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_backoff_is_jittered_and_capped():
+    """Test delays stay within base * 2^attempt (capped) and are not all equal"""
+    policy = RetryPolicy(max_retries=5, base_delay=0.1, max_delay=0.5, seed=3)
+
+    for attempt in range(6):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= min(0.5, 0.1 * 2 ** attempt) for d in delays)
+        assert len(set(delays)) > 100
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_is_slow():
+    """Test a second call starts after the delay and the first answer is used"""
+    hedger = Hedger(enabled=True, min_delay=0.01)
+    bulkhead = Bulkhead("test", max_concurrent=2, max_queue=0, queue_timeout=1)
+    await bulkhead.acquire()
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        return f"call {len(calls)}"
+
+    result = await hedger.call(call, hedger.delay_for(0.01), lambda r: False, bulkhead)
+
+    assert result == "call 2"
+    assert hedger.stats()["hedged"] == 1 and hedger.stats()["hedge_wins"] == 1
+    assert bulkhead.active == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_spare_capacity():
+    """Test hedges never queue for or exceed the concurrency budget"""
+    hedger = Hedger(enabled=True, min_delay=0.01)
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=0, queue_timeout=1)
+    await bulkhead.acquire()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert await hedger.call(call, 0.01, lambda r: False, bulkhead) == "primary"
+    assert hedger.stats()["hedged"] == 0 and hedger.stats()["skipped_no_capacity"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_hedge_closes_losing_stream():
+    """Test the stream with the first event wins and the other stream is closed"""
+    hedger = Hedger(enabled=True, min_delay=0.01)
+    opened, closed = [], []
+
+    async def open_stream():
+        index = len(opened)
+        opened.append(index)
+        try:
+            await asyncio.sleep(5 if index == 0 else 0)
+            for token in ["Hola", " cliente"]:
+                yield {"type": "token", "content": token, "stream": index}
+        finally:
+            closed.append(index)
+
+    events = [event async for event in hedger.stream(open_stream, 0.01, lambda e: False)]
+
+    assert [e["stream"] for e in events] == [1, 1]
+    assert sorted(closed) == [0, 1]
+    assert hedger.stats()["hedge_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_ai_service_retries_rate_limit(monkeypatch):
+    """Test a 429 is retried on the same provider before giving up"""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            return httpx.Response(429, json={"error": {"message": "Rate limit reached"}})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Hola"}}]})
+
+    service = openai_service(monkeypatch, handler)
+    service.retry = RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.001)
+
+    response = await service.generate_response(message="Hola")
+
+    assert response["content"] == "Hola"
+    assert len(attempts) == 2
+    assert service.get_stats()["retries"]["retries"] == 1
+    assert "failover_from" not in response["metadata"]
+    await service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_ai_service_hedges_slow_request(monkeypatch):
+    """Test a request slower than the provider's p95 is hedged within the bulkhead"""
+    attempts = []
+
+    async def handler(request):
+        attempts.append(json.loads(request.content)["messages"][-1]["content"])
+        if len(attempts) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"Respuesta {len(attempts)}"}}]})
+
+    service = openai_service(monkeypatch, handler)
+    service.hedger = Hedger(enabled=True, min_delay=0.01)
+    service.router.record_success("openai", 0.01)
+
+    response = await asyncio.wait_for(service.generate_response(message="Hola"), timeout=2)
+
+    assert response["content"] == "Respuesta 2"
+    assert attempts == ["Hola", "Hola"]
+    assert service.get_stats()["hedging"]["hedge_wins"] == 1
+    assert service.bulkheads["openai"].active == 0
+    await service.shutdown()
@@ -0,0 +1,113 @@
+# Unit tests for keyset (cursor) pagination of message history
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.chat import get_history
+from app.core.pagination import decode_cursor, encode_cursor, page_info
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.repositories import MessageRepository
+
+
+@pytest.fixture
+def db():
+    """SQLite session with a 25-message conversation (messages 5 and 6 share a timestamp)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    session.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1"))
+    started = datetime(2026, 1, 1)
+    for i in range(25):
+        session.add(DBMessage(
+            conversation_id=1,
+            role=MessageRole.USER,
+            content=f"mensaje {i}",
+            created_at=started + timedelta(seconds=5 if i == 6 else i),
+        ))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_cursor_round_trip():
+    """Cursors are opaque strings that decode to (created_at, id); garbage is a 400"""
+    position = (datetime(2026, 1, 1, 12, 30, 5, 123456), 42)
+    assert decode_cursor(encode_cursor(*position)) == position
+    assert decode_cursor(None) is None
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+
+def test_pages_walk_back_and_forward_without_gaps(db):
+    """before/after pages cover every message once, ties on created_at broken by id"""
+    repo = MessageRepository(db)
+    expected = [m.content for m in repo.get_by_conversation(1)]
+
+    seen, before = [], None
+    while True:
+        messages, more = repo.get_page(1, limit=10, before=before)
+        seen = [m.content for m in messages] + seen
+        page = page_info(messages, 10, before, None, more)
+        if not page["has_older"]:
+            break
+        before = decode_cursor(page["before"])
+    assert seen == expected
+
+    seen, after = [], (datetime(2025, 12, 31), 0)
+    while True:
+        messages, more = repo.get_page(1, limit=4, after=after)
+        seen += [m.content for m in messages]
+        if not more:
+            break
+        after = decode_cursor(page_info(messages, 4, None, after, more)["after"])
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_returns_the_latest_page(db):
+    """/chat/history returns the newest `limit` messages and a cursor for older ones"""
+    latest = json.loads((await get_history("conv-1", limit=5, before=None, after=None, db=db)).body)
+    assert [m["content"] for m in latest["messages"]] == [f"mensaje {i}" for i in range(20, 25)]
+    assert latest["page"]["has_older"] and not latest["page"]["has_newer"]
+
+    older = json.loads((await get_history("conv-1", limit=5, before=latest["page"]["before"], after=None, db=db)).body)
+    assert [m["content"] for m in older["messages"]] == [f"mensaje {i}" for i in range(15, 20)]
+    assert older["page"]["has_newer"]
+
+    caught_up = json.loads((await get_history("conv-1", limit=5, before=None, after=latest["page"]["after"], db=db)).body)
+    assert caught_up["messages"] == [] and caught_up["page"]["after"] == latest["page"]["after"]
+
+
+def test_latest_page_reads_a_bounded_range(db):
+    """The latest page is one indexed range read of limit + 1 rows"""
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, sql, params, *args: statements.append((sql, params)))
+
+    MessageRepository(db).get_page(1, limit=10)
+
+    assert len(statements) == 1
+    sql, params = statements[0]
+    assert "ORDER BY messages.created_at DESC, messages.id DESC" in sql
+    assert 11 in params
+
+
+@pytest.mark.asyncio
+async def test_metadata_is_returned_as_stored(db):
+    """message_metadata is a JSON column: no encoding on write or decoding in the endpoint"""
+    metadata = {"intent": "balance_inquiry", "usage": {"input_tokens": 10}, "knowledge": [1, 2]}
+    MessageRepository(db).add_message(1, MessageRole.ASSISTANT, "Tu saldo es 100", metadata)
+    db.commit()
+
+    page = json.loads((await get_history("conv-1", limit=1, before=None, after=None, db=db)).body)
+
+    assert page["messages"][0]["metadata"] == metadata
+    assert db.query(DBMessage).filter(DBMessage.message_metadata.is_(None)).count() == 25
@@ -0,0 +1,172 @@
+# Unit tests for Idempotency-Key handling of chat messages
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.api.v1.chat as chat_module
+from app.api.v1.chat import SendMessageRequest, send_message
+from app.core.idempotency import IdempotencyStore
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.services.conversation_cache import ConversationCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_call(result, delay=0.0):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return dict(result)
+
+    return call, calls
+
+
+@pytest.mark.asyncio
+async def test_retries_in_flight_attach_to_the_original_call():
+    """Concurrent requests with one key share a single call"""
+    store = IdempotencyStore()
+    call, calls = counting_call({"message": "hola"}, delay=0.01)
+
+    results = await asyncio.gather(*(store.run("k", "fp", call) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert [replayed for _, replayed in results] == [False, True, True, True, True]
+    assert all(result == {"message": "hola"} for result, _ in results)
+    assert (store.stats()["executed"], store.stats()["attached"]) == (1, 4)
+
+
+@pytest.mark.asyncio
+async def test_completed_response_is_replayed_until_it_expires():
+    """Later retries get a copy of the stored response; after the TTL the key is free"""
+    clock = FakeClock()
+    store = IdempotencyStore(ttl_seconds=60, clock=clock)
+    call, calls = counting_call({"message": "hola"})
+
+    original, _ = await store.run("k", "fp", call)
+    replay, replayed = await store.run("k", "fp", call)
+    assert replayed and replay == original and replay is not original
+
+    clock.now = 61
+    _, replayed = await store.run("k", "fp", call)
+    assert not replayed and len(calls) == 2
+    assert store.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reused_for_another_request_is_rejected():
+    store = IdempotencyStore()
+    call, _ = counting_call({})
+    await store.run("k", "fp-1", call)
+
+    with pytest.raises(HTTPException) as error:
+        await store.run("k", "fp-2", call)
+    assert error.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_not_stored_and_waiters_see_the_error():
+    """A retry after an error runs again; requests attached to it get the error"""
+    store = IdempotencyStore()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    outcomes = await asyncio.gather(store.run("k", "fp", failing), store.run("k", "fp", failing),
+                                    return_exceptions=True)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+    call, calls = counting_call({"ok": True})
+    assert await store.run("k", "fp", call) == ({"ok": True}, False)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_does_not_cancel_the_call():
+    """The client gave up: its retry picks up the result of the original call"""
+    store = IdempotencyStore()
+    call, calls = counting_call({"message": "hola"}, delay=0.02)
+
+    first = asyncio.ensure_future(store.run("k", "fp", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    result, replayed = await store.run("k", "fp", call)
+
+    assert replayed and result == {"message": "hola"} and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_store_is_bounded():
+    store = IdempotencyStore(max_entries=2)
+    for key in ("a", "b", "c"):
+        call, _ = counting_call({})
+        await store.run(key, "fp", call)
+
+    assert len(store) == 2 and store.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retried_chat_message_is_stored_and_answered_once(monkeypatch):
+    """/chat/message with the same Idempotency-Key: one user message, one LLM call"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    with SessionLocal() as db:
+        db.add(DBConversation(id=1, conversation_id="conv-1", user_id="user-1"))
+        db.commit()
+
+    @contextmanager
+    def get_db_context():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    llm_calls = []
+
+    async def generate_response(message, context):
+        llm_calls.append(message)
+        await asyncio.sleep(0.01)
+        return {"content": "Tu saldo es 100", "metadata": {}}
+
+    monkeypatch.setattr(chat_module, "get_db_context", get_db_context)
+    monkeypatch.setattr(chat_module, "generate_response", generate_response)
+    monkeypatch.setattr(chat_module, "idempotency_store", IdempotencyStore())
+    monkeypatch.setattr(chat_module, "conversation_cache", ConversationCache(enabled=False))
+    monkeypatch.setattr(chat_module.knowledge_retriever, "retrieve", lambda message: [])
+    monkeypatch.setattr(chat_module.conversation_summarizer, "schedule", lambda conversation_pk: None)
+
+    async def post(retry_of=None):
+        response = Response()
+        with SessionLocal() as db:
+            body = await send_message.__wrapped__(  # without the rate limiter
+                request=None, response=response, db=db, idempotency_key="key-1",
+                msg_request=SendMessageRequest(conversation_id="conv-1", message="¿Mi saldo?"),
+            )
+        return body, response.headers.get("Idempotency-Replayed")
+
+    (first, _), (attached, attached_header) = await asyncio.gather(post(), post())
+    late, late_header = await post()
+
+    assert first == attached == late
+    assert attached_header == late_header == "true"
+    assert llm_calls == ["¿Mi saldo?"]
+    with SessionLocal() as db:
+        assert [m.role for m in db.query(DBMessage).all()] == [MessageRole.USER, MessageRole.ASSISTANT]
+    engine.dispose()
@@ -0,0 +1,93 @@
+# Unit tests for the compiled intent matcher
+from app.services.ai_service import AIService
+from app.services.intent_matcher import IntentMatch, IntentMatcher, fold_text
+
+TABLE = {
+    "balance_inquiry": ["saldo", "balance"],
+    "credit_card_info": ["tarjeta", "crédito", "credit"],
+    "agent_request": ["agente", "hablar con alguien", "hablar"],
+}
+
+
+def test_fold_text_keeps_offsets():
+    """Test case and accent folding maps characters one to one"""
+    text = "Crédito ÁRBOL pingüino"
+    assert fold_text(text) == "credito arbol pinguino"
+    assert len(fold_text(text)) == len(text)
+
+
+def test_find_all_returns_positions():
+    """Test every match is reported with its intent and position in the original text"""
+    matcher = IntentMatcher(TABLE)
+    text = "Mi SALDO y mi tarjeta de credito"
+
+    matches = matcher.find_all(text)
+
+    assert matches == [
+        IntentMatch("balance_inquiry", "saldo", 3, 8),
+        IntentMatch("credit_card_info", "tarjeta", 14, 21),
+        IntentMatch("credit_card_info", "credit", 25, 31),
+        IntentMatch("credit_card_info", "credito", 25, 32),
+    ]
+    assert text[matches[0].start:matches[0].end] == "SALDO"
+
+
+def test_accent_and_case_insensitive():
+    """Test keywords match regardless of accents on either side"""
+    matcher = IntentMatcher({"credit_card_info": ["credito"], "savings_plans": ["inversión"]})
+
+    assert matcher.match_intents("CRÉDITO") == ["credit_card_info"]
+    assert matcher.match_intents("quiero una inversion") == ["savings_plans"]
+
+
+def test_prefix_keywords_and_word_start():
+    """Test a multi-word keyword also reports the keywords it starts with and matches start at a word"""
+    matcher = IntentMatcher(TABLE)
+
+    assert [m[1:] for m in matcher.find_all("quiero hablar  con alguien")] == [
+        ("hablar", 7, 13),
+        ("hablar con alguien", 7, 26),
+    ]
+    assert matcher.match_intents("tarjetas") == ["credit_card_info"]
+    assert matcher.match_intents("desbalanceado") == []
+
+
+def test_overlapping_keywords_are_all_reported():
+    """Test keywords inside or at the start of a longer match are not lost"""
+    matcher = IntentMatcher({
+        "cards": ["tarjeta"],
+        "credit": ["tarjeta de credito"],
+        "loans": ["crédito"],
+    })
+
+    matches = matcher.find_all("una tarjeta de crédito")
+
+    assert matches == [
+        IntentMatch("cards", "tarjeta", 4, 11),
+        IntentMatch("credit", "tarjeta de credito", 4, 22),
+        IntentMatch("loans", "credito", 15, 22),
+    ]
+    assert matcher.match_intents("una tarjeta de crédito") == ["cards", "credit", "loans"]
+    assert matcher.best("mi tarjeta de credito") == "cards"
+    assert matcher.matches_any("mi tarjeta de credito", ["loans"])
+
+
+def test_priority_follows_table_order():
+    """Test best() prefers the intent listed first in the table"""
+    matcher = IntentMatcher(TABLE)
+
+    assert matcher.match_intents("un agente para mi saldo") == ["balance_inquiry", "agent_request"]
+    assert matcher.best("un agente para mi saldo") == "balance_inquiry"
+    assert matcher.best("hola") is None
+    assert matcher.matches_any("necesito un agente", ["agent_request"])
+
+
+def test_mock_and_escalation_use_matcher(monkeypatch):
+    """Test the mock provider and escalation hints handle unaccented Spanish"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+
+    assert service._generate_mock("quiero una tarjeta de credito")["metadata"]["intent"] == "credit_card_info"
+    assert service._generate_mock("Consultar SALDO")["metadata"] == {"intent": "balance_inquiry", "requires_auth": True}
+    assert service._suggest_escalation("Quiero hablar con alguien")
+    assert not service._suggest_escalation("Quiero una tarjeta")
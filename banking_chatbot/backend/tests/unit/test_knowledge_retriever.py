@@ -0,0 +1,111 @@
+# Unit tests for knowledge-base retrieval in the chat prompt
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.knowledge_retriever import KnowledgeRetriever, tokenize
+from app.services.prompt_builder import KNOWLEDGE_HEADER, PromptBuilder
+
+
+def article(id, title, content, category="general", tags=None, is_active=True):
+    return SimpleNamespace(id=id, title=title, content=content, category=category, tags=tags or [], is_active=is_active)
+
+
+ARTICLES = [
+    article(1, "Límites de transferencias SPEI", "Las transferencias SPEI tienen un límite diario de 50,000 MXN.", "transfers", ["spei"]),
+    article(2, "Anualidad de la tarjeta de crédito", "La Tarjeta Clásica no cobra anualidad el primer año.", "cards", ["anualidad"]),
+    article(3, "Horario de sucursales", "Las sucursales abren de lunes a viernes de 9 a 16 h.", "general"),
+]
+
+
+def make_retriever(**kwargs):
+    retriever = KnowledgeRetriever(enabled=True, top_k=3, min_score=0.1, **kwargs)
+    retriever.load(ARTICLES)
+    return retriever
+
+
+def test_tokenize_folds_accents_and_plurals():
+    """Test query and article words are normalized the same way"""
+    assert tokenize("¿Cuál es el LÍMITE de mis transferencias?") == ["limite", "transferencia"]
+
+
+def test_retrieves_most_relevant_article_first():
+    """Test BM25 ranks the matching article first and reports its id"""
+    retriever = make_retriever()
+
+    results = retriever.retrieve("cual es el limite para una transferencia spei")
+
+    assert results[0]["id"] == 1
+    assert retriever.retrieve("anualidad tarjeta")[0]["id"] == 2
+    assert retriever.retrieve("hola, buenas") == []
+    assert retriever.stats()["retrievals"] == 3 and retriever.stats()["hits"] == 2
+
+
+def test_index_follows_writes():
+    """Test created, updated, deactivated and deleted articles are reflected immediately"""
+    retriever = make_retriever()
+
+    retriever.upsert(article(4, "Préstamos personales", "Tasa fija desde 12% anual.", "loans"))
+    assert retriever.retrieve("prestamo personal")[0]["id"] == 4
+
+    retriever.upsert(article(4, "Créditos hipotecarios", "Financiamiento de vivienda a 20 años.", "loans"))
+    assert retriever.retrieve("prestamo personal") == []
+    assert retriever.retrieve("credito hipotecario")[0]["id"] == 4
+
+    retriever.upsert(article(1, "Límites de transferencias SPEI", "...", is_active=False))
+    retriever.remove(2)
+    assert retriever.retrieve("transferencia spei") == []
+    assert retriever.retrieve("anualidad") == []
+    assert retriever.stats()["articles"] == 2
+
+
+def test_reload_with_changes_drops_cached_answers(monkeypatch):
+    """Test a periodic reload that finds another worker's write invalidates the AI cache"""
+    invalidations = []
+    monkeypatch.setattr("app.services.ai_service.ai_service.cache.invalidate", lambda: invalidations.append(1))
+    retriever = make_retriever()
+
+    retriever.load(ARTICLES)
+    assert invalidations == []
+
+    retriever.load(ARTICLES[:2] + [article(3, "Horario de sucursales", "Abren de 8 a 18 h.", "general")])
+    retriever.load(ARTICLES[:2])
+    assert len(invalidations) == 2
+    assert retriever.retrieve("horario sucursales") == []
+
+
+def test_prompt_knowledge_budget():
+    """Test articles are added best first and cut to the knowledge budget"""
+    long_article = {"id": 7, "title": "Tarifas", "content": "comisión " * 400}
+    short_article = {"id": 8, "title": "Horario", "content": "De 9 a 16 h."}
+
+    prompt = PromptBuilder(knowledge_budget=200).build("Hola", knowledge=[long_article, short_article])
+
+    assert prompt.knowledge.startswith(KNOWLEDGE_HEADER)
+    assert prompt.knowledge_ids == [7]
+    assert prompt.knowledge_tokens <= 200
+    assert prompt.stats()["knowledge_articles"] == 1
+    assert prompt.knowledge in prompt.system_text
+
+
+@pytest.mark.asyncio
+async def test_ai_service_sends_articles_and_reports_ids(monkeypatch):
+    """Test retrieved articles reach the provider payload and the response metadata"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache.enabled = False
+    knowledge = make_retriever().retrieve("limite de transferencia spei")
+
+    response = await service.generate_response(message="¿Límite SPEI?", knowledge=knowledge)
+    events = [e async for e in service.stream_response(message="¿Límite SPEI?", knowledge=knowledge)]
+
+    assert response["metadata"]["knowledge_articles"] == [1]
+    assert events[-1]["metadata"]["knowledge_articles"] == [1]
+
+    prompt = service._build_prompt("¿Límite SPEI?", None, None, None, knowledge)
+    _, anthropic = service._anthropic_request(prompt)
+    _, openai = service._openai_request(prompt)
+    assert "50,000 MXN" in anthropic["messages"][-1]["content"][0]["text"]
+    assert all("50,000" not in block["text"] for block in anthropic["system"])
+    assert openai["messages"][-2] == {"role": "system", "content": prompt.knowledge}
@@ -0,0 +1,135 @@
+# Unit tests for LLM call instrumentation (latency, TTFT, tokens, cost)
+import json
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.chat import _record_llm_usage
+from app.core.metrics import MetricsRegistry
+from app.database import Base
+from app.models import DBConversation
+from app.repositories import ConversationRepository
+from app.services.ai_service import AIService
+from app.services.llm_metrics import LLMMetrics, call_cost
+from app.services.provider_clients import ProviderClientPool
+
+PRICING = {"gpt-4o-mini": {"input": 0.15, "output": 0.60, "cache_read": 0.075}}
+USAGE = {"prompt_tokens": 1200, "completion_tokens": 300, "prompt_tokens_details": {"cached_tokens": 1000}}
+
+
+def openai_service(monkeypatch, handler):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o-mini")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    service = AIService()
+    service.cache.enabled = False
+    service.router.fallback_to_mock = False
+    service.metrics = LLMMetrics(MetricsRegistry(), pricing=PRICING)
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+    return service
+
+
+def test_registry_renders_prometheus_text():
+    """Test counters and cumulative histogram buckets in the exposition format"""
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("provider",))
+    latency = registry.histogram("latency_seconds", "Latency", ("provider",), buckets=(0.5, 1.0))
+
+    calls.inc(provider='open"ai')
+    calls.inc(2, provider='open"ai')
+    for value in [0.2, 0.7, 3.0]:
+        latency.observe(value, provider="openai")
+
+    text = registry.render()
+    assert '# TYPE calls_total counter\ncalls_total{provider="open\\"ai"} 3\n' in text
+    assert 'latency_seconds_bucket{provider="openai",le="0.5"} 1' in text
+    assert 'latency_seconds_bucket{provider="openai",le="1"} 2' in text
+    assert 'latency_seconds_bucket{provider="openai",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{provider="openai"} 3' in text
+    assert registry.counter("calls_total", "Calls", ("provider",)) is calls
+    with pytest.raises(ValueError):
+        calls.inc(model="x")
+
+
+def test_cost_bills_cached_tokens_at_their_price():
+    """Test cached prompt tokens are not billed at the full input price"""
+    usage = {"input_tokens": 1200, "output_tokens": 300, "cache_read_tokens": 1000, "cache_write_tokens": 0}
+
+    cost = call_cost(PRICING["gpt-4o-mini"], usage)
+
+    assert cost == pytest.approx((200 * 0.15 + 1000 * 0.075 + 300 * 0.60) / 1_000_000)
+
+
+@pytest.mark.asyncio
+async def test_records_calls_tokens_and_cost(monkeypatch):
+    """Test each call is recorded by outcome and successful answers carry their cost"""
+    responses = [
+        httpx.Response(500, json={"error": {"message": "Internal error"}}),
+        httpx.Response(200, json={"choices": [{"message": {"content": "Hola"}}], "usage": USAGE}),
+    ]
+    service = openai_service(monkeypatch, lambda request: responses.pop(0))
+    service.retry.base_delay = service.retry.max_delay = 0.001
+
+    response = await service.generate_response(message="Hola")
+
+    metrics = service.metrics
+    assert metrics.calls.value(provider="openai", model="gpt-4o-mini", outcome="api_error") == 1
+    assert metrics.calls.value(provider="openai", model="gpt-4o-mini", outcome="ok") == 1
+    assert metrics.tokens.value(provider="openai", model="gpt-4o-mini", type="output") == 300
+    assert response["metadata"]["cost_usd"] == pytest.approx(call_cost(PRICING["gpt-4o-mini"], response["metadata"]["usage"]))
+    assert response["metadata"]["latency_ms"] >= 0
+    stats = service.get_stats()["llm_calls"]["openai/gpt-4o-mini"]
+    assert stats["calls"] == {"api_error": 1, "ok": 1} and stats["tokens"]["input"] == 1200
+    await service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_stream_records_time_to_first_token(monkeypatch):
+    """Test streamed answers report TTFT separately from the total latency"""
+    chunks = [
+        {"choices": [{"delta": {"content": "Hola"}}]},
+        {"choices": [{"delta": {"content": " cliente"}}]},
+        {"choices": [], "usage": USAGE},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    service = openai_service(
+        monkeypatch,
+        lambda request: httpx.Response(200, text=body, headers={"content-type": "text/event-stream"}),
+    )
+
+    events = [event async for event in service.stream_response(message="Hola")]
+
+    metadata = events[-1]["metadata"]
+    assert 0 <= metadata["ttft_ms"] <= metadata["latency_ms"]
+    assert service.metrics.ttft.count(provider="openai", model="gpt-4o-mini") == 1
+    assert service.metrics.cost.value(provider="openai", model="gpt-4o-mini") > 0
+    await service.shutdown()
+
+
+def test_conversation_totals_skip_cached_answers():
+    """Test per-conversation totals add provider answers only"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__])
+    db = sessionmaker(bind=engine)()
+    conversation = DBConversation(conversation_id="conv-1", user_id="user-1")
+    db.add(conversation)
+    db.flush()
+
+    answer = {"latency_ms": 850.0, "cost_usd": 0.0002, "usage": {"input_tokens": 1200, "output_tokens": 300}}
+    _record_llm_usage(db, conversation.id, answer)
+    _record_llm_usage(db, conversation.id, answer)
+    _record_llm_usage(db, conversation.id, {**answer, "cached": True})
+    _record_llm_usage(db, conversation.id, {"error": "timeout"})
+    db.commit()
+    db.refresh(conversation)
+
+    assert conversation.llm_calls == 2
+    assert conversation.llm_input_tokens == 2400 and conversation.llm_output_tokens == 600
+    assert float(conversation.llm_cost_usd) == pytest.approx(0.0004)
+    assert ConversationRepository(db).get_most_expensive(limit=1)[0].id == conversation.id
+    db.close()
+    engine.dispose()
@@ -0,0 +1,69 @@
+# Unit tests for bounded history loading in the chat send path
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.repositories import MessageRepository
+
+
+@pytest.fixture
+def db():
+    """SQLite session with the conversation tables"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def create_conversation(db, message_count):
+    conversation = DBConversation(conversation_id="conv-1", user_id="user-1")
+    db.add(conversation)
+    db.flush()
+    started = datetime(2026, 1, 1)
+    for i in range(message_count):
+        db.add(DBMessage(
+            conversation_id=conversation.id,
+            role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+            content=f"mensaje {i}",
+            created_at=started + timedelta(seconds=i),
+        ))
+    db.flush()
+    return conversation.id
+
+
+def test_get_recent_returns_last_messages_oldest_first(db):
+    """Only the newest `limit` messages are loaded, in chronological order"""
+    conversation_id = create_conversation(db, 30)
+
+    rows = MessageRepository(db).get_recent(conversation_id, limit=5)
+
+    assert [row.content for row in rows] == [f"mensaje {i}" for i in range(25, 30)]
+    assert rows[0].role == MessageRole.ASSISTANT
+    assert rows[0].created_at < rows[-1].created_at
+
+
+def test_get_recent_returns_lightweight_rows(db):
+    """Rows carry id, role, content and created_at only, not ORM messages"""
+    conversation_id = create_conversation(db, 3)
+
+    row = MessageRepository(db).get_recent(conversation_id)[0]
+
+    assert not isinstance(row, DBMessage)
+    assert row._fields == ("id", "role", "content", "created_at")
+
+
+def test_get_recent_skips_summarized_messages(db):
+    """Messages up to after_id (already in the summary) are left out"""
+    conversation_id = create_conversation(db, 10)
+    ids = [m.id for m in db.query(DBMessage).order_by(DBMessage.id)]
+
+    rows = MessageRepository(db).get_recent(conversation_id, limit=20, after_id=ids[7])
+
+    assert [row.content for row in rows] == ["mensaje 8", "mensaje 9"]
@@ -0,0 +1,195 @@
+# Unit tests for write-behind message persistence
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.services.message_writer as writer_module
+from app.database import Base
+from app.models import DBConversation, DBMessage, MessageRole
+from app.repositories import MessageRepository
+from app.services.message_writer import MessageWriter, merge_pending
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    """SQLite database with two conversations, used by the writer"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine, tables=[DBConversation.__table__, DBMessage.__table__])
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+    with SessionLocal() as db:
+        db.add_all([
+            DBConversation(id=1, conversation_id="conv-1", user_id="user-1"),
+            DBConversation(id=2, conversation_id="conv-2", user_id="user-2"),
+        ])
+        db.commit()
+
+    @contextmanager
+    def get_db_context():
+        db = SessionLocal()
+        try:
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    monkeypatch.setattr(writer_module, "get_db_context", get_db_context)
+    yield SessionLocal
+    engine.dispose()
+
+
+def stored(SessionLocal, conversation_pk):
+    with SessionLocal() as db:
+        return [(m.id, m.content) for m in MessageRepository(db).get_by_conversation(conversation_pk)]
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_one_batch_in_order(session_factory):
+    """Buffered messages are inserted together, in the order they were accepted"""
+    writer = MessageWriter(enabled=True, flush_rows=100)
+    for i in range(3):
+        writer.add(1, MessageRole.USER, f"pregunta {i}")
+        writer.add(2, MessageRole.USER, f"otra {i}")
+        writer.add(1, MessageRole.ASSISTANT, f"respuesta {i}")
+
+    assert await writer.flush() == 9
+
+    rows = stored(session_factory, 1)
+    assert [content for _, content in rows] == [
+        "pregunta 0", "respuesta 0", "pregunta 1", "respuesta 1", "pregunta 2", "respuesta 2"
+    ]
+    assert [message_id for message_id, _ in rows] == sorted(message_id for message_id, _ in rows)
+    assert writer.pending(1) == [] and writer.stats()["batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_created_at_strictly_increases_per_conversation(session_factory):
+    """Messages accepted within the same clock tick still sort in order"""
+    writer = MessageWriter(enabled=True)
+    rows = [writer.add(1, MessageRole.USER, f"m{i}") for i in range(50)]
+
+    timestamps = [row.created_at for row in rows]
+    assert all(a < b for a, b in zip(timestamps, timestamps[1:]))
+
+
+@pytest.mark.asyncio
+async def test_pending_messages_are_readable_before_and_after_the_write(session_factory):
+    """Read-your-writes: buffered messages are merged without duplicates"""
+    writer = MessageWriter(enabled=True)
+    writer.add(1, MessageRole.USER, "hola")
+    with session_factory() as db:
+        messages = merge_pending(MessageRepository(db).get_by_conversation(1), writer.pending(1))
+    assert [m.content for m in messages] == ["hola"]
+
+    # Written but not yet removed from the buffer: the database copy wins
+    batch = list(writer.pending(1))
+    writer._insert(batch)
+    with session_factory() as db:
+        messages = merge_pending(MessageRepository(db).get_by_conversation(1), writer.pending(1))
+    assert [m.content for m in messages] == ["hola"]
+    assert isinstance(messages[0], DBMessage)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_kept_and_retried(session_factory, monkeypatch):
+    """A failed insert leaves the batch queued, in order, for the next flush"""
+    writer = MessageWriter(enabled=True)
+    writer.add(1, MessageRole.USER, "uno")
+    writer.add(1, MessageRole.USER, "dos")
+
+    @contextmanager
+    def broken_db_context():
+        raise RuntimeError("database unavailable")
+        yield
+
+    working = writer_module.get_db_context
+    monkeypatch.setattr(writer_module, "get_db_context", broken_db_context)
+    with pytest.raises(RuntimeError):
+        await writer.flush()
+    assert [row.content for row in writer.pending(1)] == ["uno", "dos"]
+
+    monkeypatch.setattr(writer_module, "get_db_context", working)
+    writer.add(1, MessageRole.USER, "tres")
+    await writer.flush()
+    assert [content for _, content in stored(session_factory, 1)] == ["uno", "dos", "tres"]
+    assert writer.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_poison_row_is_dropped_after_the_attempts(session_factory):
+    """A row that can never be written stops blocking the queue after max_attempts"""
+    writer = MessageWriter(enabled=True, max_attempts=2)
+    writer.add(1, MessageRole.USER, "uno")
+    writer.add(99, MessageRole.USER, "conversación borrada")  # foreign key violation
+    writer.add(2, MessageRole.USER, "dos")
+
+    with pytest.raises(Exception):
+        await writer.flush()
+    assert writer.stats()["queued"] == 3
+
+    assert await writer.flush() == 2
+    assert [content for _, content in stored(session_factory, 1)] == ["uno"]
+    assert [content for _, content in stored(session_factory, 2)] == ["dos"]
+    assert writer.pending(99) == []
+    assert writer.stats()["queued"] == 0 and writer.stats()["dropped"] == 1
+
+    # The next batch goes back to a single insert
+    writer.add(1, MessageRole.USER, "tres")
+    assert await writer.flush() == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_database_drops_nothing(session_factory, monkeypatch):
+    """Connection errors keep every row queued, even after max_attempts"""
+    writer = MessageWriter(enabled=True, max_attempts=1)
+    writer.add(1, MessageRole.USER, "uno")
+    writer.add(1, MessageRole.USER, "dos")
+
+    def unreachable(batch):
+        raise OperationalError("INSERT", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(writer, "_insert", unreachable)
+    with pytest.raises(OperationalError):
+        await writer.flush()
+
+    assert [row.content for row in writer.pending(1)] == ["uno", "dos"]
+    assert writer.stats()["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_the_buffer(session_factory):
+    """Graceful shutdown flushes what the background writer has not written yet"""
+    writer = MessageWriter(enabled=True, flush_ms=60_000)
+    await writer.start()
+    writer.add(2, MessageRole.USER, "último mensaje")
+
+    await writer.stop()
+
+    assert [content for _, content in stored(session_factory, 2)] == ["último mensaje"]
+    assert writer.stats()["queued"] == 0
+
+
+def test_restarts_on_a_new_event_loop(session_factory):
+    """Each app lifespan (a new event loop) gets a working background writer"""
+    writer = MessageWriter(enabled=True, flush_ms=1, flush_rows=1)
+
+    async def lifespan(content):
+        await writer.start()
+        writer.add(1, MessageRole.USER, content)
+        for _ in range(100):
+            if not writer.pending(1):
+                break
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+    asyncio.run(lifespan("primera"))
+    asyncio.run(lifespan("segunda"))
+
+    assert [content for _, content in stored(session_factory, 1)] == ["primera", "segunda"]
+    assert writer.stats()["batches"] == 2
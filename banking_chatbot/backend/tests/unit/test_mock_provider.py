@@ -0,0 +1,122 @@
+# Unit tests for the latency-simulating mock provider
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.mock_provider import MockLatencyProfile, split_tokens
+from app.services.provider_router import percentile
+
+
+class FakeSleep:
+    """Records requested delays instead of waiting"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, seconds):
+        self.calls.append(seconds)
+
+
+def make_profile(sleep, **kwargs):
+    options = dict(
+        mode="fixed",
+        latency_ms=500,
+        stddev_ms=100,
+        tail_sigma=1.0,
+        token_interval_ms=0,
+        error_rate=0,
+        rate_limit_rate=0,
+        timeout_rate=0,
+        timeout_seconds=30,
+        seed=7,
+        sleep=sleep,
+    )
+    options.update(kwargs)
+    return MockLatencyProfile(**options)
+
+
+def canned():
+    return {"content": "Hola, ¿en qué puedo ayudarte?", "metadata": {"intent": "general_inquiry"}}
+
+
+@pytest.mark.asyncio
+async def test_fixed_latency_includes_generation_time():
+    """Test a regular response waits time-to-first-token plus per-token time"""
+    sleep = FakeSleep()
+    profile = make_profile(sleep, token_interval_ms=20)
+
+    response = await profile.generate(canned())
+
+    expected = 0.5 + len(split_tokens(canned()["content"])) * 0.02
+    assert sleep.calls == [pytest.approx(expected)]
+    assert response["metadata"]["simulated_latency_ms"] == pytest.approx(expected * 1000)
+
+
+@pytest.mark.asyncio
+async def test_stream_token_cadence():
+    """Test streaming waits before the first token and between tokens"""
+    sleep = FakeSleep()
+    profile = make_profile(sleep, token_interval_ms=25)
+
+    events = [event async for event in profile.stream(canned())]
+
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert "".join(tokens) == canned()["content"]
+    assert sleep.calls == [0.5] + [0.025] * (len(tokens) - 1)
+    assert events[-1]["metadata"]["streamed"] is True
+
+
+def test_long_tail_distribution():
+    """Test the long-tail mode keeps the median but has a heavy p99"""
+    profile = make_profile(FakeSleep(), mode="long_tail", latency_ms=400, tail_sigma=1.0)
+    samples = [profile.sample_latency() for _ in range(5000)]
+
+    assert percentile(samples, 50) == pytest.approx(0.4, rel=0.1)
+    assert percentile(samples, 99) > 5 * percentile(samples, 50)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("rates, error, status", [
+    ({"error_rate": 1.0}, "api_error", 500),
+    ({"rate_limit_rate": 1.0}, "api_error", 429),
+    ({"timeout_rate": 1.0}, "timeout", None),
+])
+async def test_simulated_failures(rates, error, status):
+    """Test configured failures look like real provider errors"""
+    sleep = FakeSleep()
+    profile = make_profile(sleep, **rates)
+
+    response = await profile.generate(canned())
+    streamed = [event async for event in profile.stream(canned())]
+
+    for result in (response, streamed[-1]):
+        assert result["metadata"]["error"] == error
+        assert result["metadata"].get("status") == status
+    assert len(streamed) == 1
+    if error == "timeout":
+        assert sleep.calls == [30, 30]
+
+
+def test_failure_rates_are_respected():
+    """Test outcomes follow the configured proportions"""
+    profile = make_profile(FakeSleep(), error_rate=0.1, rate_limit_rate=0.05, timeout_rate=0.02)
+    outcomes = [profile.sample_outcome() for _ in range(20000)]
+
+    assert outcomes.count("error") / len(outcomes) == pytest.approx(0.1, abs=0.01)
+    assert outcomes.count("rate_limited") / len(outcomes) == pytest.approx(0.05, abs=0.01)
+    assert outcomes.count("timeout") / len(outcomes) == pytest.approx(0.02, abs=0.005)
+
+
+@pytest.mark.asyncio
+async def test_ai_service_uses_profile_in_mock_mode(monkeypatch):
+    """Test the mock provider path goes through the latency profile"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache.enabled = False
+    sleep = FakeSleep()
+    service.mock = make_profile(sleep, error_rate=1.0)
+
+    response = await service.generate_response(message="Consultar saldo")
+
+    assert response["metadata"]["error"] == "api_error"
+    assert sleep.calls == [0.5]
+    assert service.get_stats()["mock"]["outcomes"]["error"] == 1
@@ -0,0 +1,97 @@
+# Unit tests for token-budget prompt assembly
+import json
+
+import httpx
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.prompt_builder import (
+    MESSAGE_OVERHEAD_TOKENS,
+    TRUNCATION_MARKER,
+    PromptBuilder,
+    estimate_tokens,
+    truncate_to_tokens,
+)
+from app.services.provider_clients import ProviderClientPool
+
+
+def test_estimate_tokens():
+    """Test the local estimate grows with words, punctuation and long words"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hola") == 1
+    assert estimate_tokens("¿Cuál es mi saldo?") == 7
+    assert estimate_tokens("transferencia") == 4
+
+
+def test_truncate_to_tokens():
+    """Test oversized text is cut to the token limit with a marker"""
+    text = " ".join(["movimiento"] * 100)
+    truncated = truncate_to_tokens(text, 30)
+
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(truncated) <= 30
+    assert truncate_to_tokens("hola", 30) == "hola"
+
+
+def test_history_fills_budget_newest_first():
+    """Test the most recent turns that fit the budget are kept, in order"""
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"mensaje numero {i}"} for i in range(20)]
+    cost = estimate_tokens("mensaje numero 10") + MESSAGE_OVERHEAD_TOKENS
+    builder = PromptBuilder(history_budget=cost * 5, max_message_tokens=100)
+
+    prompt = builder.build("hola", history, "sistema")
+
+    assert [m["content"] for m in prompt.history] == [f"mensaje numero {i}" for i in range(15, 20)]
+    assert prompt.history_dropped == 15
+    assert prompt.stats()["history_messages"] == 5
+    assert prompt.total_tokens == prompt.system_tokens + prompt.history_tokens + prompt.message_tokens
+
+
+def test_oversized_messages_are_truncated():
+    """Test a pasted statement does not consume the whole budget"""
+    statement = "\n".join(f"2024-01-{d:02d} COMPRA TIENDA {d} -1,250.00" for d in range(1, 29))
+    builder = PromptBuilder(history_budget=500, max_message_tokens=50)
+
+    prompt = builder.build(statement, [{"role": "user", "content": statement}, {"role": "assistant", "content": "Ok"}])
+
+    assert prompt.message.endswith(TRUNCATION_MARKER)
+    assert prompt.history[0]["content"].endswith(TRUNCATION_MARKER)
+    assert prompt.truncated_messages == 2
+    assert prompt.message_tokens <= 50 + MESSAGE_OVERHEAD_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_stored_history_roles_reach_the_provider(monkeypatch):
+    """Test history with stored (uppercase) roles is sent to the provider"""
+    sent = {}
+
+    def handler(request):
+        sent.update(json.loads(request.content))
+        return httpx.Response(200, json={
+            "content": [{"type": "text", "text": "Claro"}],
+            "usage": {"input_tokens": 42, "output_tokens": 3},
+        })
+
+    monkeypatch.setenv("AI_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    service = AIService()
+    service.cache.enabled = False
+    service.prompt_caching = False
+    service.clients = ProviderClientPool(transport=httpx.MockTransport(handler))
+
+    history = [
+        {"role": "ASSISTANT", "content": "¡Bienvenido!"},
+        {"role": "USER", "content": "Quiero una tarjeta"},
+        {"role": "ASSISTANT", "content": "Tenemos Clásica, Gold y Platinum"},
+    ]
+    response = await service.generate_response(message="¿Cuál me conviene?", conversation_history=history)
+
+    # Anthropic requires the first turn to be from the user
+    assert sent["messages"] == [
+        {"role": "user", "content": "Quiero una tarjeta"},
+        {"role": "assistant", "content": "Tenemos Clásica, Gold y Platinum"},
+        {"role": "user", "content": "¿Cuál me conviene?"},
+    ]
+    assert response["metadata"]["prompt"]["history_messages"] == 3
+    assert response["metadata"]["usage"]["input_tokens"] == 42
+    await service.shutdown()
@@ -0,0 +1,71 @@
+# Unit tests for the shared provider HTTP client pool
+import httpx
+import pytest
+
+from app.services.provider_clients import ProviderClientPool
+
+
+def make_transport(calls):
+    """Mock transport that records every request"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"ok": True})
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_client_is_reused_across_calls():
+    """The same client instance serves every request for a provider"""
+    calls = []
+    pool = ProviderClientPool(
+        base_urls={"anthropic": "https://anthropic.test"},
+        transport=make_transport(calls)
+    )
+    await pool.startup()
+
+    first = pool.get_client("anthropic")
+    await first.post("/v1/messages", json={})
+    second = pool.get_client("anthropic")
+    await second.post("/v1/messages", json={})
+
+    assert first is second
+    assert calls == ["https://anthropic.test/v1/messages"] * 2
+    assert pool.stats()["providers"]["anthropic"]["requests"] == 2
+
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_closes_clients():
+    """shutdown() closes clients; later use transparently reopens one"""
+    pool = ProviderClientPool(
+        base_urls={"openai": "https://openai.test"},
+        transport=make_transport([])
+    )
+    await pool.startup()
+    client = pool.get_client("openai")
+
+    await pool.shutdown()
+
+    assert client.is_closed
+    assert pool.stats()["providers"]["openai"]["open"] is False
+    assert pool.get_client("openai") is not client
+    await pool.shutdown()
+
+
+def test_stats_report_limits():
+    """Configured connection limits are exposed in stats"""
+    pool = ProviderClientPool(
+        base_urls={"openai": "https://openai.test"},
+        max_connections=7,
+        max_keepalive_connections=3,
+        keepalive_expiry=12.0
+    )
+    stats = pool.stats()
+
+    assert stats["limits"] == {
+        "max_connections": 7,
+        "max_keepalive_connections": 3,
+        "keepalive_expiry": 12.0
+    }
+    assert stats["providers"]["openai"]["open"] is False
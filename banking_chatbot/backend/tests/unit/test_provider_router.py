@@ -0,0 +1,270 @@
+# Unit tests for provider routing, circuit breakers and failover
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.hedging import RetryPolicy
+from app.services.provider_clients import ProviderClientPool
+from app.services.provider_router import CircuitState, ProviderRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_router(clock, **kwargs):
+    options = dict(
+        providers=["anthropic", "openai"],
+        primary="anthropic",
+        fallback_to_mock=False,
+        failure_threshold=3,
+        cooldown_seconds=30,
+        window_seconds=300,
+        latency_slack=1.5,
+        clock=clock,
+    )
+    options.update(kwargs)
+    return ProviderRouter(**options)
+
+
+def test_circuit_opens_after_consecutive_failures():
+    """Test a provider is skipped once its circuit opens"""
+    clock = FakeClock()
+    router = make_router(clock)
+
+    for _ in range(2):
+        router.record_failure("anthropic", 0.1)
+    assert router.candidates() == ["anthropic", "openai"]
+
+    router.record_failure("anthropic", 0.1)
+    assert router.health["anthropic"].state == CircuitState.OPEN
+    assert router.candidates() == ["openai"]
+
+
+def test_half_open_trial_after_cooldown():
+    """Test one trial request is allowed after the cooldown and a failure reopens the circuit"""
+    clock = FakeClock()
+    router = make_router(clock, failure_threshold=1)
+    router.record_failure("anthropic", 0.1)
+
+    clock.now += 31
+    assert router.candidates() == ["anthropic", "openai"]
+    assert router.health["anthropic"].state == CircuitState.OPEN
+    # The trial is claimed only when the request is sent, once per cooldown
+    assert router.claim("anthropic")
+    assert router.health["anthropic"].state == CircuitState.HALF_OPEN
+    assert router.candidates() == ["openai"]
+    assert not router.claim("anthropic")
+
+    router.record_failure("anthropic", 0.1)
+    assert router.health["anthropic"].state == CircuitState.OPEN
+
+    clock.now += 31
+    assert router.claim("anthropic")
+    router.record_success("anthropic", 0.2)
+    assert router.health["anthropic"].state == CircuitState.CLOSED
+
+
+def test_listing_candidates_keeps_the_trial_for_the_request():
+    """Test an untried provider in the list does not use up its half-open trial"""
+    clock = FakeClock()
+    router = make_router(clock, primary="openai", failure_threshold=1)
+    router.record_failure("anthropic", 0.1)
+    clock.now += 31
+
+    # openai answers first: anthropic is listed but never sent a request
+    for _ in range(3):
+        assert router.candidates() == ["openai", "anthropic"]
+    assert router.health["anthropic"].state == CircuitState.OPEN
+    assert router.claim("anthropic")
+
+
+def test_latency_aware_ordering():
+    """Test the primary is demoted only when clearly slower than another provider"""
+    clock = FakeClock()
+    router = make_router(clock, fallback_to_mock=True)
+
+    router.record_success("anthropic", 1.2)
+    router.record_success("openai", 1.0)
+    assert router.candidates() == ["anthropic", "openai", "mock"]
+
+    for _ in range(5):
+        router.record_success("anthropic", 4.0)
+    assert router.candidates() == ["openai", "anthropic", "mock"]
+
+    # Old samples leave the rolling window
+    clock.now += 301
+    assert router.candidates() == ["anthropic", "openai", "mock"]
+
+
+@pytest.mark.asyncio
+async def test_probe_closes_recovered_circuit():
+    """Test the background probe closes a circuit once the provider answers"""
+    clock = FakeClock()
+    router = make_router(clock, failure_threshold=1)
+    router.record_failure("anthropic", 0.1)
+    healthy = {"anthropic": False}
+
+    async def probe(provider):
+        return healthy[provider]
+
+    # Cooldown not elapsed: not probed yet
+    await router.probe_once(probe)
+    assert router.health["anthropic"].state == CircuitState.OPEN
+
+    clock.now += 31
+    await router.probe_once(probe)
+    assert router.health["anthropic"].state == CircuitState.OPEN
+    assert not router.health["anthropic"].cooldown_elapsed()
+
+    healthy["anthropic"] = True
+    clock.now += 31
+    await router.probe_once(probe)
+    assert router.health["anthropic"].state == CircuitState.CLOSED
+
+
+@pytest.fixture
+def stub_provider_server():
+    """Local HTTP server: Anthropic answers 500, OpenAI answers normally"""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            calls.append(self.path)
+            if self.path.startswith("/anthropic"):
+                status, body = 500, {"error": {"message": "Overloaded"}}
+            else:
+                status, body = 200, {"choices": [{"message": {"content": "Hola desde OpenAI"}}]}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", calls
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_failover_to_secondary_provider(monkeypatch, stub_provider_server):
+    """Test a failing primary provider fails over and eventually opens its circuit"""
+    base_url, calls = stub_provider_server
+    monkeypatch.setenv("AI_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = AIService()
+    service.cache.enabled = False
+    service.clients = ProviderClientPool(
+        base_urls={"anthropic": f"{base_url}/anthropic", "openai": f"{base_url}/openai"},
+        http2=False,
+    )
+    service.router = ProviderRouter(
+        providers=["anthropic", "openai"],
+        primary="anthropic",
+        fallback_to_mock=False,
+        failure_threshold=2,
+        cooldown_seconds=60,
+    )
+    # Fail over straight away (retries are covered in test_hedging.py)
+    service.retry = RetryPolicy(max_retries=0)
+
+    for _ in range(2):
+        response = await service.generate_response(message="Hola")
+        assert response["content"] == "Hola desde OpenAI"
+        assert response["metadata"]["provider"] == "openai"
+        assert response["metadata"]["failover_from"] == ["anthropic"]
+    assert service.router.health["anthropic"].state == CircuitState.OPEN
+
+    # With the circuit open Anthropic is skipped without a request
+    response = await service.generate_response(message="Hola")
+    assert response["metadata"]["provider"] == "openai"
+    assert "failover_from" not in response["metadata"]
+    assert sum(1 for path in calls if path.startswith("/anthropic")) == 2
+    assert service.router.stats()["failovers"] == 2
+    await service.shutdown()
+
+
+@pytest.fixture
+def flaky_openai_server():
+    """Local OpenAI-style server that answers 500 while state["down"] is set"""
+    state = {"down": True, "calls": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            state["calls"] += 1
+            if state["down"]:
+                status, body = 500, {"error": {"message": "Overloaded"}}
+            else:
+                status, body = 200, {"choices": [{"message": {"content": "Hola desde OpenAI"}}]}
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_mock_failover_answers_are_not_cached(monkeypatch, flaky_openai_server):
+    """Test canned mock answers given during an outage are not replayed after recovery"""
+    base_url, state = flaky_openai_server
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    clock = FakeClock()
+    service = AIService()
+    service.cache.enabled = True
+    service.clients = ProviderClientPool(base_urls={"openai": f"{base_url}/openai"}, http2=False)
+    service.router = ProviderRouter(
+        providers=["openai"],
+        primary="openai",
+        fallback_to_mock=True,
+        failure_threshold=1,
+        cooldown_seconds=30,
+        clock=clock,
+    )
+    service.retry = RetryPolicy(max_retries=0)
+
+    # Failover to mock opens the circuit; with it open, mock answers first
+    response = await service.generate_response(message="¿Qué tarjetas ofrecen?")
+    assert response["metadata"]["failover_from"] == ["openai"]
+    assert service.router.health["openai"].state == CircuitState.OPEN
+    response = await service.generate_response(message="¿Qué tarjetas ofrecen?")
+    assert response["metadata"]["provider"] == "mock"
+    events = [event async for event in service.stream_response(message="¿Qué tarjetas ofrecen?")]
+    assert events[-1]["metadata"]["provider"] == "mock"
+
+    state["down"] = False
+    clock.now += 31
+    calls = state["calls"]
+    response = await service.generate_response(message="¿Qué tarjetas ofrecen?")
+
+    assert response["content"] == "Hola desde OpenAI"
+    assert state["calls"] == calls + 1
+    await service.shutdown()
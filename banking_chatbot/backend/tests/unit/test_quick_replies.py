@@ -0,0 +1,120 @@
+# Unit tests for precomputed quick reply answers
+import asyncio
+
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.quick_replies import QuickReplies
+
+
+def make_quick_replies(monkeypatch, definitions):
+    replies = QuickReplies(enabled=True, refresh_seconds=60)
+    monkeypatch.setattr(replies, "fetch", lambda: replies._parse(definitions))
+    return replies
+
+
+@pytest.mark.asyncio
+async def test_fixed_answers_are_served_from_memory(monkeypatch):
+    """Test a click matches its label regardless of case/spacing and is flagged"""
+    replies = make_quick_replies(monkeypatch, [
+        {"label": "Horario de sucursales", "answer": "De lunes a viernes de 9 a 16 h."},
+        "",
+    ])
+
+    await replies.refresh()
+    answer = replies.match("  horario DE sucursales ")
+
+    assert replies.labels() == ["Horario de sucursales"]
+    assert answer["content"] == "De lunes a viernes de 9 a 16 h."
+    assert answer["metadata"]["quick_reply"] is True
+    assert "precomputed_at" in answer["metadata"]
+    assert replies.match("horario de sucursales en sábado") is None
+    answer["metadata"]["changed"] = True
+    assert "changed" not in replies.match("Horario de sucursales")["metadata"]
+    assert replies.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_generated_answers_drop_call_metadata(monkeypatch):
+    """Test labels without an answer are answered by the AI service once, ahead of time"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache.enabled = False
+    monkeypatch.setattr("app.services.ai_service.ai_service", service)
+    replies = make_quick_replies(monkeypatch, ["Hablar con un agente"])
+
+    await replies.refresh()
+    answer = replies.match("Hablar con un agente")
+
+    assert answer["metadata"]["suggest_escalation"] is True
+    assert answer["metadata"]["intent"] == "agent_request"
+    assert not {"prompt", "latency_ms", "usage"} & set(answer["metadata"])
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_answer(monkeypatch):
+    """Test an answer that cannot be recomputed is kept instead of dropped"""
+    replies = make_quick_replies(monkeypatch, [{"label": "Consultar saldo", "answer": "Ingresa a la app."}])
+    await replies.refresh()
+
+    async def failing_answer(definition):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(replies, "_answer", failing_answer)
+    await replies.refresh()
+
+    assert replies.match("Consultar saldo")["content"] == "Ingresa a la app."
+    assert replies.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failover_answer_keeps_previous_answer(monkeypatch):
+    """Test a warm-up during an outage does not replace the answer with the mock fallback"""
+    replies = make_quick_replies(monkeypatch, ["Tarjetas de crédito"])
+    responses = [
+        {"content": "Tenemos tres tarjetas.", "metadata": {"provider": "openai"}},
+        {"content": "Texto de respaldo", "metadata": {"provider": "mock", "failover_from": ["openai"]}},
+        {"content": "Texto de respaldo", "metadata": {"provider": "mock"}},
+    ]
+
+    class Service:
+        router = object()
+
+        async def generate_response(self, message):
+            return responses.pop(0)
+
+    monkeypatch.setattr("app.services.ai_service.ai_service", Service())
+    for _ in range(3):
+        await replies.refresh()
+
+    assert replies.match("Tarjetas de crédito")["content"] == "Tenemos tres tarjetas."
+    assert replies.stats()["failures"] == 2
+
+
+def test_disabled_or_cold_never_matches():
+    """Test clicks fall through to the normal path until answers are warm"""
+    assert QuickReplies(enabled=True).match("Consultar saldo") is None
+    assert QuickReplies(enabled=False).match("Consultar saldo") is None
+
+
+def test_restarts_on_a_new_event_loop(monkeypatch):
+    """Test each app lifespan (a new event loop) gets a working refresh loop"""
+    replies = make_quick_replies(monkeypatch, [{"label": "Consultar saldo", "answer": "Ingresa a la app."}])
+    replies.schedule_refresh()  # before start(): nothing to wake up
+
+    async def lifespan():
+        replies.refreshed_at = None
+        await replies.start()
+        while replies.refreshed_at is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)  # the loop is now waiting for the next refresh
+        replies.schedule_refresh()
+        await asyncio.sleep(0.01)
+        task = replies._refresh_task
+        await replies.stop()
+        return task
+
+    for _ in range(2):
+        task = asyncio.run(lifespan())
+        assert task.cancelled()
+        assert replies.match("Consultar saldo")["content"] == "Ingresa a la app."
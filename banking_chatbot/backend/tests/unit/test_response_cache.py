@@ -0,0 +1,96 @@
+# Unit tests for the AI response cache
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.response_cache import ResponseCache, normalize_text
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_text_folds_case_accents_and_punctuation():
+    """Equivalent spellings normalize to the same text"""
+    assert normalize_text("¿Tarjetas de  CRÉDITO?") == "tarjetas de credito"
+    assert normalize_text("tarjetas de credito") == "tarjetas de credito"
+
+
+def test_key_depends_on_recent_history():
+    """Same question in a different context gets a different key"""
+    cache = ResponseCache(history_turns=2, enabled=True)
+    history_a = [{"role": "assistant", "content": "Bienvenido"}]
+    history_b = [{"role": "assistant", "content": "¿Algo más?"}]
+
+    assert cache.make_key("Consultar saldo", history_a) == cache.make_key("consultar saldo!", history_a)
+    assert cache.make_key("Consultar saldo", history_a) != cache.make_key("Consultar saldo", history_b)
+
+
+def test_lru_eviction_respects_size_bound():
+    """Least recently used entries are evicted first"""
+    cache = ResponseCache(max_entries=2, enabled=True)
+    cache.set("a", {"content": "A", "metadata": {}})
+    cache.set("b", {"content": "B", "metadata": {}})
+    cache.get("a")
+    cache.set("c", {"content": "C", "metadata": {}})
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a")["content"] == "A"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    """Entries older than the TTL are misses"""
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=10, enabled=True, clock=clock)
+    cache.set("k", {"content": "x", "metadata": {}})
+
+    clock.now = 5
+    assert cache.get("k") is not None
+    clock.now = 16
+    assert cache.get("k") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_invalidate_clears_entries():
+    """Knowledge-base changes drop every cached answer"""
+    cache = ResponseCache(enabled=True)
+    cache.set("k", {"content": "x", "metadata": {}})
+
+    assert cache.invalidate() == 1
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_ai_service_serves_repeated_question_from_cache(monkeypatch):
+    """A repeated question does not reach the provider again"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache = ResponseCache(enabled=True)
+
+    calls = []
+    original = service._generate_mock
+
+    def counting_mock(message):
+        calls.append(message)
+        return original(message)
+
+    monkeypatch.setattr(service, "_generate_mock", counting_mock)
+
+    first = await service.generate_response("Consultar saldo")
+    second = await service.generate_response("¿consultar SALDO?")
+
+    assert len(calls) == 1
+    assert second["content"] == first["content"]
+    assert second["metadata"]["cached"] is True
+    assert "cached" not in first["metadata"]
@@ -0,0 +1,128 @@
+# Unit tests for single-flight request coalescing
+import asyncio
+import pytest
+
+from app.services.ai_service import AIService
+from app.services.singleflight import SingleFlight, make_flight_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call():
+    """All concurrent callers with the same key get the leader's result"""
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"content": "respuesta", "metadata": {}}
+
+    waiters = [asyncio.create_task(flight.do("same", upstream)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(result["content"] == "respuesta" for result, _ in results)
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "deduplicated": 4}
+
+
+@pytest.mark.asyncio
+async def test_leader_changes_do_not_reach_followers():
+    """Every caller, the leader included, gets its own copy of the result"""
+    flight = SingleFlight()
+    release = asyncio.Event()
+    produced = {"content": "respuesta", "metadata": {}}
+
+    async def upstream():
+        await release.wait()
+        return produced
+
+    async def leader():
+        result, shared = await flight.do("k", upstream)
+        result["metadata"]["cached"] = True
+        return result, shared
+
+    async def follower():
+        await asyncio.sleep(0)
+        return await flight.do("k", upstream)
+
+    waiters = [asyncio.create_task(leader()), asyncio.create_task(follower())]
+    await asyncio.sleep(0)
+    release.set()
+    (led, _), (followed, shared) = await asyncio.gather(*waiters)
+
+    assert shared and led is not produced
+    assert led["metadata"] == {"cached": True}
+    assert followed["metadata"] == {} and produced["metadata"] == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    """A disconnected caller does not abort the shared call"""
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def upstream():
+        await release.wait()
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    release.set()
+
+    assert await follower == ("ok", True)
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_are_not_coalesced():
+    """Once a call finishes, the next one goes upstream again"""
+    flight = SingleFlight()
+
+    async def upstream():
+        return "ok"
+
+    await flight.do("k", upstream)
+    await flight.do("k", upstream)
+
+    assert flight.stats()["upstream_calls"] == 2
+    assert flight.stats()["deduplicated"] == 0
+
+
+def test_flight_key_distinguishes_history():
+    """Different context means a different prompt"""
+    history = [{"role": "user", "content": "Hola"}]
+    assert make_flight_key("saldo", history) == make_flight_key("saldo", list(history))
+    assert make_flight_key("saldo", history) != make_flight_key("saldo", [])
+    assert make_flight_key("saldo", history, "prompt A") != make_flight_key("saldo", history, "prompt B")
+
+
+@pytest.mark.asyncio
+async def test_ai_service_coalesces_identical_prompts(monkeypatch):
+    """Concurrent identical messages reach the provider once"""
+    monkeypatch.setenv("AI_PROVIDER", "mock")
+    service = AIService()
+    service.cache.enabled = False
+
+    calls = 0
+
+    async def slow_generate(message, conversation_history=None, system_prompt=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"content": "ok", "metadata": {}}
+
+    monkeypatch.setattr(service, "_generate", slow_generate)
+
+    results = await asyncio.gather(*[service.generate_response("Consultar saldo") for _ in range(10)])
+
+    assert calls == 1
+    assert sum(1 for r in results if r["metadata"].get("coalesced")) == 9
+    assert service.get_stats()["single_flight"]["deduplicated"] == 9
@@ -0,0 +1,103 @@
+# Unit tests for the in-process vector index of knowledge-base articles
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.knowledge_retriever import KnowledgeRetriever
+from app.services.vector_index import HashingEmbedder, VectorIndex
+
+
+DOCS = {
+    1: "Límites de transferencias SPEI. Las transferencias SPEI tienen un límite diario de 50,000 MXN.",
+    2: "Anualidad de la tarjeta de crédito. La Tarjeta Clásica no cobra anualidad el primer año.",
+    3: "Horario de sucursales. Las sucursales abren de lunes a viernes de 9 a 16 h.",
+}
+
+
+def make_index(**kwargs):
+    index = VectorIndex(**kwargs)
+    index.sync(DOCS)
+    return index
+
+
+def test_embeddings_are_normalized_and_stable():
+    """Test vectors are unit length and ignore case, accents and plurals"""
+    embedder = HashingEmbedder(dim=64)
+
+    vector = embedder.embed("Límite de TRANSFERENCIAS")
+
+    assert vector.dtype == np.float32
+    assert abs(float(np.linalg.norm(vector)) - 1.0) < 1e-5
+    assert np.allclose(vector, embedder.embed("limite de transferencia"))
+    assert not embedder.embed("de la el").any()
+
+
+def test_search_ranks_by_cosine_similarity():
+    """Test the matching article comes first and unrelated queries find nothing"""
+    index = make_index()
+
+    results = index.search("cual es el limite de una transferencia spei", k=2)
+
+    assert results[0][0] == 1
+    assert results[0][1] > 0.3
+    assert index.search("anualidad tarjeta", k=1)[0][0] == 2
+    assert index.search("hola, gracias", k=3) == []
+
+
+def test_writes_keep_rows_dense():
+    """Test update in place, and delete moving the last row into the hole"""
+    index = make_index()
+
+    index.remove(1)
+    index.upsert(2, "Préstamos personales con tasa fija")
+    index.upsert(4, "Créditos hipotecarios a 20 años")
+
+    assert len(index) == 3
+    assert index.search("transferencia spei", k=3) == []
+    assert index.search("prestamo personal", k=1)[0][0] == 2
+    assert index.search("credito hipotecario", k=1)[0][0] == 4
+    assert index.search("horario sucursal", k=1)[0][0] == 3
+
+
+def test_sync_embeds_only_changes():
+    """Test a periodic reload re-embeds new and edited articles only"""
+    index = make_index()
+    assert index.embedded == 3
+
+    index.sync({**DOCS, 3: "Horario de sucursales: sábados de 9 a 14 h.", 5: "Seguro de vida"})
+
+    assert index.embedded == 5
+    index.sync({1: DOCS[1]})
+    assert len(index) == 1 and index.embedded == 5
+
+
+def test_saved_vectors_are_memory_mapped(tmp_path):
+    """Test vectors survive a restart without re-embedding and stay writable"""
+    index = make_index(path=str(tmp_path))
+    index.save()
+
+    reopened = VectorIndex(path=str(tmp_path))
+    reopened.sync(DOCS)
+
+    assert reopened.stats()["memory_mapped"] is True
+    assert reopened.embedded == 0
+    assert reopened.search("anualidad", k=1) == index.search("anualidad", k=1)
+
+    reopened.upsert(4, "Seguro de auto")
+    assert reopened.search("seguro auto", k=1)[0][0] == 4
+    assert len(VectorIndex(dim=64, path=str(tmp_path))) == 0  # other settings: rebuilt
+
+
+def test_retriever_uses_vector_index():
+    """Test the retriever can serve chat and search from the vector index"""
+    articles = [
+        SimpleNamespace(id=i, title=text.split(".")[0], content=text, category=category, tags=[], is_active=True)
+        for (i, text), category in zip(DOCS.items(), ["transfers", "cards", "general"])
+    ]
+    retriever = KnowledgeRetriever(enabled=True, top_k=3, index="vector", index_path="")
+    retriever.load(articles)
+
+    assert retriever.retrieve("limite transferencia spei")[0]["id"] == 1
+    assert retriever.retrieve("limite transferencia spei", category="cards") == []
+    assert retriever.stats()["index"] == "vector"
+    assert retriever.stats()["vectors"]["vectors"] == 3